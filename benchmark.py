@@ -0,0 +1,354 @@
+# سنجش کارایی مسیرهای پرتکرار دفتر مالی بدون رابط گرافیکی
+#
+# نمونه اجرا:
+#   python benchmark.py --sizes 10k,100k --output results.json
+#   python benchmark.py --sizes 1M --compare results.json
+#
+# دفترهای مصنوعی با seed ثابت ساخته می‌شوند تا نتایج بین کامیت‌ها قابل مقایسه باشند.
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from ledger import Ledger, ResultCache, CATEGORY_NAMES, NUMPY_AVAILABLE, STORAGE_PRESETS
+
+# اندازه صفحه جدول تراکنش‌ها (همان UltimateFinanceManager.PAGE_SIZE)
+PAGE_SIZE = 200
+
+# دسته‌های درآمد و هزینه از فهرست دسته‌های پیش‌فرض برنامه
+INCOME_CATEGORIES = CATEGORY_NAMES[:3]
+EXPENSE_CATEGORIES = CATEGORY_NAMES[3:]
+
+# نرخ تقریبی ارزهای خارجی (تومان) در شروع بازه و رشد روزانه آن برای فایل نرخ‌های مصنوعی
+FOREIGN_RATES = {'USD': 25_000, 'EUR': 28_000}
+DAILY_RATE_GROWTH = 1.0005
+
+# وزن تکرار و میانگین مبلغ (تومان) هر دسته هزینه؛ مبلغ‌ها توزیع log-normal دارند
+EXPENSE_PROFILE = {
+    "غذا": (30, 250_000),
+    "حمل‌ونقل": (20, 80_000),
+    "سرگرمی": (10, 400_000),
+    "خرید": (14, 900_000),
+    "پزشکی": (4, 1_500_000),
+    "آموزش": (3, 2_000_000),
+    "اجاره": (1, 15_000_000),
+    "بیمه": (1, 3_000_000),
+    "سایر": (8, 300_000),
+}
+
+# سهم روزهای هفته (۰=دوشنبه)؛ آخر هفته (پنج‌شنبه و جمعه) پرتراکنش‌تر است
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.3, 1.5, 1.1, 1.0)
+
+SIZE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+def parse_size(text):
+    """تبدیل اندازه‌هایی مثل 10k یا 1M به عدد"""
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+def format_size(count):
+    for suffix, factor in (('M', 1_000_000), ('k', 1_000)):
+        if count >= factor and count % factor == 0:
+            return f"{count // factor}{suffix}"
+    return str(count)
+
+def span_days_for(count, days_per_10k=365):
+    """طول بازه زمانی دفتر مصنوعی (روز): حدود یک سال به ازای هر ۱۰ هزار ردیف، حداکثر ۳۰ سال"""
+    return max(30, min(days_per_10k * count // 10_000, 30 * 365))
+
+def generate_records(count, seed=42, start=datetime(2020, 1, 1), days_per_10k=365, foreign_share=0.0):
+    """تولید تدریجی تراکنش‌های مصنوعی به ترتیب زمانی
+
+    بازه زمانی با تعداد ردیف‌ها بزرگ می‌شود (span_days_for). اول هر ماه حقوق ثبت
+    می‌شود و بقیه ردیف‌ها هزینه‌ها و درآمدهای پراکنده با دسته، ساعت و روز هفته
+    واقعی‌نما هستند. سهم foreign_share از هزینه‌ها به دلار یا یورو ثبت می‌شود.
+    """
+    rng = random.Random(seed)
+    span_days = span_days_for(count, days_per_10k)
+
+    # روزهای بازه با وزن روز هفته؛ هر ردیف یک روز از این توزیع می‌گیرد
+    day_weights = [WEEKDAY_WEIGHTS[(start + timedelta(days=day)).weekday()] for day in range(span_days)]
+    days = sorted(rng.choices(range(span_days), weights=day_weights, k=count))
+
+    expense_names = list(EXPENSE_PROFILE)
+    expense_weights = [EXPENSE_PROFILE[name][0] for name in expense_names]
+    salary = 40_000_000
+    last_month = None
+
+    emitted = 0
+    for day in days:
+        if emitted >= count:
+            return
+        date = start + timedelta(days=day)
+
+        # حقوق ماهانه در اولین ردیف هر ماه
+        if (date.year, date.month) != last_month:
+            last_month = (date.year, date.month)
+            salary = round(salary * rng.uniform(1.0, 1.03), -3)
+            yield {'date': date.strftime("%Y-%m-%d 09:00"), 'type': "درآمد", 'amount': salary,
+                   'description': "حقوق ماهانه", 'category': INCOME_CATEGORIES[0]}
+            emitted += 1
+            continue
+
+        timestamp = date.replace(hour=rng.choices(range(24), weights=[1] * 7 + [3] * 15 + [2] * 2)[0],
+                                 minute=rng.randrange(60))
+        if rng.random() < 0.03:
+            category = rng.choice(INCOME_CATEGORIES[1:])
+            trans_type = "درآمد"
+            amount = rng.lognormvariate(15.0, 1.0)
+        else:
+            category = rng.choices(expense_names, weights=expense_weights)[0]
+            trans_type = "هزینه"
+            amount = rng.lognormvariate(0, 0.6) * EXPENSE_PROFILE[category][1]
+        record = {'date': timestamp.strftime("%Y-%m-%d %H:%M"), 'type': trans_type,
+                  'amount': round(amount, -2) or 100, 'description': f"{category} #{emitted}",
+                  'category': category}
+        if trans_type == "هزینه" and foreign_share and rng.random() < foreign_share:
+            currency = rng.choice(list(FOREIGN_RATES))
+            record['currency'] = currency
+            record['amount'] = round(amount / (FOREIGN_RATES[currency] * DAILY_RATE_GROWTH ** day), 2) or 0.01
+        yield record
+        emitted += 1
+
+def write_rates_file(filename, count, start=datetime(2020, 1, 1)):
+    """نوشتن نرخ روزانه ارزهای خارجی برای همه روزهای بازه دفتر در فایل CSV"""
+    with open(filename, 'w', encoding='utf-8') as output:
+        output.write("date,currency,rate\n")
+        for day in range(span_days_for(count)):
+            date = (start + timedelta(days=day)).strftime("%Y-%m-%d")
+            for currency, rate in FOREIGN_RATES.items():
+                output.write(f"{date},{currency},{rate * DAILY_RATE_GROWTH ** day:.2f}\n")
+
+def write_records_file(filename, records):
+    """نوشتن رکوردها در فایل JSON Lines (ورودی مسیر import)"""
+    with open(filename, 'w', encoding='utf-8') as output:
+        for record in records:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def peak_memory(func):
+    """اوج حافظه تخصیص‌یافته پایتون در یک اجرای func (بایت)"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure(func, repeat, memory=True):
+    """اجرای func چند بار؛ خروجی: آمار زمان و اوج حافظه (در یک اجرای جداگانه با tracemalloc)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    result = {
+        'runs': repeat,
+        'min_seconds': min(timings),
+        'median_seconds': statistics.median(timings),
+        'max_seconds': max(timings),
+    }
+    if memory:
+        result['peak_bytes'] = peak_memory(func)
+    return result
+
+def add_transactions_one_by_one(ledger, count):
+    """ثبت تک‌تک تراکنش‌ها با commit جداگانه (مثل ورود دستی پشت سر هم)"""
+    for index in range(count):
+        ledger.add_transaction(ledger.expense_type, 1000 + index, "benchmark", "سایر")
+
+def queue_transactions(ledger, count):
+    """ثبت همان تراکنش‌ها در حالت ورود سریع: صف و یک commit برای همه"""
+    for index in range(count):
+        ledger.queue_transaction(ledger.expense_type, 1000 + index, "benchmark", "سایر")
+    ledger.flush_transactions()
+
+def scroll_pages(ledger, pages):
+    """پیمایش چند صفحه پشت سر هم مثل اسکرول جدول"""
+    key = None
+    for _ in range(pages):
+        rows = ledger.fetch_transactions_page(PAGE_SIZE, after_key=key)
+        if not rows:
+            break
+        key = (rows[-1][1], rows[-1][0])
+
+def analyze_patterns(ledger):
+    """محاسبات دکمه «الگوهای مصرف» (بدون ساخت متن)"""
+    rollups = ledger.rollups()
+    rollups.monthly_totals()
+    rollups.weekday_totals(ledger.expense_type)
+
+def cached_report(ledger, cache):
+    """دکمه «نمایش گزارش» با کش نتایج: خواندن نسخه داده‌ها و در صورت تغییر محاسبه دوباره"""
+    key = ('report_groups', None, None, None)
+    version = ledger.result_version()
+    hit, groups = cache.lookup(key, version)
+    if not hit:
+        groups = ledger.report_groups()
+        cache.store(key, version, groups)
+    return groups
+
+def run_size(count, args, workdir):
+    """ساخت دفتر با count ردیف و سنجش همه مسیرها؛ خروجی: لیست نتایج"""
+    label = format_size(count)
+    records_file = os.path.join(workdir, f"records_{label}_{args.seed}.jsonl")
+    database = os.path.join(workdir, f"ledger_{label}_{args.seed}.db")
+    for path in (database, records_file):
+        if os.path.exists(path):
+            os.remove(path)
+
+    print(f"[{label}] تولید {count:,} تراکنش مصنوعی...", file=sys.stderr)
+    write_records_file(records_file, generate_records(count, args.seed, foreign_share=args.foreign_share))
+    rates_file = os.path.join(workdir, f"rates_{label}.csv")
+    write_rates_file(rates_file, count)
+
+    results = []
+
+    def record(name, stats):
+        stats.update({'size': count, 'name': name})
+        results.append(stats)
+        print(f"[{label}] {name}: {stats['median_seconds'] * 1000:,.1f} ms", file=sys.stderr)
+
+    # ورود داده: دفتر اصلی با همین اجرا ساخته می‌شود
+    profile = STORAGE_PRESETS[args.storage]
+    ledger = Ledger(database, storage_profile=profile)
+    # نرخ‌ها پیش از ورود لازم‌اند (مبلغ پایه هر تراکنش هنگام درج محاسبه می‌شود)
+    ledger.load_exchange_rates(rates_file)
+    record('import_data', measure(lambda: ledger.import_transactions(records_file), 1, memory=False))
+    # اندازه دیتابیس پس از ورود (همراه فایل -wal که هنوز در فایل اصلی نوشته نشده)
+    results[-1]['database_bytes'] = sum(os.path.getsize(database + suffix) for suffix in ('', '-wal')
+                                        if os.path.exists(database + suffix))
+    if not args.no_memory:
+        # اوج حافظه ورود روی یک دیتابیس یک‌بارمصرف
+        scratch = os.path.join(workdir, "scratch.db")
+        with Ledger(scratch, storage_profile=profile) as scratch_ledger:
+            scratch_ledger.load_exchange_rates(rates_file)
+            results[-1]['peak_bytes'] = peak_memory(lambda: scratch_ledger.import_transactions(records_file))
+        os.remove(scratch)
+
+    memory = not args.no_memory
+    repeat = args.repeat
+    record('add_transaction_x100', measure(lambda: add_transactions_one_by_one(ledger, 100), repeat, memory))
+    record('rapid_entry_x100', measure(lambda: queue_transactions(ledger, 100), repeat, memory))
+    record('refresh_display', measure(lambda: (ledger.fetch_transactions_page(PAGE_SIZE), ledger.totals()), repeat, memory))
+    record('scroll_10_pages', measure(lambda: scroll_pages(ledger, 10), repeat, memory))
+    # جستجوی کم‌نتیجه (حقوق ماهانه) و پرنتیجه (پیشوند یک دسته پرتکرار)
+    record('search_selective', measure(lambda: ledger.fetch_transactions_page(PAGE_SIZE, search="حقوق"), repeat, memory))
+    record('search_broad_prefix', measure(lambda: ledger.fetch_transactions_page(PAGE_SIZE, search="غذ"), repeat, memory))
+    record('update_summary', measure(ledger.totals, repeat, memory))
+    record('generate_report_all', measure(ledger.report_groups, repeat, memory))
+    record('generate_report_year', measure(lambda: ledger.report_groups(2021), repeat, memory))
+    # تکرار گزارش بدون تغییر داده‌ها: فقط نسخه داده‌ها خوانده می‌شود
+    cache = ResultCache()
+    record('generate_report_cached', measure(lambda: cached_report(ledger, cache), repeat, memory))
+    # گزارش به ارز خارجی: تبدیل خلاصه‌های ماهانه با نرخ آخر هر ماه
+    record('update_summary_usd', measure(lambda: ledger.totals('USD'), repeat, memory))
+    record('generate_report_usd', measure(lambda: ledger.report_groups(currency='USD'), repeat, memory))
+    # اصلاح نرخ‌ها: مبلغ پایه همه تراکنش‌های ارزی دوباره محاسبه می‌شود
+    record('load_exchange_rates', measure(lambda: ledger.load_exchange_rates(rates_file), 1, memory=False))
+
+    def cold_patterns():
+        ledger.mark_changed()
+        analyze_patterns(ledger)
+    record('analyze_patterns_cold', measure(cold_patterns, repeat, memory))
+    record('analyze_patterns_warm', measure(lambda: analyze_patterns(ledger), repeat, memory))
+
+    for extension in ('.jsonl', '.csv', '.fmcol'):
+        export_file = os.path.join(workdir, f"export{extension}")
+        record(f'export_data{extension}', measure(lambda: ledger.export_transactions(export_file), repeat, memory))
+        os.remove(export_file)
+
+    ledger.close()
+    if not args.keep:
+        os.remove(database)
+        os.remove(records_file)
+        os.remove(rates_file)
+    return results
+
+def environment_info():
+    """اطلاعات محیط اجرا برای مقایسه معنادار نتایج"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'numpy': NUMPY_AVAILABLE,
+    }
+
+def compare_results(current, baseline, threshold):
+    """مقایسه میانه زمان‌ها با یک فایل نتایج قبلی؛ خروجی: تعداد کندشدن‌ها"""
+    previous = {(item['size'], item['name']): item for item in baseline['results']}
+    regressions = 0
+    print(f"{'size':>6} {'benchmark':<24} {'before ms':>11} {'after ms':>11} {'ratio':>7}", file=sys.stderr)
+    for item in current['results']:
+        old = previous.get((item['size'], item['name']))
+        if old is None or not old['median_seconds']:
+            continue
+        ratio = item['median_seconds'] / old['median_seconds']
+        flag = "  <-- regression" if ratio > threshold else ""
+        regressions += ratio > threshold
+        print(f"{format_size(item['size']):>6} {item['name']:<24} {old['median_seconds'] * 1000:>11.1f} "
+              f"{item['median_seconds'] * 1000:>11.1f} {ratio:>7.2f}{flag}", file=sys.stderr)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="سنجش کارایی دفتر مالی روی دفترهای مصنوعی")
+    parser.add_argument('--sizes', default="10k,100k", help="اندازه دفترها، مثلاً 10k,100k,1M,10M")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5, help="تعداد تکرار هر سنجش")
+    parser.add_argument('--output', help="مسیر فایل JSON نتایج (پیش‌فرض: خروجی استاندارد)")
+    parser.add_argument('--compare', help="فایل نتایج قبلی برای مقایسه")
+    parser.add_argument('--threshold', type=float, default=1.2, help="نسبت کندشدنی که گزارش می‌شود")
+    parser.add_argument('--storage', choices=sorted(STORAGE_PRESETS), default='tuned',
+                        help="پروفایل ذخیره‌سازی SQLite")
+    parser.add_argument('--workdir', help="پوشه فایل‌های موقت (پیش‌فرض: پوشه موقت سیستم)")
+    parser.add_argument('--keep', action='store_true', help="نگه داشتن دیتابیس‌ها و فایل‌های تولیدشده")
+    parser.add_argument('--no-memory', action='store_true', help="اندازه‌گیری نکردن اوج حافظه")
+    parser.add_argument('--foreign-share', type=float, default=0.0,
+                        help="سهم هزینه‌هایی که به دلار یا یورو ثبت می‌شوند (۰ تا ۱)")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="finance_benchmark_")
+    os.makedirs(workdir, exist_ok=True)
+
+    report = {'environment': environment_info(), 'seed': args.seed, 'repeat': args.repeat,
+              'storage': args.storage, 'foreign_share': args.foreign_share, 'results': []}
+    try:
+        for size in args.sizes.split(','):
+            report['results'].extend(run_size(parse_size(size), args, workdir))
+    finally:
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            regressions = compare_results(report, json.load(baseline_file), args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
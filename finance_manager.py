@@ -1,23 +1,61 @@
+import time
+# زمان شروع بارگذاری ماژول (برای --profile-startup)
+MODULE_LOAD_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import json
-import os
-from datetime import datetime
-import sqlite3
+from datetime import datetime, timedelta
+import argparse
 import calendar
-from collections import defaultdict
-import hashlib
+from collections import deque
+import functools
+import importlib.util
+import queue
+import sys
+import threading
+
+from ledger import (Ledger, JobCancelled, CATEGORY_NAMES, WEEKDAY_NAMES,
+                    STORAGE_PRESETS, JOURNAL_MODES, SYNCHRONOUS_LEVELS,
+                    BACKUP_SETTING_DEFAULTS, ZSTD_AVAILABLE, QUERY_LOG, LatencyStats,
+                    ResultCache, RESULT_CACHE_SUFFIX, remove_if_exists,
+                    BASE_CURRENCY, CURRENCY_NAMES, MissingExchangeRate, currency_name, normalize_currency,
+                    from_minor_units, RECURRENCE_RULES, ReminderQueue, wall_clock_epoch)
 
-# برای نمایش صحیح فارسی
-try:
-    from bidi.algorithm import get_display
-    import arabic_reshaper
-    BIDI_AVAILABLE = True
-except ImportError:
-    BIDI_AVAILABLE = False
+# برای نمایش صحیح فارسی (کتابخانه‌ها در اولین شکل‌دهی متن import می‌شوند)
+BIDI_AVAILABLE = (importlib.util.find_spec("bidi") is not None
+                  and importlib.util.find_spec("arabic_reshaper") is not None)
+get_display = None
+arabic_reshaper = None
+if not BIDI_AVAILABLE:
     print("برای نمایش صحیح فارسی، کتابخانه‌های زیر را نصب کنید:")
     print("pip install python-bidi arabic-reshaper")
 
+def load_bidi():
+    """import تنبل python-bidi و arabic-reshaper؛ خروجی: آیا شکل‌دهی فارسی ممکن است"""
+    global get_display, arabic_reshaper, BIDI_AVAILABLE
+    if get_display is None and BIDI_AVAILABLE:
+        try:
+            from bidi.algorithm import get_display as bidi_get_display
+            import arabic_reshaper as reshaper_module
+            get_display, arabic_reshaper = bidi_get_display, reshaper_module
+        except ImportError:
+            BIDI_AVAILABLE = False
+    return BIDI_AVAILABLE
+
+# تعداد متن‌های شکل‌دهی‌شده‌ای که در حافظه نگه داشته می‌شوند
+PERSIAN_TEXT_CACHE_SIZE = 4096
+
+@functools.lru_cache(maxsize=PERSIAN_TEXT_CACHE_SIZE)
+def shape_persian_text(text):
+    """شکل‌دهی و ترتیب bidi یک متن فارسی (نتیجه در کش LRU نگه داشته می‌شود)"""
+    try:
+        if not load_bidi():
+            return text
+        reshaped_text = arabic_reshaper.reshape(text)
+        return get_display(reshaped_text)
+    except:
+        return text
+
 # تابع تصحیح فارسی
 def fix_persian_text(text):
     """تصحیح نمایش فارسی"""
@@ -30,20 +68,180 @@ def fix_persian_text(text):
         
     # اگر کتابخانه‌ها نصب باشن
     if BIDI_AVAILABLE:
-        try:
-            reshaped_text = arabic_reshaper.reshape(text)
-            return get_display(reshaped_text)
-        except:
-            return text
+        return shape_persian_text(text)
     else:
         # اگر کتابخانه‌ها نصب نباشن، حداقل برعکس نکن
         return text
 
+def persian_text_cache_info():
+    """آمار کش شکل‌دهی متن: (hits, misses, maxsize, currsize)"""
+    return shape_persian_text.cache_info()
+
+# متن‌های ثابتی که در مسیرهای پرتکرار استفاده می‌شوند
+UI_LABEL_TEXTS = ("درآمد", "هزینه", "همه") + tuple(CURRENCY_NAMES.values()) + CATEGORY_NAMES + WEEKDAY_NAMES
+
+def precompute_ui_labels():
+    """شکل‌دهی یک‌باره متن‌های ثابت رابط کاربری: {متن اصلی: متن نمایشی}"""
+    return {text: fix_persian_text(text) for text in UI_LABEL_TEXTS}
+
+# === زمان‌سنجی handler های رابط کاربری ===
+
+# زمان handler ها؛ برای کارهای پس‌زمینه از کلیک تا نمایش نتیجه
+HANDLER_STATS = LatencyStats()
+
+def timed_handler(name):
+    """دکوراتور ثبت زمان اجرای یک handler در HANDLER_STATS"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                HANDLER_STATS.record(name, (time.perf_counter() - started) * 1000)
+        return wrapper
+    return decorator
+
+# === زمان‌سنجی شروع برنامه ===
+
+class StartupProfiler:
+    """زمان هر مرحله از شروع برنامه (--profile-startup) در stderr
+    
+    هر mark زمان سپری‌شده از مرحله قبل و از ابتدای بخش را چاپ می‌کند. بخش دوم
+    (پنجره اصلی) پس از ورود با restart شروع می‌شود تا زمان تایپ رمز شمرده نشود.
+    """
+    
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.started = self.last = time.perf_counter()
+        
+    def restart(self, title, started=None):
+        """شروع یک بخش جدید از زمان‌سنجی (از لحظه started یا همین حالا)"""
+        self.started = self.last = started if started is not None else time.perf_counter()
+        if self.enabled:
+            print(f"[startup] --- {title} ---", file=sys.stderr)
+            
+    def mark(self, phase):
+        """ثبت پایان یک مرحله"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        print(f"[startup] {phase:<28} {(now - self.last) * 1000:>9.1f} ms  "
+              f"(total {(now - self.started) * 1000:,.1f} ms)", file=sys.stderr)
+        self.last = now
+
+# === اجرای کارهای سنگین در پس‌زمینه ===
+
+class BackgroundJob:
+    """یک کار در صف رشته دیتابیس به همراه وضعیت لغو و گزارش پیشرفت"""
+    
+    def __init__(self, worker, func, description, on_done=None, on_error=None):
+        self.worker = worker
+        self.func = func
+        self.description = description
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancel_event = threading.Event()
+        
+    def cancel(self):
+        self.cancel_event.set()
+        
+    def check_cancelled(self):
+        """در نقاط امن کار صدا زده می‌شود؛ در صورت لغو JobCancelled می‌دهد"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+            
+    def report_progress(self, fraction=None, message=None):
+        """ارسال پیشرفت (کسر بین ۰ و ۱ و/یا پیام) به رابط کاربری"""
+        self.worker.events.put(('progress', self, (fraction, message)))
+
+class DatabaseWorker:
+    """رشته اختصاصی دیتابیس برای کارهای طولانی
+    
+    کارها به ترتیب روی یک Ledger جداگانه اجرا می‌شوند که فقط در همین رشته ساخته و
+    استفاده می‌شود. رویدادهای شروع/پیشرفت/پایان در صف events قرار می‌گیرند تا
+    رابط کاربری آن‌ها را با root.after بخواند؛ هیچ ویجتی از این رشته لمس نمی‌شود.
+    """
+    
+    def __init__(self, open_ledger):
+        # تابعی که Ledger رشته را (در خود رشته) می‌سازد
+        self.open_ledger = open_ledger
+        self.jobs = queue.Queue()
+        self.events = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="database-worker", daemon=True)
+        self.thread.start()
+        
+    def submit(self, func, description="", on_done=None, on_error=None):
+        """افزودن کار به صف؛ func(ledger, job) در رشته دیتابیس اجرا می‌شود"""
+        job = BackgroundJob(self, func, description, on_done, on_error)
+        self.jobs.put(job)
+        return job
+        
+    def stop(self):
+        self.jobs.put(None)
+        
+    def run(self):
+        ledger = None
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if job.cancel_event.is_set():
+                self.events.put(('cancelled', job, None))
+                continue
+                
+            self.events.put(('started', job, None))
+            try:
+                if ledger is None:
+                    ledger = self.open_ledger()
+                result = job.func(ledger, job)
+            except JobCancelled:
+                ledger.conn.rollback()
+                self.events.put(('cancelled', job, None))
+            except Exception as e:
+                if ledger is not None:
+                    ledger.conn.rollback()
+                self.events.put(('error', job, e))
+            else:
+                self.events.put(('done', job, result))
+                
+        if ledger is not None:
+            ledger.close()
+
 class UltimateFinanceManager:
-    def __init__(self):
+    # صفحه‌بندی جدول تراکنش‌ها: تعداد ردیف هر صفحه و حداکثر صفحه‌های بارگذاری‌شده
+    PAGE_SIZE = 200
+    MAX_LOADED_PAGES = 3
+    
+    # فاصله بررسی نتایج رشته پس‌زمینه (میلی‌ثانیه)
+    WORKER_POLL_MS = 50
+    
+    # مکث تایپ پیش از اجرای جستجو (میلی‌ثانیه)
+    SEARCH_DEBOUNCE_MS = 300
+    
+    # ورود سریع: صف تراکنش‌ها با رسیدن به این تعداد یا پس از این مدت (میلی‌ثانیه) یکجا ثبت می‌شود
+    RAPID_ENTRY_BATCH_SIZE = 25
+    RAPID_ENTRY_FLUSH_MS = 2000
+    
+    # فاصله بررسی نوبت‌های سررسیده تراکنش‌های تکرارشونده (میلی‌ثانیه)
+    RECURRING_CHECK_MS = 60 * 60 * 1000
+    
+    # زمان‌بند یادآوری‌ها: حداکثر خواب (برای جبران تغییر ساعت سیستم یا خواب رایانه)،
+    # تعداد یادآوری‌های نمایش‌داده‌شده در هر پنجره و مدت تعویق کوتاه (ثانیه)
+    REMINDER_MAX_SLEEP_MS = 60 * 60 * 1000
+    REMINDER_DIALOG_LIMIT = 20
+    REMINDER_SNOOZE_SECONDS = 60 * 60
+    
+    def __init__(self, profile_startup=False):
+        # زمان‌سنجی مرحله‌های شروع (از ابتدای بارگذاری ماژول)
+        self.profiler = StartupProfiler(profile_startup)
+        self.profiler.restart("login screen", MODULE_LOAD_STARTED)
+        self.profiler.mark('imports')
+        
         self.root = tk.Tk()
         self.root.title(fix_persian_text("مدیریت مالی حرفه‌ای"))
         self.root.geometry("1000x750")
+        self.profiler.mark('tk_root')
         
         # تنظیم فونت فارسی
         self.setup_persian_fonts()
@@ -53,18 +251,63 @@ class UltimateFinanceManager:
         self.user_logged_in = False
         self.current_user_id = None
         
-        # اتصال به دیتابیس
-        self.setup_database()
+        # وضعیت صفحه‌بندی جدول تراکنش‌ها
+        self.loaded_pages = deque()
+        self.has_more_above = False
+        self.has_more_below = False
+        self.page_load_after_id = None
+        self.search_after_id = None
+        # زمان‌بند یادآوری‌ها: صف نزدیک‌ترین سررسیدها و زمان‌سنج بیدار شدن بعدی
+        self.reminder_queue = None
+        self.reminder_after_id = None
+        # ورود سریع: زمان‌سنج ثبت صف و ردیف‌های جدول متناظر با تراکنش‌های صف
+        self.rapid_flush_after_id = None
+        self.pending_items = []
+        # جمع درآمد و هزینه نمایش‌داده‌شده در کارت‌ها (برای به‌روزرسانی افزایشی)
+        self.summary_totals = None
+        # با هر بارگذاری دوباره جدول زیاد می‌شود تا نتیجه بارگذاری‌های قدیمی‌تر دور ریخته شود
+        self.display_generation = 0
+        
+        # تب‌هایی که هنوز ساخته نشده‌اند: {شناسه فریم: (فریم، تابع ساخت)}
+        self.lazy_tabs = {}
+        
+        # متن‌های ثابت شکل‌دهی‌شده (یک بار در شروع برنامه)
+        self.labels = precompute_ui_labels()
+        self.profiler.mark('labels')
+        
+        # اتصال به دیتابیس (نوع تراکنش‌ها با همان متن نمایشی ذخیره می‌شود)
+        open_ledger = functools.partial(Ledger, 'finance.db', self.labels["درآمد"], self.labels["هزینه"])
+        self.ledger = open_ledger()
+        self.profiler.mark('open_ledger')
+        
+        # واحد پولی که خلاصه‌ها، گزارش‌ها و آنالیزها با آن نمایش داده می‌شوند
+        self.reporting_currency = self.ledger.get_setting('currency.reporting', BASE_CURRENCY)
+        
+        # کش نتایج گزارش‌ها و آنالیزها (با ذخیره روی دیسک، نتایج آخرین اجرا هم معتبر می‌مانند)
+        self.result_cache = ResultCache()
+        self.result_cache_path = self.ledger.database_path + RESULT_CACHE_SUFFIX
+        if self.ledger.get_setting('cache.persist', '1') == '1':
+            self.result_cache.load(self.result_cache_path)
+        self.profiler.mark('result_cache')
+        
+        # رشته پس‌زمینه برای کارهای سنگین دیتابیس و آنالیز (با Ledger جداگانه)
+        self.worker = DatabaseWorker(open_ledger)
+        self.current_job = None
+        self.status_label = None
+        self.root.after(self.WORKER_POLL_MS, self.poll_worker)
+        self.profiler.mark('database_worker')
         
         # متغیرها
-        self.type_var = tk.StringVar(value=fix_persian_text("درآمد"))
+        self.type_var = tk.StringVar(value=self.labels["درآمد"])
         self.amount_var = tk.StringVar()
         self.desc_var = tk.StringVar()
         self.category_var = tk.StringVar()
-        self.filter_var = tk.StringVar(value=fix_persian_text("همه"))
+        self.filter_var = tk.StringVar(value=self.labels["همه"])
+        self.search_var = tk.StringVar()
         self.month_var = tk.StringVar()
         self.year_var = tk.StringVar()
-        self.currency_var = tk.StringVar(value="تومان")
+        self.currency_var = tk.StringVar(value=CURRENCY_NAMES[BASE_CURRENCY])
+        self.rapid_entry_var = tk.BooleanVar(value=False)
         self.goal_amount_var = tk.StringVar()
         self.reminder_desc_var = tk.StringVar()
         self.reminder_date_var = tk.StringVar()
@@ -81,6 +324,8 @@ class UltimateFinanceManager:
         
         # نمایش صفحه ورود
         self.show_login_screen()
+        self.profiler.mark('login_screen')
+        self.root.after_idle(lambda: self.profiler.mark('login_window_shown'))
         
     def setup_persian_fonts(self):
         """تنظیم فونت فارسی بهتر"""
@@ -94,82 +339,101 @@ class UltimateFinanceManager:
         except Exception as e:
             print(f"خطا در تنظیم فونت: {e}")
         
-    def setup_database(self):
-        """راه‌اندازی دیتابیس SQLite"""
-        self.conn = sqlite3.connect('finance.db')
-        self.cursor = self.conn.cursor()
-        
-        # ایجاد جدول تراکنش‌ها
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                type TEXT,
-                amount REAL,
-                description TEXT,
-                category TEXT
-            )
-        ''')
+    def run_in_background(self, func, description, on_done=None, error_message=None, timing_name=None):
+        """اجرای func(ledger, job) در رشته دیتابیس و تحویل نتیجه به on_done در رشته رابط کاربری
         
-        # ایجاد جدول تنظیمات
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        ''')
-        
-        # ایجاد جدول اهداف مالی
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                target_amount REAL,
-                current_amount REAL DEFAULT 0,
-                description TEXT,
-                deadline TEXT,
-                created_date TEXT
-            )
-        ''')
-        
-        # ایجاد جدول یادآوری‌ها
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reminders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                description TEXT,
-                date TEXT,
-                completed INTEGER DEFAULT 0
-            )
-        ''')
+        با timing_name زمان از ارسال کار تا پایان on_done در HANDLER_STATS ثبت می‌شود.
+        صف ورود سریع پیش از ارسال ثبت می‌شود تا اتصال رشته پس‌زمینه آن را ببیند.
+        """
+        self.flush_rapid_entries()
         
-        # ایجاد جدول رمز عبور
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS security (
-                id INTEGER PRIMARY KEY,
-                password_hash TEXT
-            )
-        ''')
-        
-        self.conn.commit()
-        
-    def hash_password(self, password):
-        """رمزگذاری رمز عبور"""
-        return hashlib.sha256(password.encode()).hexdigest()
-        
-    def set_password(self, password):
-        """تنظیم رمز عبور"""
-        password_hash = self.hash_password(password)
-        self.cursor.execute("DELETE FROM security")
-        self.cursor.execute("INSERT INTO security (id, password_hash) VALUES (1, ?)", (password_hash,))
-        self.conn.commit()
-        
-    def check_password(self, password):
-        """بررسی رمز عبور"""
-        password_hash = self.hash_password(password)
-        self.cursor.execute("SELECT password_hash FROM security WHERE id = 1")
-        result = self.cursor.fetchone()
-        if result:
-            return result[0] == password_hash
-        return False
+        def on_error(error):
+            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"{error_message}: {str(error)}"))
+            
+        if timing_name is not None:
+            submitted = time.perf_counter()
+            show_result = on_done
+            
+            def on_done(result):
+                if show_result:
+                    show_result(result)
+                HANDLER_STATS.record(timing_name, (time.perf_counter() - submitted) * 1000)
+                
+        return self.worker.submit(func, description, on_done, on_error)
+        
+    def run_cached(self, key, func, description, on_done, error_message, timing_name=None):
+        """مثل run_in_background ولی نتیجه func با کلید key در کش نتایج نگه داشته می‌شود
+        
+        اگر تراکنش‌ها و نرخ‌ها از آخرین محاسبه تغییر نکرده باشند نتیجه بدون رفتن
+        به رشته پس‌زمینه نمایش داده می‌شود.
+        """
+        self.flush_rapid_entries()
+        started = time.perf_counter()
+        hit, result = self.result_cache.lookup(key, self.ledger.result_version())
+        if hit:
+            on_done(result)
+            if timing_name is not None:
+                HANDLER_STATS.record(timing_name, (time.perf_counter() - started) * 1000)
+            return None
+            
+        def job(ledger, task):
+            # نسخه پیش از محاسبه خوانده می‌شود تا تغییر هم‌زمان، نتیجه قدیمی را معتبر نشان ندهد
+            version = ledger.result_version()
+            result = func(ledger, task)
+            self.result_cache.store(key, version, result)
+            return result
+            
+        return self.run_in_background(job, description, on_done, error_message, timing_name)
+        
+    def poll_worker(self):
+        """خواندن رویدادهای رشته پس‌زمینه (با root.after)"""
+        try:
+            while True:
+                event, job, payload = self.worker.events.get_nowait()
+                if event == 'started':
+                    self.current_job = job
+                    self.set_status(job.description, 0, cancellable=True)
+                elif event == 'progress':
+                    fraction, message = payload
+                    text = f"{job.description} - {message}" if message else job.description
+                    self.set_status(text, fraction, cancellable=True)
+                else:
+                    if job is self.current_job:
+                        self.current_job = None
+                        self.set_status(fix_persian_text("لغو شد") if event == 'cancelled' else "")
+                    if event == 'done' and job.on_done:
+                        job.on_done(payload)
+                    elif event == 'error' and job.on_error:
+                        job.on_error(payload)
+        except queue.Empty:
+            pass
+        self.root.after(self.WORKER_POLL_MS, self.poll_worker)
+        
+    def set_status(self, text, fraction=None, cancellable=False):
+        """به‌روزرسانی نوار وضعیت پایین پنجره"""
+        if self.status_label is None:
+            return
+        self.status_label.config(text=text)
+        self.status_progress['value'] = (fraction or 0) * 100
+        self.cancel_button.config(state=tk.NORMAL if cancellable else tk.DISABLED)
+        
+    def cancel_background_job(self):
+        """لغو کار در حال اجرا"""
+        if self.current_job is not None:
+            self.current_job.cancel()
+            
+    def run_analysis(self, build_analysis, description, error_message, timing_name=None):
+        """ساخت متن یک آنالیز در پس‌زمینه از روی جدول‌های خلاصه دفتر"""
+        currency = self.reporting_currency
+        
+        def job(ledger, task):
+            return build_analysis(ledger.rollups(currency), ledger)
+            
+        def show(analysis):
+            self.analysis_text.delete(1.0, tk.END)
+            self.analysis_text.insert(tk.END, analysis)
+            
+        self.run_cached((build_analysis.__name__, currency), job, description, show, error_message, timing_name)
         
     def show_login_screen(self):
         """نمایش صفحه ورود"""
@@ -191,14 +455,13 @@ class UltimateFinanceManager:
         
         def login():
             password = password_entry.get()
-            if self.check_password(password):
+            if self.ledger.check_password(password):
                 self.user_logged_in = True
                 self.setup_main_ui()
             else:
                 # اگر رمز عبور اولین بار تنظیم نشده، اجازه ورود با هر رمزی
-                self.cursor.execute("SELECT COUNT(*) FROM security")
-                if self.cursor.fetchone()[0] == 0:
-                    self.set_password(password)
+                if not self.ledger.has_password():
+                    self.ledger.set_password(password)
                     self.user_logged_in = True
                     self.setup_main_ui()
                 else:
@@ -214,7 +477,13 @@ class UltimateFinanceManager:
                  foreground="gray").pack()
         
     def setup_main_ui(self):
-        """راه‌اندازی رابط کاربری اصلی"""
+        """راه‌اندازی رابط کاربری اصلی
+        
+        فقط تب تراکنش‌ها بی‌درنگ ساخته می‌شود؛ بقیه تب‌ها در اولین انتخاب ساخته
+        می‌شوند و صفحه اول جدول در رشته پس‌زمینه خوانده می‌شود.
+        """
+        self.profiler.restart("main window")
+        
         # پاک کردن صفحه فعلی
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -237,8 +506,20 @@ class UltimateFinanceManager:
         menubar.add_cascade(label=fix_persian_text("ابزار"), menu=tools_menu)
         tools_menu.add_command(label=fix_persian_text("اهداف مالی"), command=self.show_goals_window)
         tools_menu.add_command(label=fix_persian_text("یادآوری‌ها"), command=self.show_reminders_window)
+        tools_menu.add_command(label=fix_persian_text("تراکنش‌های تکرارشونده"), command=self.show_recurring_window)
         tools_menu.add_command(label=fix_persian_text("تغییر رمز عبور"), command=self.change_password)
         
+        # نوار وضعیت کارهای پس‌زمینه
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 5))
+        self.cancel_button = ttk.Button(status_frame, text=fix_persian_text("لغو"), 
+                                        command=self.cancel_background_job, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.status_progress = ttk.Progressbar(status_frame, length=200, mode='determinate', maximum=100)
+        self.status_progress.pack(side=tk.RIGHT, padx=(0, 10))
+        self.status_label = ttk.Label(status_frame, text="")
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
         # Notebook برای تب‌بندی
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -247,33 +528,55 @@ class UltimateFinanceManager:
         main_frame = ttk.Frame(notebook)
         notebook.add(main_frame, text=fix_persian_text("تراکنش‌ها"))
         
-        # تب گزارش‌ها
-        report_frame = ttk.Frame(notebook)
-        notebook.add(report_frame, text=fix_persian_text("گزارش‌ها"))
-        
-        # تب آنالیز
-        analysis_frame = ttk.Frame(notebook)
-        notebook.add(analysis_frame, text=fix_persian_text("آنالیز"))
-        
-        # تب تنظیمات
-        settings_frame = ttk.Frame(notebook)
-        notebook.add(settings_frame, text=fix_persian_text("تنظیمات"))
+        # تب‌های گزارش‌ها، آنالیز و تنظیمات (خالی تا اولین انتخاب)
+        self.lazy_tabs = {}
+        for title, setup_tab in ((fix_persian_text("گزارش‌ها"), self.setup_report_tab),
+                                 (fix_persian_text("آنالیز"), self.setup_analysis_tab),
+                                 (fix_persian_text("تنظیمات"), self.setup_settings_tab)):
+            frame = ttk.Frame(notebook)
+            notebook.add(frame, text=title)
+            self.lazy_tabs[str(frame)] = (frame, setup_tab)
+        notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.profiler.mark('menus_and_notebook')
         
         # === تب اصلی ===
         self.setup_main_tab(main_frame)
+        self.update_summary()
+        self.profiler.mark('transactions_tab')
         
-        # === تب گزارش‌ها ===
-        self.setup_report_tab(report_frame)
-        
-        # === تب آنالیز ===
-        self.setup_analysis_tab(analysis_frame)
-        
-        # === تب تنظیمات ===
-        self.setup_settings_tab(settings_frame)
+        # بارگذاری داده‌ها و یادآوری‌ها پس از نمایش پنجره
+        self.load_first_page_in_background()
+        self.root.after_idle(self.on_main_window_shown)
         
-        # بارگذاری داده‌ها
-        self.refresh_display()
+    def on_main_window_shown(self):
+        """پس از اولین نمایش پنجره اصلی: شروع زمان‌بند یادآوری‌ها و ثبت تراکنش‌های تکرارشونده"""
+        self.profiler.mark('main_window_shown')
+        self.reminder_queue = ReminderQueue(self.ledger)
         self.check_reminders()
+        self.post_recurring_transactions()
+        
+    def post_recurring_transactions(self, reschedule=True):
+        """ثبت نوبت‌های سررسیده برنامه‌های تکرار در رشته پس‌زمینه (و دوباره پس از RECURRING_CHECK_MS)"""
+        def job(ledger, task):
+            return ledger.post_recurring()
+            
+        def done(posted):
+            if posted:
+                self.refresh_display()
+                self.set_status(fix_persian_text(f"{posted} تراکنش تکرارشونده ثبت شد"))
+                
+        self.run_in_background(job, fix_persian_text("ثبت تراکنش‌های تکرارشونده"), done,
+                               "خطا در ثبت تراکنش‌های تکرارشونده")
+        if reschedule:
+            self.root.after(self.RECURRING_CHECK_MS, self.post_recurring_transactions)
+        
+    def on_tab_changed(self, event):
+        """ساخت تب انتخاب‌شده در اولین انتخاب"""
+        tab = self.lazy_tabs.pop(event.widget.select(), None)
+        if tab is not None:
+            frame, setup_tab = tab
+            setup_tab(frame)
+            self.profiler.mark(setup_tab.__name__)
         
     def setup_main_tab(self, parent):
         """راه‌اندازی تب اصلی"""
@@ -319,27 +622,25 @@ class UltimateFinanceManager:
         ttk.Label(add_frame, text=fix_persian_text("نوع:")).grid(row=0, column=0, sticky=tk.W, pady=5)
         type_frame = ttk.Frame(add_frame)
         type_frame.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5)
-        ttk.Radiobutton(type_frame, text=fix_persian_text("درآمد"), variable=self.type_var, value=fix_persian_text("درآمد")).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Radiobutton(type_frame, text=fix_persian_text("هزینه"), variable=self.type_var, value=fix_persian_text("هزینه")).pack(side=tk.LEFT)
+        ttk.Radiobutton(type_frame, text=self.labels["درآمد"], variable=self.type_var, value=self.labels["درآمد"]).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Radiobutton(type_frame, text=self.labels["هزینه"], variable=self.type_var, value=self.labels["هزینه"]).pack(side=tk.LEFT)
         
         # مبلغ و واحد پول
         ttk.Label(add_frame, text=fix_persian_text("مبلغ:")).grid(row=1, column=0, sticky=tk.W, pady=5)
         amount_frame = ttk.Frame(add_frame)
         amount_frame.grid(row=1, column=1, sticky=(tk.W, tk.E), pady=5)
-        ttk.Entry(amount_frame, textvariable=self.amount_var, font=('Tahoma', 10), width=20).pack(side=tk.LEFT)
+        self.amount_entry = ttk.Entry(amount_frame, textvariable=self.amount_var, font=('Tahoma', 10), width=20)
+        self.amount_entry.pack(side=tk.LEFT)
         currency_combo = ttk.Combobox(amount_frame, textvariable=self.currency_var, 
-                                    values=["تومان", "دلار", "یورو"], width=10)
+                                    values=list(CURRENCY_NAMES.values()), width=10)
         currency_combo.pack(side=tk.LEFT, padx=(10, 0))
         
         # دسته‌بندی
         ttk.Label(add_frame, text=fix_persian_text("دسته:")).grid(row=2, column=0, sticky=tk.W, pady=5)
-        categories = [fix_persian_text("حقوق"), fix_persian_text("هدیه"), fix_persian_text("فروش"), 
-                     fix_persian_text("غذا"), fix_persian_text("حمل‌ونقل"), fix_persian_text("سرگرمی"), 
-                     fix_persian_text("خرید"), fix_persian_text("پزشکی"), fix_persian_text("آموزش"), 
-                     fix_persian_text("اجاره"), fix_persian_text("بیمه"), fix_persian_text("سایر")]
+        self.categories = categories = [self.labels[name] for name in CATEGORY_NAMES]
         self.category_combo = ttk.Combobox(add_frame, textvariable=self.category_var, values=categories, width=20)
         self.category_combo.grid(row=2, column=1, sticky=tk.W, pady=5)
-        self.category_combo.set(fix_persian_text("سایر"))
+        self.category_combo.set(self.labels["سایر"])
         
         # توضیحات
         ttk.Label(add_frame, text=fix_persian_text("توضیحات:")).grid(row=3, column=0, sticky=tk.W, pady=5)
@@ -348,37 +649,46 @@ class UltimateFinanceManager:
         # دکمه اضافه کردن
         ttk.Button(add_frame, text=fix_persian_text("➕ اضافه کردن تراکنش"), command=self.add_transaction).grid(row=4, column=0, columnspan=2, pady=(15, 0))
         
+        # ورود سریع: ثبت گروهی با تأخیر و پیام در نوار وضعیت به جای پنجره
+        ttk.Checkbutton(add_frame, text=fix_persian_text("⚡ ورود سریع (ثبت گروهی، بدون پیغام)"),
+                        variable=self.rapid_entry_var, command=self.flush_rapid_entries).grid(row=5, column=0, columnspan=2, pady=(5, 0))
+                        
         # فیلتر تراکنش‌ها
         filter_frame = ttk.Frame(parent)
         filter_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
         
         ttk.Label(filter_frame, text=fix_persian_text("فیلتر:")).pack(side=tk.LEFT)
         filter_combo = ttk.Combobox(filter_frame, textvariable=self.filter_var, 
-                                   values=[fix_persian_text("همه"), fix_persian_text("درآمد"), fix_persian_text("هزینه")] + categories, width=15)
+                                   values=[self.labels["همه"], self.labels["درآمد"], self.labels["هزینه"]] + categories, width=15)
         filter_combo.pack(side=tk.LEFT, padx=(10, 5))
         ttk.Button(filter_frame, text=fix_persian_text("اعمال فیلتر"), command=self.refresh_display).pack(side=tk.LEFT, padx=(5, 5))
         ttk.Button(filter_frame, text=fix_persian_text("حذف فیلتر"), command=self.clear_filter).pack(side=tk.LEFT, padx=(5, 0))
         ttk.Button(filter_frame, text="🔄", width=3, command=self.refresh_display).pack(side=tk.RIGHT, padx=(0, 5))
         
+        # جستجو در توضیحات و دسته (هم‌زمان با تایپ، با تأخیر کوتاه)
+        ttk.Entry(filter_frame, textvariable=self.search_var, font=('Tahoma', 10), width=25).pack(side=tk.RIGHT, padx=(5, 5))
+        ttk.Label(filter_frame, text=fix_persian_text("جستجو:")).pack(side=tk.RIGHT)
+        self.search_var.trace_add('write', lambda *args: self.schedule_search())
+        
         # جدول تراکنش‌ها
         table_frame = ttk.Frame(parent)
         table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         columns = (fix_persian_text('تاریخ'), fix_persian_text('نوع'), fix_persian_text('مبلغ'), 
                   fix_persian_text('دسته'), fix_persian_text('توضیحات'))
-        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=12)
+        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=12, selectmode='extended')
         
         for col in columns:
             self.tree.heading(col, text=col)
             self.tree.column(col, width=150)
             
         # اسکرول‌بارها
-        v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
         h_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll, xscrollcommand=h_scrollbar.set)
         
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
         
         # دکمه‌های عملیات
@@ -400,28 +710,31 @@ class UltimateFinanceManager:
         self.root.bind('<Return>', lambda e: self.add_transaction())
         
     def setup_goal_progress_bar(self, parent):
-        """راه‌اندازی نوار پیشرفت هدف مالی"""
-        # گرفتن هدف فعلی
-        self.cursor.execute("SELECT target_amount, current_amount FROM goals ORDER BY id DESC LIMIT 1")
-        goal_result = self.cursor.fetchone()
-        
-        if goal_result:
-            target_amount, current_amount = goal_result
-            progress = (current_amount / target_amount * 100) if target_amount > 0 else 0
+        """راه‌اندازی نوارهای پیشرفت اهداف مالی (با هر به‌روزرسانی خلاصه تازه می‌شوند)"""
+        self.goal_progress_frame = ttk.Frame(parent)
+        self.goal_progress_frame.pack(fill=tk.X, padx=5, pady=(10, 5))
+        
+    def update_goal_progress(self):
+        """نمایش پیشرفت همه اهداف؛ جمع هر هدف تا تغییر بعدی دفتر در Ledger نگه داشته می‌شود"""
+        for child in self.goal_progress_frame.winfo_children():
+            child.destroy()
             
-            # فریم پیشرفت
-            progress_frame = ttk.Frame(parent)
-            progress_frame.pack(fill=tk.X, padx=5, pady=(10, 5))
+        goals = self.ledger.goals()
+        if goals:
+            ttk.Label(self.goal_progress_frame, text=fix_persian_text("پیشرفت به اهداف مالی:")).pack(anchor=tk.W)
             
-            ttk.Label(progress_frame, text=fix_persian_text("پیشرفت به هدف مالی:")).pack(anchor=tk.W)
+        for goal_id, target_amount, current_amount, description, *_ in goals:
+            progress = (current_amount / target_amount * 100) if target_amount > 0 else 0
+            row_frame = ttk.Frame(self.goal_progress_frame)
+            row_frame.pack(fill=tk.X)
             
             # نوار پیشرفت
-            progress_bar = ttk.Progressbar(progress_frame, length=200, mode='determinate')
+            progress_bar = ttk.Progressbar(row_frame, length=200, mode='determinate')
             progress_bar['value'] = min(progress, 100)
-            progress_bar.pack(side=tk.LEFT, pady=5)
+            progress_bar.pack(side=tk.LEFT, pady=2)
             
             # درصد پیشرفت
-            progress_label = ttk.Label(progress_frame, text=f"{progress:.1f}%")
+            progress_label = ttk.Label(row_frame, text=f"{progress:.1f}% {fix_persian_text(description or '')}")
             progress_label.pack(side=tk.LEFT, padx=(10, 0))
             
     def setup_report_tab(self, parent):
@@ -433,7 +746,7 @@ class UltimateFinanceManager:
         # سال و ماه
         current_year = str(datetime.now().year)
         years = [str(y) for y in range(2020, int(current_year) + 2)]
-        months = [fix_persian_text("همه")] + [fix_persian_text(calendar.month_name[i]) for i in range(1, 13)]
+        months = [self.labels["همه"]] + [fix_persian_text(calendar.month_name[i]) for i in range(1, 13)]
         
         ttk.Label(filter_frame, text=fix_persian_text("سال:")).grid(row=0, column=0, padx=(0, 5))
         year_combo = ttk.Combobox(filter_frame, textvariable=self.year_var, values=years, width=10)
@@ -443,7 +756,7 @@ class UltimateFinanceManager:
         ttk.Label(filter_frame, text=fix_persian_text("ماه:")).grid(row=0, column=2, padx=(10, 5))
         month_combo = ttk.Combobox(filter_frame, textvariable=self.month_var, values=months, width=15)
         month_combo.grid(row=0, column=3, padx=(0, 10))
-        month_combo.set(fix_persian_text("همه"))
+        month_combo.set(self.labels["همه"])
         
         ttk.Button(filter_frame, text=fix_persian_text("نمایش گزارش"), command=self.generate_report).grid(row=0, column=4, padx=(10, 0))
         
@@ -490,6 +803,9 @@ class UltimateFinanceManager:
         
         ttk.Label(settings_frame, text=fix_persian_text("تنظیمات برنامه"), font=('Tahoma', 16, 'bold')).pack(pady=(0, 20))
         
+        # واحد پول گزارش‌ها و نرخ‌های تبدیل
+        self.setup_currency_settings(settings_frame)
+        
         # تنظیمات پشتیبان‌گیری
         backup_frame = ttk.LabelFrame(settings_frame, text=fix_persian_text("پشتیبان‌گیری و بازیابی"), padding="15")
         backup_frame.pack(fill=tk.X, pady=(0, 20))
@@ -498,6 +814,21 @@ class UltimateFinanceManager:
         ttk.Button(backup_frame, text=fix_persian_text("📤 بازیابی پشتیبان"), command=self.restore_backup).pack(side=tk.LEFT, padx=(10, 10))
         ttk.Button(backup_frame, text=fix_persian_text("🗑️ پاک کردن داده‌ها"), command=self.clear_data).pack(side=tk.LEFT, padx=(10, 0))
         
+        # پشتیبان چرخشی زمان‌دار
+        self.setup_rotating_backup_settings(settings_frame)
+        
+        # بررسی سازگاری داده‌ها
+        maintenance_frame = ttk.LabelFrame(settings_frame, text=fix_persian_text("نگهداری داده‌ها"), padding="15")
+        maintenance_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        ttk.Button(maintenance_frame, text=fix_persian_text("🧮 بررسی و بازسازی خلاصه‌ها"), command=self.verify_summary).pack(side=tk.LEFT)
+        
+        # تنظیمات ذخیره‌سازی SQLite
+        self.setup_storage_settings(settings_frame)
+        
+        # عیب‌یابی کارایی: پرس‌وجوهای پرهزینه و کند و زمان handler ها
+        self.setup_diagnostics_panel(settings_frame)
+
         # تنظیمات ظاهر
         appearance_frame = ttk.LabelFrame(settings_frame, text=fix_persian_text("تنظیمات ظاهر"), padding="15")
         appearance_frame.pack(fill=tk.X, pady=(0, 20))
@@ -533,58 +864,347 @@ class UltimateFinanceManager:
         info_label = ttk.Label(info_frame, text=info_text, justify=tk.RIGHT)
         info_label.pack(anchor=tk.W)
         
+    def currency_label(self, code):
+        """نام نمایشی شکل‌دهی‌شده یک واحد پول"""
+        name = currency_name(code)
+        return self.labels.get(name) or fix_persian_text(name)
+        
+    def setup_currency_settings(self, parent):
+        """انتخاب واحد پول گزارش‌ها و ورود نرخ‌های تبدیل از فایل CSV"""
+        currency_frame = ttk.LabelFrame(parent, text=fix_persian_text("واحد پول"), padding="15")
+        currency_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        ttk.Label(currency_frame, text=fix_persian_text("واحد پول گزارش‌ها:")).pack(side=tk.LEFT)
+        reporting_var = tk.StringVar(value=currency_name(self.reporting_currency))
+        reporting_combo = ttk.Combobox(currency_frame, textvariable=reporting_var, state="readonly", width=10)
+        reporting_combo.pack(side=tk.LEFT, padx=(5, 15))
+        
+        def update_choices():
+            # فقط واحدهایی که نرخ تبدیل دارند قابل انتخاب هستند
+            reporting_combo['values'] = [currency_name(code) for code in self.ledger.converter().currencies()]
+            
+        def change_reporting_currency(event):
+            self.reporting_currency = normalize_currency(reporting_var.get())
+            self.ledger.set_setting('currency.reporting', self.reporting_currency)
+            self.refresh_display()
+            
+        def load_rates():
+            filename = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+            if not filename:
+                return
+                
+            def job(ledger, task):
+                return ledger.load_exchange_rates(filename, progress=lambda fraction: task.report_progress(fraction),
+                                                  check_cancelled=task.check_cancelled)
+                                                  
+            def done(result):
+                rate_count, reconverted_count = result
+                update_choices()
+                self.refresh_display()
+                messagebox.showinfo(fix_persian_text("موفق"),
+                                  fix_persian_text(f"{rate_count} نرخ وارد شد و {reconverted_count} تراکنش دوباره تبدیل شد"))
+                                  
+            self.run_in_background(job, fix_persian_text("ورود نرخ‌های تبدیل"), done, "خطا در ورود نرخ‌های تبدیل")
+            
+        update_choices()
+        reporting_combo.bind('<<ComboboxSelected>>', change_reporting_currency)
+        ttk.Button(currency_frame, text=fix_persian_text("📈 ورود نرخ‌های تبدیل (CSV)"), command=load_rates).pack(side=tk.LEFT)
+        
+    def backup_filetypes(self):
+        """انواع فایل پشتیبان در پنجره‌های انتخاب فایل"""
+        filetypes = [("Database files", "*.db"), ("Compressed backups (gzip)", "*.gz")]
+        if ZSTD_AVAILABLE:
+            filetypes.append(("Compressed backups (zstd)", "*.zst"))
+        return filetypes + [("All files", "*.*")]
+    
+    def backup_compressions(self):
+        """روش‌های فشرده‌سازی قابل انتخاب برای پشتیبان چرخشی"""
+        return ["gzip", "zstd", "none"] if ZSTD_AVAILABLE else ["gzip", "none"]
+    
+    def setup_rotating_backup_settings(self, parent):
+        """فرم پشتیبان چرخشی: پوشه، تعداد نسخه‌های نگه‌داشته‌شده و فشرده‌سازی"""
+        rotation_frame = ttk.LabelFrame(parent, text=fix_persian_text("پشتیبان چرخشی"), padding="15")
+        rotation_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        directory_var = tk.StringVar(value=self.ledger.get_setting('backup.directory', BACKUP_SETTING_DEFAULTS['backup.directory']))
+        keep_var = tk.StringVar(value=self.ledger.get_setting('backup.keep', BACKUP_SETTING_DEFAULTS['backup.keep']))
+        compression_var = tk.StringVar(value=self.ledger.get_setting('backup.compression', BACKUP_SETTING_DEFAULTS['backup.compression']))
+        
+        ttk.Label(rotation_frame, text=fix_persian_text("پوشه:")).grid(row=0, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(rotation_frame, textvariable=directory_var, width=30).grid(row=0, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=2)
+        
+        def choose_directory():
+            directory = filedialog.askdirectory()
+            if directory:
+                directory_var.set(directory)
+        
+        ttk.Button(rotation_frame, text="...", width=3, command=choose_directory).grid(row=0, column=3, sticky=tk.W, padx=(5, 0))
+        
+        ttk.Label(rotation_frame, text=fix_persian_text("تعداد نسخه‌ها:")).grid(row=1, column=0, sticky=tk.W, pady=2)
+        ttk.Spinbox(rotation_frame, textvariable=keep_var, from_=1, to=1000, width=8).grid(row=1, column=1, sticky=tk.W, pady=2)
+        ttk.Label(rotation_frame, text=fix_persian_text("فشرده‌سازی:")).grid(row=1, column=2, sticky=tk.W, padx=(15, 0), pady=2)
+        ttk.Combobox(rotation_frame, textvariable=compression_var, values=self.backup_compressions(),
+                    state="readonly", width=8).grid(row=1, column=3, sticky=tk.W, pady=2)
+        
+        def run_rotating_backup():
+            try:
+                if int(keep_var.get()) < 1:
+                    raise ValueError()
+                self.ledger.set_setting('backup.directory', directory_var.get().strip() or BACKUP_SETTING_DEFAULTS['backup.directory'])
+                self.ledger.set_setting('backup.keep', int(keep_var.get()))
+                self.ledger.set_setting('backup.compression', compression_var.get())
+            except ValueError:
+                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text("تعداد نسخه‌ها باید عددی بزرگ‌تر از صفر باشد"))
+                return
+            
+            def job(ledger, task):
+                return ledger.rotate_backups(progress=lambda fraction: task.report_progress(fraction),
+                                             check_cancelled=task.check_cancelled)
+            
+            def done(result):
+                filename, removed = result
+                messagebox.showinfo(fix_persian_text("موفق"),
+                                  fix_persian_text(f"پشتیبان با موفقیت ایجاد شد:\n{filename}\n{len(removed)} پشتیبان قدیمی حذف شد"))
+            
+            self.run_in_background(job, fix_persian_text("پشتیبان چرخشی"), done, "خطا در ایجاد پشتیبان")
+        
+        ttk.Button(rotation_frame, text=fix_persian_text("🔁 ذخیره تنظیمات و پشتیبان‌گیری"),
+                  command=run_rotating_backup).grid(row=2, column=0, columnspan=4, sticky=tk.W, pady=(8, 0))
+    
+    def setup_storage_settings(self, parent):
+        """فرم پروفایل ذخیره‌سازی SQLite (ژورنال، همگام‌سازی، کش و نگاشت حافظه)"""
+        storage_frame = ttk.LabelFrame(parent, text=fix_persian_text("ذخیره‌سازی دیتابیس"), padding="15")
+        storage_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        profile = self.ledger.storage_profile
+        journal_var = tk.StringVar(value=profile['journal_mode'])
+        synchronous_var = tk.StringVar(value=profile['synchronous'])
+        cache_var = tk.StringVar(value=str(profile['cache_size_kb']))
+        mmap_var = tk.StringVar(value=str(profile['mmap_size_mb']))
+        statements_var = tk.StringVar(value=str(profile['cached_statements']))
+        
+        ttk.Label(storage_frame, text=fix_persian_text("حالت ژورنال:")).grid(row=0, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(storage_frame, textvariable=journal_var, values=JOURNAL_MODES, 
+                    state="readonly", width=10).grid(row=0, column=1, sticky=tk.W, pady=2)
+        ttk.Label(storage_frame, text=fix_persian_text("همگام‌سازی:")).grid(row=0, column=2, sticky=tk.W, padx=(15, 0), pady=2)
+        ttk.Combobox(storage_frame, textvariable=synchronous_var, values=SYNCHRONOUS_LEVELS, 
+                    state="readonly", width=10).grid(row=0, column=3, sticky=tk.W, pady=2)
+        
+        ttk.Label(storage_frame, text=fix_persian_text("کش صفحه (KB):")).grid(row=1, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(storage_frame, textvariable=cache_var, width=10).grid(row=1, column=1, sticky=tk.W, pady=2)
+        ttk.Label(storage_frame, text=fix_persian_text("نگاشت حافظه (MB):")).grid(row=1, column=2, sticky=tk.W, padx=(15, 0), pady=2)
+        ttk.Entry(storage_frame, textvariable=mmap_var, width=10).grid(row=1, column=3, sticky=tk.W, pady=2)
+        ttk.Label(storage_frame, text=fix_persian_text("دستورهای آماده:")).grid(row=2, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(storage_frame, textvariable=statements_var, width=10).grid(row=2, column=1, sticky=tk.W, pady=2)
+        
+        status_label = ttk.Label(storage_frame, foreground="gray")
+        status_label.grid(row=3, column=0, columnspan=4, sticky=tk.W, pady=(8, 0))
+        
+        def show_status():
+            status = self.ledger.storage_status()
+            status_label.config(text=f"journal_mode={status['journal_mode']}  synchronous={status['synchronous']}  "
+                                     f"cache_size={status['cache_size']}  mmap_size={status['mmap_size']}")
+            
+        def apply_preset(name):
+            preset = STORAGE_PRESETS[name]
+            journal_var.set(preset['journal_mode'])
+            synchronous_var.set(preset['synchronous'])
+            cache_var.set(str(preset['cache_size_kb']))
+            mmap_var.set(str(preset['mmap_size_mb']))
+            statements_var.set(str(preset['cached_statements']))
+            
+        def save_storage_profile():
+            try:
+                self.ledger.set_storage_profile({
+                    'journal_mode': journal_var.get(),
+                    'synchronous': synchronous_var.get(),
+                    'cache_size_kb': cache_var.get(),
+                    'mmap_size_mb': mmap_var.get(),
+                    'cached_statements': statements_var.get(),
+                })
+                # اتصال رشته پس‌زمینه هم با پروفایل جدید باز می‌شود
+                self.worker.submit(lambda ledger, task: ledger.reopen())
+                show_status()
+                message = "تنظیمات ذخیره‌سازی اعمال شد"
+                if self.ledger.storage_status()['journal_mode'] != journal_var.get():
+                    message += "\nحالت ژورنال پس از اجرای دوباره برنامه تغییر می‌کند"
+                messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text(message))
+                
+            except ValueError:
+                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text("لطفاً اعداد را به درستی وارد کنید"))
+            except Exception as e:
+                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در اعمال تنظیمات: {str(e)}"))
+                
+        button_frame = ttk.Frame(storage_frame)
+        button_frame.grid(row=4, column=0, columnspan=4, sticky=tk.W, pady=(8, 0))
+        ttk.Button(button_frame, text=fix_persian_text("سریع (WAL)"), command=lambda: apply_preset('tuned')).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text=fix_persian_text("ایمن (پیش‌فرض SQLite)"), command=lambda: apply_preset('safe')).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text=fix_persian_text("ذخیره تنظیمات"), command=save_storage_profile).pack(side=tk.LEFT)
+        
+        show_status()
+        
+    def diagnostics_report(self):
+        """متن پنل عیب‌یابی از روی QUERY_LOG، HANDLER_STATS و کش نتایج"""
+        lines = [fix_persian_text("⏱️ زمان handler ها (میلی‌ثانیه):")]
+        lines += HANDLER_STATS.report_lines(10)
+        lines += ["", fix_persian_text("🗃️ کش نتایج گزارش‌ها و آنالیزها:")]
+        lines += self.result_cache.report_lines()
+        lines += ["", fix_persian_text("🐢 پرهزینه‌ترین پرس‌وجوها (بر اساس جمع زمان):")]
+        lines += QUERY_LOG.stats.report_lines(10)
+        lines += ["", fix_persian_text(f"📋 پرس‌وجوهای کندتر از {QUERY_LOG.slow_ms:g} میلی‌ثانیه (جدیدترین اول):")]
+        lines += QUERY_LOG.slow_query_lines(10) or [fix_persian_text("موردی ثبت نشده است")]
+        return "\n".join(lines)
+        
+    def setup_diagnostics_panel(self, parent):
+        """پنل عیب‌یابی کارایی در تب تنظیمات"""
+        diagnostics_frame = ttk.LabelFrame(parent, text=fix_persian_text("عیب‌یابی کارایی"), padding="15")
+        diagnostics_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        controls_frame = ttk.Frame(diagnostics_frame)
+        controls_frame.pack(fill=tk.X)
+        threshold_var = tk.StringVar(value=f"{QUERY_LOG.slow_ms:g}")
+        ttk.Label(controls_frame, text=fix_persian_text("آستانه پرس‌وجوی کند (ms):")).pack(side=tk.LEFT)
+        ttk.Spinbox(controls_frame, textvariable=threshold_var, from_=1, to=10000, width=7).pack(side=tk.LEFT, padx=(5, 10))
+        
+        # ذخیره کش نتایج روی دیسک هنگام خروج
+        cache_frame = ttk.Frame(diagnostics_frame)
+        cache_frame.pack(fill=tk.X, pady=(8, 0))
+        persist_var = tk.BooleanVar(value=self.ledger.get_setting('cache.persist', '1') == '1')
+        
+        def save_persist_setting():
+            self.ledger.set_setting('cache.persist', '1' if persist_var.get() else '0')
+            if not persist_var.get():
+                remove_if_exists(self.result_cache_path)
+                
+        def clear_result_cache():
+            self.result_cache.clear()
+            remove_if_exists(self.result_cache_path)
+            show_report()
+            
+        ttk.Checkbutton(cache_frame, text=fix_persian_text("ذخیره نتایج گزارش‌ها روی دیسک"), variable=persist_var,
+                       command=save_persist_setting).pack(side=tk.LEFT)
+        ttk.Button(cache_frame, text=fix_persian_text("خالی کردن کش نتایج"), command=clear_result_cache).pack(side=tk.LEFT, padx=(10, 0))
+        
+        text_frame = ttk.Frame(diagnostics_frame)
+        text_frame.pack(fill=tk.BOTH, expand=True, pady=(8, 0))
+        diagnostics_text = tk.Text(text_frame, height=12, wrap=tk.NONE, font=('Courier', 9))
+        y_scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=diagnostics_text.yview)
+        x_scrollbar = ttk.Scrollbar(text_frame, orient=tk.HORIZONTAL, command=diagnostics_text.xview)
+        diagnostics_text.configure(yscrollcommand=y_scrollbar.set, xscrollcommand=x_scrollbar.set)
+        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        diagnostics_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        def show_report():
+            try:
+                QUERY_LOG.slow_ms = float(threshold_var.get())
+            except ValueError:
+                threshold_var.set(f"{QUERY_LOG.slow_ms:g}")
+            diagnostics_text.delete(1.0, tk.END)
+            diagnostics_text.insert(tk.END, self.diagnostics_report())
+            
+        def reset_stats():
+            QUERY_LOG.reset()
+            HANDLER_STATS.reset()
+            self.result_cache.reset_stats()
+            show_report()
+            
+        def save_report():
+            filename = filedialog.asksaveasfilename(
+                defaultextension=".txt",
+                filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+                initialfile=f"diagnostics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            )
+            if filename:
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(self.diagnostics_report())
+                    
+        ttk.Button(controls_frame, text=fix_persian_text("🔄 به‌روزرسانی"), command=show_report).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(controls_frame, text=fix_persian_text("پاک کردن آمار"), command=reset_stats).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(controls_frame, text=fix_persian_text("💾 ذخیره گزارش"), command=save_report).pack(side=tk.LEFT)
+        
+        show_report()
+        
     def show_goals_window(self):
         """نمایش پنجره اهداف مالی"""
         goals_window = tk.Toplevel(self.root)
         goals_window.title(fix_persian_text("اهداف مالی"))
-        goals_window.geometry("500x400")
+        goals_window.geometry("700x550")
         goals_window.transient(self.root)
         goals_window.grab_set()
         
         # فرم اهداف
         form_frame = ttk.LabelFrame(goals_window, text=fix_persian_text("تعریف هدف جدید"), padding="15")
         form_frame.pack(fill=tk.X, padx=10, pady=10)
+        form_frame.columnconfigure(1, weight=1)
         
         ttk.Label(form_frame, text=fix_persian_text("مبلغ هدف:")).grid(row=0, column=0, sticky=tk.W, pady=5)
         ttk.Entry(form_frame, textvariable=self.goal_amount_var).grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5)
         
         ttk.Label(form_frame, text=fix_persian_text("واحد پول:")).grid(row=1, column=0, sticky=tk.W, pady=5)
-        currency_combo = ttk.Combobox(form_frame, textvariable=self.currency_var, 
-                                    values=["تومان", "دلار", "یورو"], width=15)
+        goal_currency_var = tk.StringVar(value=CURRENCY_NAMES[BASE_CURRENCY])
+        currency_combo = ttk.Combobox(form_frame, textvariable=goal_currency_var, 
+                                    values=list(CURRENCY_NAMES.values()), width=15)
         currency_combo.grid(row=1, column=1, sticky=tk.W, pady=5)
-        currency_combo.set("تومان")
         
         ttk.Label(form_frame, text=fix_persian_text("توضیحات:")).grid(row=2, column=0, sticky=tk.W, pady=5)
         goal_desc_var = tk.StringVar()
         ttk.Entry(form_frame, textvariable=goal_desc_var).grid(row=2, column=1, sticky=(tk.W, tk.E), pady=5)
         
+        # پیشرفت هدف: جمع تراکنش‌های یک نوع (و اختیاری یک دسته) در بازه شروع تا سررسید
+        ttk.Label(form_frame, text=fix_persian_text("نوع:")).grid(row=3, column=0, sticky=tk.W, pady=5)
+        goal_type_var = tk.StringVar(value=self.labels["درآمد"])
+        ttk.Combobox(form_frame, textvariable=goal_type_var, values=[self.labels["درآمد"], self.labels["هزینه"]],
+                    state="readonly", width=15).grid(row=3, column=1, sticky=tk.W, pady=5)
+                    
+        ttk.Label(form_frame, text=fix_persian_text("دسته‌بندی:")).grid(row=4, column=0, sticky=tk.W, pady=5)
+        goal_category_var = tk.StringVar(value=self.labels["همه"])
+        ttk.Combobox(form_frame, textvariable=goal_category_var, values=[self.labels["همه"]] + self.categories,
+                    state="readonly", width=15).grid(row=4, column=1, sticky=tk.W, pady=5)
+                    
+        ttk.Label(form_frame, text=fix_persian_text("از تاریخ (YYYY-MM-DD):")).grid(row=5, column=0, sticky=tk.W, pady=5)
+        goal_start_var = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
+        ttk.Entry(form_frame, textvariable=goal_start_var, width=15).grid(row=5, column=1, sticky=tk.W, pady=5)
+        
+        ttk.Label(form_frame, text=fix_persian_text("سررسید (اختیاری):")).grid(row=6, column=0, sticky=tk.W, pady=5)
+        goal_deadline_var = tk.StringVar()
+        ttk.Entry(form_frame, textvariable=goal_deadline_var, width=15).grid(row=6, column=1, sticky=tk.W, pady=5)
+        
         def save_goal():
             try:
                 target_amount = float(self.goal_amount_var.get())
-                description = goal_desc_var.get()
-                created_date = datetime.now().strftime("%Y-%m-%d")
-                
-                self.cursor.execute('''
-                    INSERT INTO goals (target_amount, current_amount, description, created_date)
-                    VALUES (?, 0, ?, ?)
-                ''', (target_amount, description, created_date))
-                
-                self.conn.commit()
-                messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("هدف مالی با موفقیت اضافه شد"))
-                goals_window.destroy()
-                self.refresh_display()
-                
+                if target_amount <= 0:
+                    raise ValueError()
             except ValueError:
                 messagebox.showerror(fix_persian_text("خطا"), fix_persian_text("لطفاً مبلغ را به درستی وارد کنید"))
-        
-        ttk.Button(form_frame, text=fix_persian_text("ذخیره هدف"), command=save_goal).grid(row=3, column=0, columnspan=2, pady=10)
+                return
+                
+            category = goal_category_var.get()
+            try:
+                self.ledger.add_goal(target_amount, goal_desc_var.get(),
+                                     deadline=goal_deadline_var.get().strip() or None,
+                                     currency=normalize_currency(goal_currency_var.get()),
+                                     trans_type=goal_type_var.get(),
+                                     category=None if category == self.labels["همه"] else category,
+                                     start_date=goal_start_var.get().strip() or None)
+            except (MissingExchangeRate, ValueError) as e:
+                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(str(e)))
+                return
+                
+            self.goal_amount_var.set("")
+            goal_desc_var.set("")
+            load_goals()
+            self.update_goal_progress()
+            
+        ttk.Button(form_frame, text=fix_persian_text("ذخیره هدف"), command=save_goal).grid(row=7, column=0, columnspan=2, pady=10)
         
         # لیست اهداف فعلی
         list_frame = ttk.LabelFrame(goals_window, text=fix_persian_text("اهداف فعلی"), padding="10")
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # جدول اهداف
-        columns = (fix_persian_text('توضیحات'), fix_persian_text('هدف'), fix_persian_text('پیشرفت'), fix_persian_text('درصد'))
+        columns = (fix_persian_text('توضیحات'), fix_persian_text('فیلتر'), fix_persian_text('بازه'),
+                   fix_persian_text('هدف'), fix_persian_text('پیشرفت'), fix_persian_text('درصد'))
         goals_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=8)
         
         for col in columns:
@@ -599,17 +1219,34 @@ class UltimateFinanceManager:
         goals_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # بارگذاری اهداف
-        self.cursor.execute("SELECT id, target_amount, current_amount, description FROM goals ORDER BY id DESC")
-        goals = self.cursor.fetchall()
-        
-        for goal in goals:
-            goal_id, target_amount, current_amount, description = goal
-            progress = current_amount
-            percentage = (current_amount / target_amount * 100) if target_amount > 0 else 0
-            formatted_target = f"{target_amount:,.0f} تومان"
-            formatted_progress = f"{progress:,.0f} تومان"
-            formatted_percentage = f"{percentage:.1f}%"
-            goals_tree.insert('', tk.END, values=(description, formatted_target, formatted_progress, formatted_percentage))
+        def load_goals():
+            goals_tree.delete(*goals_tree.get_children())
+            for goal in self.ledger.goals():
+                goal_id, target_amount, current_amount, description, currency, trans_type, category, start_date, deadline = goal
+                percentage = (current_amount / target_amount * 100) if target_amount > 0 else 0
+                currency_label = self.currency_label(currency)
+                formatted_filter = f"{trans_type} / {category}" if category else trans_type
+                formatted_window = f"{start_date} - {deadline or '...'}"
+                formatted_target = f"{target_amount:,.0f} {currency_label}"
+                formatted_progress = f"{current_amount:,.0f} {currency_label}"
+                formatted_percentage = f"{percentage:.1f}%"
+                goals_tree.insert('', tk.END, iid=str(goal_id),
+                                  values=(description, formatted_filter, formatted_window, formatted_target,
+                                          formatted_progress, formatted_percentage))
+                                          
+        def delete_goal():
+            selected = goals_tree.selection()
+            if not selected:
+                messagebox.showwarning(fix_persian_text("هشدار"), fix_persian_text("لطفاً یک هدف انتخاب کنید"))
+                return
+            if messagebox.askyesno(fix_persian_text("تأیید"), fix_persian_text("آیا از حذف هدف انتخاب‌شده مطمئن هستید؟")):
+                for goal_id in selected:
+                    self.ledger.delete_goal(int(goal_id))
+                load_goals()
+                self.update_goal_progress()
+                
+        ttk.Button(goals_window, text=fix_persian_text("🗑️ حذف هدف"), command=delete_goal).pack(pady=(0, 10))
+        load_goals()
         
     def show_reminders_window(self):
         """نمایش پنجره یادآوری‌ها"""
@@ -634,15 +1271,9 @@ class UltimateFinanceManager:
             try:
                 description = self.reminder_desc_var.get()
                 date = self.reminder_date_var.get()
-                # بررسی فرمت تاریخ
-                datetime.strptime(date, "%Y-%m-%d")
-                
-                self.cursor.execute('''
-                    INSERT INTO reminders (description, date, completed)
-                    VALUES (?, ?, 0)
-                ''', (description, date))
-                
-                self.conn.commit()
+                # فرمت تاریخ در Ledger بررسی می‌شود (ValueError)
+                self.ledger.add_reminder(description, date)
+                self.reload_reminders()
                 messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("یادآوری با موفقیت اضافه شد"))
                 self.reminder_desc_var.set("")
                 self.reminder_date_var.set("")
@@ -678,8 +1309,7 @@ class UltimateFinanceManager:
                 reminders_tree.delete(item)
                 
             # بارگذاری یادآوری‌ها
-            self.cursor.execute("SELECT id, description, date, completed FROM reminders ORDER BY date")
-            reminders = self.cursor.fetchall()
+            reminders = self.ledger.reminders()
             
             for reminder in reminders:
                 reminder_id, description, date, completed = reminder
@@ -696,8 +1326,8 @@ class UltimateFinanceManager:
                 item = reminders_tree.item(selected[0])
                 reminder_id = reminders_tree.item(selected[0])['tags'][0]
                 
-                self.cursor.execute("UPDATE reminders SET completed = 1 WHERE id = ?", (reminder_id,))
-                self.conn.commit()
+                self.ledger.complete_reminder(reminder_id)
+                self.reload_reminders()
                 load_reminders()
                 messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("یادآوری به عنوان انجام شده علامت گذاری شد"))
             else:
@@ -709,8 +1339,8 @@ class UltimateFinanceManager:
                 if messagebox.askyesno(fix_persian_text("تأیید"), fix_persian_text("آیا از حذف این یادآوری مطمئن هستید؟")):
                     reminder_id = reminders_tree.item(selected[0])['tags'][0]
                     
-                    self.cursor.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
-                    self.conn.commit()
+                    self.ledger.delete_reminder(reminder_id)
+                    self.reload_reminders()
                     load_reminders()
                     messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("یادآوری با موفقیت حذف شد"))
             else:
@@ -726,16 +1356,184 @@ class UltimateFinanceManager:
         # بارگذاری یادآوری‌ها
         load_reminders()
         
+    def show_recurring_window(self):
+        """نمایش پنجره تراکنش‌های تکرارشونده"""
+        recurring_window = tk.Toplevel(self.root)
+        recurring_window.title(fix_persian_text("تراکنش‌های تکرارشونده"))
+        recurring_window.geometry("700x550")
+        recurring_window.transient(self.root)
+        recurring_window.grab_set()
+        
+        # فرم برنامه تکرار
+        form_frame = ttk.LabelFrame(recurring_window, text=fix_persian_text("تعریف تراکنش تکرارشونده"), padding="15")
+        form_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        type_var = tk.StringVar(value=self.labels["هزینه"])
+        amount_var = tk.StringVar()
+        currency_var = tk.StringVar(value=CURRENCY_NAMES[BASE_CURRENCY])
+        category_var = tk.StringVar(value=self.labels["اجاره"])
+        desc_var = tk.StringVar()
+        rule_names = {fix_persian_text(name): rule for rule, name in RECURRENCE_RULES.items()}
+        rule_var = tk.StringVar(value=fix_persian_text(RECURRENCE_RULES['monthly']))
+        interval_var = tk.StringVar(value="1")
+        start_var = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
+        end_var = tk.StringVar()
+        
+        ttk.Label(form_frame, text=fix_persian_text("نوع:")).grid(row=0, column=0, sticky=tk.W, pady=3)
+        type_frame = ttk.Frame(form_frame)
+        type_frame.grid(row=0, column=1, columnspan=3, sticky=tk.W, pady=3)
+        ttk.Radiobutton(type_frame, text=self.labels["درآمد"], variable=type_var, value=self.labels["درآمد"]).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Radiobutton(type_frame, text=self.labels["هزینه"], variable=type_var, value=self.labels["هزینه"]).pack(side=tk.LEFT)
+        
+        ttk.Label(form_frame, text=fix_persian_text("مبلغ:")).grid(row=1, column=0, sticky=tk.W, pady=3)
+        ttk.Entry(form_frame, textvariable=amount_var, width=15).grid(row=1, column=1, sticky=tk.W, pady=3)
+        ttk.Combobox(form_frame, textvariable=currency_var, values=list(CURRENCY_NAMES.values()),
+                     width=8).grid(row=1, column=2, sticky=tk.W, padx=(5, 0), pady=3)
+                     
+        ttk.Label(form_frame, text=fix_persian_text("دسته:")).grid(row=2, column=0, sticky=tk.W, pady=3)
+        ttk.Combobox(form_frame, textvariable=category_var, values=[self.labels[name] for name in CATEGORY_NAMES],
+                     width=15).grid(row=2, column=1, sticky=tk.W, pady=3)
+        ttk.Label(form_frame, text=fix_persian_text("توضیحات:")).grid(row=2, column=2, sticky=tk.W, padx=(5, 0), pady=3)
+        ttk.Entry(form_frame, textvariable=desc_var, width=20).grid(row=2, column=3, sticky=(tk.W, tk.E), pady=3)
+        
+        ttk.Label(form_frame, text=fix_persian_text("تکرار:")).grid(row=3, column=0, sticky=tk.W, pady=3)
+        ttk.Combobox(form_frame, textvariable=rule_var, values=list(rule_names), state="readonly",
+                     width=12).grid(row=3, column=1, sticky=tk.W, pady=3)
+        ttk.Label(form_frame, text=fix_persian_text("هر چند بار:")).grid(row=3, column=2, sticky=tk.W, padx=(5, 0), pady=3)
+        ttk.Spinbox(form_frame, textvariable=interval_var, from_=1, to=365, width=6).grid(row=3, column=3, sticky=tk.W, pady=3)
+        
+        ttk.Label(form_frame, text=fix_persian_text("شروع:")).grid(row=4, column=0, sticky=tk.W, pady=3)
+        ttk.Entry(form_frame, textvariable=start_var, width=15).grid(row=4, column=1, sticky=tk.W, pady=3)
+        ttk.Label(form_frame, text=fix_persian_text("پایان (اختیاری):")).grid(row=4, column=2, sticky=tk.W, padx=(5, 0), pady=3)
+        ttk.Entry(form_frame, textvariable=end_var, width=15).grid(row=4, column=3, sticky=tk.W, pady=3)
+        ttk.Label(form_frame, text=fix_persian_text("(فرمت: YYYY-MM-DD)")).grid(row=5, column=1, columnspan=3, sticky=tk.W)
+        
+        def save_schedule():
+            try:
+                self.ledger.add_schedule(type_var.get(), amount_var.get().strip(), rule_names[rule_var.get()],
+                                         start_var.get().strip(), desc_var.get(), category_var.get(),
+                                         currency=normalize_currency(currency_var.get()),
+                                         end_date=end_var.get().strip() or None, interval=interval_var.get())
+                amount_var.set("")
+                desc_var.set("")
+                load_schedules()
+                # نوبت‌های گذشته همین حالا ثبت می‌شوند
+                self.post_recurring_transactions(reschedule=False)
+                
+            except MissingExchangeRate as e:
+                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(str(e)))
+            except ValueError:
+                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text("لطفاً مبلغ، فاصله و تاریخ‌ها را به درستی وارد کنید"))
+                
+        ttk.Button(form_frame, text=fix_persian_text("ذخیره برنامه"), command=save_schedule).grid(row=6, column=0, columnspan=4, pady=10)
+        
+        # لیست برنامه‌ها
+        list_frame = ttk.LabelFrame(recurring_window, text=fix_persian_text("برنامه‌های فعال"), padding="10")
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        columns = (fix_persian_text('توضیحات'), fix_persian_text('نوع'), fix_persian_text('مبلغ'),
+                   fix_persian_text('تکرار'), fix_persian_text('نوبت بعدی'), fix_persian_text('پایان'))
+        schedules_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=8)
+        
+        for col in columns:
+            schedules_tree.heading(col, text=col)
+            schedules_tree.column(col, width=100)
+            
+        schedules_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=schedules_tree.yview)
+        schedules_tree.configure(yscrollcommand=schedules_scrollbar.set)
+        
+        schedules_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        schedules_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        def load_schedules():
+            schedules_tree.delete(*schedules_tree.get_children())
+            for (schedule_id, trans_type, amount, description, category, currency,
+                 rule, interval, start_date, end_date, next_date) in self.ledger.schedules():
+                rule_text = fix_persian_text(RECURRENCE_RULES[rule] if interval == 1
+                                             else f"{RECURRENCE_RULES[rule]} (هر {interval})")
+                schedules_tree.insert('', tk.END, iid=str(schedule_id), values=(
+                    description or category, trans_type, f"{amount:,.0f} {self.currency_label(currency)}",
+                    rule_text, next_date, end_date or "-"))
+                    
+        def delete_schedule():
+            selected = schedules_tree.selection()
+            if not selected:
+                messagebox.showwarning(fix_persian_text("هشدار"), fix_persian_text("لطفاً یک برنامه را انتخاب کنید"))
+                return
+            if messagebox.askyesno(fix_persian_text("تأیید"), fix_persian_text("آیا از حذف این برنامه مطمئن هستید؟ تراکنش‌های ثبت‌شده می‌مانند.")):
+                self.ledger.delete_schedule(int(selected[0]))
+                load_schedules()
+                
+        button_frame = ttk.Frame(recurring_window)
+        button_frame.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Button(button_frame, text=fix_persian_text("حذف برنامه"), command=delete_schedule).pack(side=tk.LEFT)
+        
+        load_schedules()
+        
     def check_reminders(self):
-        """بررسی یادآوری‌های امروز"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        self.cursor.execute("SELECT description FROM reminders WHERE date = ? AND completed = 0", (today,))
-        reminders = self.cursor.fetchall()
+        """نمایش یادآوری‌های سررسیده (همراه عقب‌افتاده‌ها) و زمان‌بندی بیدار شدن بعدی"""
+        self.reminder_after_id = None
+        due = self.reminder_queue.pop_due()
+        if due:
+            # یادآوری‌هایی که در این فاصله انجام، حذف یا معوق شده‌اند کنار گذاشته می‌شوند
+            pending = self.ledger.pending_reminder_ids([reminder_id for due_epoch, reminder_id, description in due])
+            due = [row for row in due if row[1] in pending]
+        if due:
+            self.show_due_reminders(due)
+        self.schedule_reminder_check()
+        
+    def schedule_reminder_check(self):
+        """زمان‌سنج فقط برای سررسید نزدیک‌ترین یادآوری؛ بدون یادآوری، زمان‌سنجی هم نیست"""
+        if self.reminder_after_id is not None:
+            self.root.after_cancel(self.reminder_after_id)
+            self.reminder_after_id = None
+        due_epoch = self.reminder_queue.next_due()
+        if due_epoch is None:
+            return
+        delay_ms = min(max(due_epoch - wall_clock_epoch(), 0) * 1000, self.REMINDER_MAX_SLEEP_MS)
+        self.reminder_after_id = self.root.after(delay_ms, self.check_reminders)
         
-        if reminders:
-            reminder_list = "\n".join([r[0] for r in reminders])
-            messagebox.showinfo(fix_persian_text("یادآوری"), 
-                              fix_persian_text(f"یادآوری‌های امروز:\n{reminder_list}"))
+    def reload_reminders(self):
+        """خواندن دوباره صف یادآوری‌ها پس از تغییر آن‌ها و زمان‌بندی دوباره"""
+        if self.reminder_queue is None:
+            return
+        self.reminder_queue.reload()
+        self.schedule_reminder_check()
+        
+    def show_due_reminders(self, due):
+        """پنجره یادآوری‌های سررسیده با گزینه‌های انجام شد و تعویق"""
+        reminder_ids = [reminder_id for due_epoch, reminder_id, description in due]
+        lines = [f"• {description}" for due_epoch, reminder_id, description in due[:self.REMINDER_DIALOG_LIMIT]]
+        if len(due) > self.REMINDER_DIALOG_LIMIT:
+            lines.append(f"... و {len(due) - self.REMINDER_DIALOG_LIMIT} یادآوری دیگر")
+            
+        reminder_window = tk.Toplevel(self.root)
+        reminder_window.title(fix_persian_text("یادآوری"))
+        reminder_window.transient(self.root)
+        
+        ttk.Label(reminder_window, text=fix_persian_text("یادآوری‌های سررسیده:\n" + "\n".join(lines)),
+                  justify=tk.RIGHT, padding="15").pack(fill=tk.BOTH, expand=True)
+                  
+        def complete():
+            self.ledger.complete_reminders(reminder_ids)
+            self.reload_reminders()
+            reminder_window.destroy()
+            
+        def snooze(until_epoch):
+            self.ledger.snooze_reminders(reminder_ids, until_epoch)
+            self.reload_reminders()
+            reminder_window.destroy()
+            
+        tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        button_frame = ttk.Frame(reminder_window, padding="10")
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text=fix_persian_text("✔ انجام شد"), command=complete).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text=fix_persian_text("⏰ یک ساعت بعد"),
+                   command=lambda: snooze(wall_clock_epoch() + self.REMINDER_SNOOZE_SECONDS)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text=fix_persian_text("📅 فردا"),
+                   command=lambda: snooze(wall_clock_epoch(tomorrow))).pack(side=tk.LEFT, padx=5)
+        # بستن بدون انتخاب: یادآوری عقب‌افتاده می‌ماند و در اجرای بعدی دوباره نمایش داده می‌شود
+        ttk.Button(button_frame, text=fix_persian_text("بستن"), command=reminder_window.destroy).pack(side=tk.RIGHT)
         
     def change_password(self):
         """تغییر رمز عبور"""
@@ -757,8 +1555,8 @@ class UltimateFinanceManager:
             old_pass = old_password.get()
             new_pass = new_password.get()
             
-            if self.check_password(old_pass):
-                self.set_password(new_pass)
+            if self.ledger.check_password(old_pass):
+                self.ledger.set_password(new_pass)
                 messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("رمز عبور با موفقیت تغییر کرد"))
                 password_window.destroy()
             else:
@@ -769,136 +1567,376 @@ class UltimateFinanceManager:
     def add_transaction(self):
         """اضافه کردن تراکنش جدید"""
         try:
-            amount = float(self.amount_var.get())
-            if amount <= 0:
-                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text("مبلغ باید بیشتر از صفر باشد"))
+            amount_text = self.amount_var.get().strip()
+            if float(amount_text.replace(',', '')) <= 0:
+                self.show_entry_error("مبلغ باید بیشتر از صفر باشد")
                 return
-                
-            transaction = (
-                datetime.now().strftime("%Y-%m-%d %H:%M"),
-                self.type_var.get(),
-                amount,
-                self.desc_var.get(),
-                self.category_var.get()
-            )
+            currency = normalize_currency(self.currency_var.get())
             
-            self.cursor.execute('''
-                INSERT INTO transactions (date, type, amount, description, category)
-                VALUES (?, ?, ?, ?, ?)
-            ''', transaction)
-            
-            self.conn.commit()
-            
-            # به‌روزرسانی پیشرفت هدف مالی
-            if self.type_var.get() == fix_persian_text("درآمد"):
-                self.cursor.execute("SELECT id, current_amount FROM goals ORDER BY id DESC LIMIT 1")
-                goal_result = self.cursor.fetchone()
-                if goal_result:
-                    goal_id, current_amount = goal_result
-                    new_amount = current_amount + amount
-                    self.cursor.execute("UPDATE goals SET current_amount = ? WHERE id = ?", (new_amount, goal_id))
-                    self.conn.commit()
+            if self.rapid_entry_var.get():
+                self.queue_rapid_entry(amount_text, currency)
+                return
+                
+            # ثبت تراکنش؛ متن مبلغ بدون گذر از float
+            # و بدون خطای اعشاری به واحد کوچک تبدیل می‌شود و مبلغ پایه با نرخ امروز محاسبه می‌شود
+            self.ledger.add_transaction(self.type_var.get(), amount_text, self.desc_var.get(), self.category_var.get(),
+                                        currency=currency)
             
             self.refresh_display()
             
             # پاک کردن فیلدها
             self.amount_var.set("")
             self.desc_var.set("")
-            self.category_var.set(fix_persian_text("سایر"))
+            self.category_var.set(self.labels["سایر"])
             
             # نمایش پیام موفقیت
             messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("تراکنش با موفقیت اضافه شد"))
             
+        except MissingExchangeRate as e:
+            self.show_entry_error(f"{e}؛ ابتدا نرخ‌های تبدیل را از تنظیمات وارد کنید")
         except ValueError:
-            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text("لطفاً مبلغ را به درستی وارد کنید"))
+            self.show_entry_error("لطفاً مبلغ و واحد پول را به درستی وارد کنید")
         except Exception as e:
-            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطایی رخ داد: {str(e)}"))
+            self.show_entry_error(f"خطایی رخ داد: {str(e)}")
             
-    def refresh_display(self):
-        """به‌روزرسانی نمایش تراکنش‌ها"""
-        # پاک کردن لیست
-        for item in self.tree.get_children():
+    def show_entry_error(self, message):
+        """خطای فرم تراکنش: در ورود سریع در نوار وضعیت (بدون پنجره)، وگرنه در پنجره خطا"""
+        if self.rapid_entry_var.get():
+            self.set_status(fix_persian_text(f"⚠️ {message}"))
+            self.root.bell()
+        else:
+            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(message))
+            
+    def queue_rapid_entry(self, amount_text, currency):
+        """ورود سریع: افزودن تراکنش به صف و به‌روزرسانی افزایشی جدول و کارت‌های خلاصه"""
+        row = self.ledger.queue_transaction(self.type_var.get(), amount_text, self.desc_var.get(),
+                                            self.category_var.get(), currency=currency)
+        date, date_epoch, year, month, trans_type, amount_minor, description, category = row[:8]
+        
+        # ردیف تازه (جدیدترین تراکنش) فقط وقتی صفحه اول نمایش داده می‌شود و با فیلتر جور است
+        filters = self.build_transactions_filter()
+        item = None
+        if (not self.has_more_above and 'search' not in filters
+                and filters.get('trans_type', trans_type) == trans_type
+                and filters.get('category', category) == category):
+            if not self.loaded_pages:
+                self.loaded_pages.append({'items': [], 'first_key': None, 'last_key': None})
+            item = self.tree.insert('', 0, values=self.transaction_values(
+                date, trans_type, from_minor_units(amount_minor), description, category, currency))
+            self.loaded_pages[0]['items'].insert(0, item)
+        self.pending_items.append(item)
+        
+        # کارت‌های خلاصه بدون خواندن دوباره جمع‌ها
+        if self.summary_totals is not None:
+            income, expense = self.summary_totals
+            amount = self.ledger.summary_amount(row, self.reporting_currency)
+            if trans_type == self.labels["درآمد"]:
+                income += amount
+            elif trans_type == self.labels["هزینه"]:
+                expense += amount
+            self.render_summary(income, expense)
+            
+        # آماده شدن فرم برای تراکنش بعدی (نوع، دسته و واحد پول می‌مانند)
+        self.amount_var.set("")
+        self.desc_var.set("")
+        self.amount_entry.focus_set()
+        
+        pending_count = len(self.ledger.pending_transactions)
+        self.set_status(fix_persian_text(f"✔ تراکنش اضافه شد ({pending_count} در صف ثبت)"))
+        if pending_count >= self.RAPID_ENTRY_BATCH_SIZE:
+            self.flush_rapid_entries()
+        elif self.rapid_flush_after_id is None:
+            self.rapid_flush_after_id = self.root.after(self.RAPID_ENTRY_FLUSH_MS, self.flush_rapid_entries)
+            
+    def flush_rapid_entries(self):
+        """ثبت یکجای صف ورود سریع و جایگزینی ردیف‌های موقت جدول با شناسه واقعی تراکنش‌ها"""
+        if self.rapid_flush_after_id is not None:
+            self.root.after_cancel(self.rapid_flush_after_id)
+            self.rapid_flush_after_id = None
+        if not self.ledger.pending_transactions:
+            self.pending_items = []
+            return
+            
+        try:
+            flushed = self.ledger.flush_transactions()
+        except Exception as e:
+            # صف می‌ماند و کمی بعد دوباره امتحان می‌شود
+            self.set_status(fix_persian_text(f"⚠️ خطا در ثبت تراکنش‌ها: {str(e)}"))
+            self.rapid_flush_after_id = self.root.after(self.RAPID_ENTRY_FLUSH_MS, self.flush_rapid_entries)
+            return
+            
+        # شناسه ردیف جدول باید همان id تراکنش باشد (برای حذف)، پس ردیف‌های موقت دوباره درج می‌شوند
+        selection = set(self.tree.selection())
+        replaced = {}
+        for item, (trans_id, row) in zip(self.pending_items, flushed):
+            if item is None or not self.tree.exists(item):
+                continue
+            index = self.tree.index(item)
+            values = self.tree.item(item, 'values')
             self.tree.delete(item)
+            replaced[item] = self.tree.insert('', index, iid=str(trans_id), values=values)
+            if item in selection:
+                self.tree.selection_add(replaced[item])
+            # کلیدهای صفحه اول برای صفحه‌بندی بعدی
+            key = (row[1], trans_id)
+            page = self.loaded_pages[0]
+            page['first_key'] = key
+            if page['last_key'] is None:
+                page['last_key'] = key
+        if replaced:
+            for page in self.loaded_pages:
+                page['items'] = [replaced.get(item, item) for item in page['items']]
+        self.pending_items = []
+        self.set_status(fix_persian_text(f"{len(flushed)} تراکنش ثبت شد"))
             
-        # ساختن کوئری با فیلتر
-        query = "SELECT * FROM transactions"
-        params = []
-        
-        filter_value = self.filter_var.get()
-        if filter_value != fix_persian_text("همه"):
-            if filter_value in [fix_persian_text("درآمد"), fix_persian_text("هزینه")]:
-                query += " WHERE type = ?"
-                params = [filter_value]
-            else:
-                query += " WHERE category = ?"
-                params = [filter_value]
-                
-        query += " ORDER BY date DESC"
-        
-        # اجرای کوئری
-        self.cursor.execute(query, params)
-        transactions = self.cursor.fetchall()
+    def reset_transactions_table(self):
+        """خالی کردن جدول تراکنش‌ها و وضعیت صفحه‌بندی"""
+        # لغو بارگذاری صفحه‌ای که هنوز انجام نشده
+        if self.page_load_after_id is not None:
+            self.root.after_cancel(self.page_load_after_id)
+            self.page_load_after_id = None
+        self.display_generation += 1
+        
+        # پاک کردن لیست (یکجا، نه تک‌تک)
+        self.tree.delete(*self.tree.get_children())
+        self.loaded_pages = deque()
+        self.has_more_above = False
+        self.has_more_below = False
+        
+    def load_first_page_in_background(self):
+        """خواندن صفحه اول جدول در رشته دیتابیس (هنگام شروع، بدون معطل کردن پنجره)"""
+        self.reset_transactions_table()
+        generation = self.display_generation
+        filters = self.build_transactions_filter()
+        
+        def job(ledger, task):
+            return ledger.fetch_transactions_page(self.PAGE_SIZE, **filters)
+            
+        def done(rows):
+            # اگر جدول در این فاصله دوباره بارگذاری شده باشد، این نتیجه کهنه است
+            if generation != self.display_generation:
+                return
+            self.has_more_below = len(rows) == self.PAGE_SIZE
+            if rows:
+                self.loaded_pages.append(self.insert_transaction_rows(rows, tk.END))
+            self.profiler.mark('first_page_loaded')
+            
+        self.run_in_background(job, fix_persian_text("بارگذاری تراکنش‌ها"), done, "خطا در بارگذاری تراکنش‌ها")
         
-        # اضافه کردن تراکنش‌ها به جدول
-        for trans in transactions:
-            formatted_amount = f"{trans[3]:,.0f} " + fix_persian_text("تومان")
-            self.tree.insert('', tk.END, values=(trans[1], trans[2], formatted_amount, trans[5], trans[4]))
+    @timed_handler('refresh_display')
+    def refresh_display(self):
+        """به‌روزرسانی نمایش تراکنش‌ها (بارگذاری صفحه اول)"""
+        self.flush_rapid_entries()
+        self.reset_transactions_table()
+        self.has_more_below = True
+        
+        # فقط صفحه اول خوانده می‌شود؛ بقیه با اسکرول بارگذاری می‌شوند
+        self.load_next_page()
+        self.tree.yview_moveto(0)
             
         # محاسبه خلاصه
         self.update_summary()
         
+    def schedule_search(self):
+        """اجرای جستجو پس از مکث در تایپ؛ هر کلید جدید زمان‌سنج را از نو شروع می‌کند"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(self.SEARCH_DEBOUNCE_MS, self.run_search)
+    
+    def run_search(self):
+        """بارگذاری صفحه اول نتایج جستجو"""
+        self.search_after_id = None
+        self.refresh_display()
+    
+    def build_transactions_filter(self):
+        """پارامترهای فیلتر جدول تراکنش‌ها برای fetch_transactions_page"""
+        filters = {}
+        search = self.search_var.get().strip()
+        if search:
+            filters['search'] = search
+        filter_value = self.filter_var.get()
+        if filter_value == self.labels["همه"]:
+            return filters
+        if filter_value in [self.labels["درآمد"], self.labels["هزینه"]]:
+            filters['trans_type'] = filter_value
+        else:
+            filters['category'] = filter_value
+        return filters
+        
+    def transaction_values(self, date, trans_type, amount, description, category, currency):
+        """مقادیر ستون‌های جدول برای یک تراکنش"""
+        # مبلغ با واحد پول خود تراکنش (ارزهای خارجی با دو رقم اعشار)
+        decimals = 0 if currency == BASE_CURRENCY else 2
+        formatted_amount = f"{amount:,.{decimals}f} {self.currency_label(currency)}"
+        return (date, trans_type, formatted_amount, category, description)
+        
+    def insert_transaction_rows(self, rows, index):
+        """درج ردیف‌های یک صفحه در جدول از موقعیت index"""
+        items = []
+        for offset, (trans_id, date_epoch, date, trans_type, amount, description, category, currency) in enumerate(rows):
+            position = index + offset if index != tk.END else tk.END
+            # شناسه ردیف جدول همان کلید اصلی تراکنش است
+            items.append(self.tree.insert('', position, iid=str(trans_id), values=self.transaction_values(
+                date, trans_type, amount, description, category, currency)))
+        return {
+            'items': items,
+            'first_key': (rows[0][1], rows[0][0]),
+            'last_key': (rows[-1][1], rows[-1][0]),
+        }
+        
+    def top_visible_item(self):
+        """ردیفی که در بالای ناحیه قابل مشاهده جدول است"""
+        children = self.tree.get_children()
+        if not children:
+            return None
+        index = int(self.tree.yview()[0] * len(children))
+        return children[min(index, len(children) - 1)]
+        
+    def restore_tree_anchor(self, anchor):
+        """برگرداندن اسکرول به همان ردیف پس از اضافه/حذف صفحه"""
+        children = self.tree.get_children()
+        if anchor is not None and anchor in children:
+            self.tree.yview_moveto(children.index(anchor) / len(children))
+        
+    def load_next_page(self):
+        """بارگذاری صفحه قدیمی‌تر در انتهای جدول"""
+        self.page_load_after_id = None
+        last_key = self.loaded_pages[-1]['last_key'] if self.loaded_pages else None
+        rows = self.ledger.fetch_transactions_page(self.PAGE_SIZE, after_key=last_key,
+                                                   **self.build_transactions_filter())
+        if len(rows) < self.PAGE_SIZE:
+            self.has_more_below = False
+        if not rows:
+            return
+            
+        anchor = self.top_visible_item()
+        self.loaded_pages.append(self.insert_transaction_rows(rows, tk.END))
+        
+        # فقط چند صفحه در حافظه می‌ماند؛ صفحه بالایی دور ریخته می‌شود
+        if len(self.loaded_pages) > self.MAX_LOADED_PAGES:
+            page = self.loaded_pages.popleft()
+            self.tree.delete(*page['items'])
+            self.has_more_above = True
+            self.restore_tree_anchor(anchor)
+            
+    def load_previous_page(self):
+        """بارگذاری دوباره صفحه جدیدتر در ابتدای جدول"""
+        self.page_load_after_id = None
+        if not self.loaded_pages:
+            return
+        rows = self.ledger.fetch_transactions_page(self.PAGE_SIZE, before_key=self.loaded_pages[0]['first_key'],
+                                                   **self.build_transactions_filter())
+        if len(rows) < self.PAGE_SIZE:
+            self.has_more_above = False
+        if not rows:
+            return
+            
+        anchor = self.top_visible_item()
+        self.loaded_pages.appendleft(self.insert_transaction_rows(rows, 0))
+        
+        if len(self.loaded_pages) > self.MAX_LOADED_PAGES:
+            page = self.loaded_pages.pop()
+            self.tree.delete(*page['items'])
+            self.has_more_below = True
+        self.restore_tree_anchor(anchor)
+        
+    def on_tree_scroll(self, first, last):
+        """اسکرول جدول: نزدیک لبه‌ها صفحه بعد/قبل بارگذاری می‌شود"""
+        self.tree_scrollbar.set(first, last)
+        if self.page_load_after_id is not None:
+            return
+            
+        if float(last) >= 0.98 and self.has_more_below:
+            self.page_load_after_id = self.root.after_idle(self.load_next_page)
+        elif float(first) <= 0.02 and self.has_more_above:
+            self.page_load_after_id = self.root.after_idle(self.load_previous_page)
+        
+        
     def update_summary(self):
         """به‌روزرسانی خلاصه مالی"""
-        # گرفتن تمام تراکنش‌ها
-        self.cursor.execute("SELECT type, amount FROM transactions")
-        results = self.cursor.fetchall()
-        
-        income = sum(row[1] for row in results if row[0] == fix_persian_text("درآمد"))
-        expense = sum(row[1] for row in results if row[0] == fix_persian_text("هزینه"))
+        # خواندن جمع‌های تجمعی (بدون پیمایش جدول تراکنش‌ها) به واحد پول گزارش‌ها
+        self.flush_rapid_entries()
+        totals = self.ledger.totals(self.reporting_currency)
+        self.render_summary(totals.get(self.labels["درآمد"], 0), totals.get(self.labels["هزینه"], 0))
+        self.update_goal_progress()
+        
+    def render_summary(self, income, expense):
+        """نمایش جمع درآمد، هزینه و موجودی در کارت‌های خلاصه"""
+        self.summary_totals = (income, expense)
+        unit = currency_name(self.reporting_currency)
         balance = income - expense  # تصحیح محاسبه
         
         # نمایش صحیح اعداد منفی
-        income_text = f"{income:,.0f} تومان"
-        expense_text = f"{expense:,.0f} تومان"
+        income_text = f"{income:,.0f} {unit}"
+        expense_text = f"{expense:,.0f} {unit}"
         
         # اگر موجودی منفی بود، علامت منفی رو جلوی عدد بذار
         if balance < 0:
-            balance_text = f"-{abs(balance):,.0f} تومان"
+            balance_text = f"-{abs(balance):,.0f} {unit}"
         else:
-            balance_text = f"{balance:,.0f} تومان"
+            balance_text = f"{balance:,.0f} {unit}"
         
         # به‌روزرسانی کارت‌ها
         self.income_label_main.config(text=fix_persian_text(f"درآمد\n{income_text}"))
         self.expense_label_main.config(text=fix_persian_text(f"هزینه\n{expense_text}"))
         self.balance_label_main.config(text=fix_persian_text(f"موجودی\n{balance_text}"))
         
+    def verify_summary(self):
+        """بررسی سازگاری خلاصه مالی با تراکنش‌ها"""
+        try:
+            mismatched = self.ledger.check_totals_consistency() + self.ledger.check_rollups_consistency()
+            self.update_summary()
+            if mismatched:
+                messagebox.showwarning(fix_persian_text("هشدار"), fix_persian_text(f"مغایرت در {len(mismatched)} مورد پیدا شد و خلاصه‌ها بازسازی شدند"))
+            else:
+                messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("خلاصه‌های مالی با تراکنش‌ها سازگار هستند"))
+                
+        except Exception as e:
+            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در بررسی خلاصه‌ها: {str(e)}"))
+        
     def generate_report(self):
         """تولید گزارش"""
         try:
-            # ساخت کوئری بر اساس فیلتر
-            query = "SELECT * FROM transactions WHERE 1=1"
-            params = []
+            # جمع‌های گروه‌بندی‌شده بر اساس فیلتر (فقط اعداد لازم برگردانده می‌شوند)
+            year = None
+            month = None
             
             # فیلتر سال
-            if self.year_var.get() and self.year_var.get() != fix_persian_text("همه"):
-                query += " AND date LIKE ?"
-                params.append(f"{self.year_var.get()}%")
+            if self.year_var.get() and self.year_var.get() != self.labels["همه"]:
+                year = int(self.year_var.get())
                 
             # فیلتر ماه
-            if self.month_var.get() and self.month_var.get() != fix_persian_text("همه"):
-                month_num = list(calendar.month_name).index(self.month_var.get().replace(fix_persian_text(""), ""))
-                month_str = f"{month_num:02d}"
-                query += " AND date LIKE ?"
-                params.append(f"%-{month_str}-%")
+            if self.month_var.get() and self.month_var.get() != self.labels["همه"]:
+                month = list(calendar.month_name).index(self.month_var.get().replace(fix_persian_text(""), ""))
+                
+            currency = self.reporting_currency
+            
+            def job(ledger, task):
+                return ledger.report_groups(year, month, currency)
                 
-            query += " ORDER BY date DESC"
+            self.run_cached(('report_groups', year, month, currency), job, fix_persian_text("تولید گزارش"),
+                            self.show_report, "خطا در تولید گزارش", timing_name='generate_report')
             
-            self.cursor.execute(query, params)
-            transactions = self.cursor.fetchall()
+        except Exception as e:
+            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در تولید گزارش: {str(e)}"))
             
-            # محاسبه آمار
-            income = sum(row[3] for row in transactions if row[2] == fix_persian_text("درآمد"))
-            expense = sum(row[3] for row in transactions if row[2] == fix_persian_text("هزینه"))
+    def show_report(self, groups):
+        """نمایش گزارش متنی از روی جمع‌های گروه‌بندی‌شده (نوع، دسته، جمع، تعداد)"""
+        try:
+            # محاسبه آمار از روی گروه‌ها (تعداد ردیف‌ها = تعداد نوع × دسته)
+            income_type = self.labels["درآمد"]
+            expense_type = self.labels["هزینه"]
+            income = 0
+            expense = 0
+            transaction_count = 0
+            category_expense = {}
+            for trans_type, category, total, count in groups:
+                transaction_count += count
+                if trans_type == income_type:
+                    income += total
+                elif trans_type == expense_type:
+                    expense += total
+                    category_expense[category] = total
             balance = income - expense  # تصحیح محاسبه
             
             # نمایش صحیح اعداد منفی
@@ -907,14 +1945,9 @@ class UltimateFinanceManager:
             else:
                 balance_text = f"{balance:,.0f}"
             
-            # تجزیه و تحلیل دسته‌بندی
-            category_expense = defaultdict(float)
-            for row in transactions:
-                if row[2] == fix_persian_text("هزینه"):
-                    category_expense[row[5]] += row[3]
-            
             # تولید گزارش متنی
             self.report_text.delete(1.0, tk.END)
+            unit = currency_name(self.reporting_currency)
             
             report = fix_persian_text(f"""
 📊 گزارش مالی
@@ -922,18 +1955,18 @@ class UltimateFinanceManager:
 تاریخ تولید گزارش: {datetime.now().strftime("%Y-%m-%d %H:%M")}
 
 💰 خلاصه مالی:
-درآمد کل: {income:,.0f} تومان
-هزینه کل: {expense:,.0f} تومان
-سود/ضرر: {balance_text} تومان
+درآمد کل: {income:,.0f} {unit}
+هزینه کل: {expense:,.0f} {unit}
+سود/ضرر: {balance_text} {unit}
 
 🛍️ تجزیه و تحلیل هزینه‌ها:
 """)
             
             for category, amount in sorted(category_expense.items(), key=lambda x: x[1], reverse=True):
                 percentage = (amount / expense * 100) if expense > 0 else 0
-                report += fix_persian_text(f"• {category}: {amount:,.0f} تومان ({percentage:.1f}%)\n")
+                report += fix_persian_text(f"• {category}: {amount:,.0f} {unit} ({percentage:.1f}%)\n")
             
-            report += fix_persian_text(f"\n📈 تعداد کل تراکنش‌ها: {len(transactions)}")
+            report += fix_persian_text(f"\n📈 تعداد کل تراکنش‌ها: {transaction_count}")
             
             self.report_text.insert(tk.END, report)
             
@@ -942,219 +1975,193 @@ class UltimateFinanceManager:
             
     def analyze_expenses(self):
         """آنالیز هزینه‌ها"""
-        try:
-            self.cursor.execute("SELECT category, SUM(amount) FROM transactions WHERE type = ? GROUP BY category", 
-                              (fix_persian_text("هزینه"),))
-            results = self.cursor.fetchall()
+        self.run_analysis(self.build_expense_analysis, fix_persian_text("آنالیز هزینه‌ها"), "خطا در آنالیز هزینه‌ها",
+                          timing_name='analyze_expenses')
+        
+    def build_expense_analysis(self, rollups, ledger):
+        """متن آنالیز هزینه‌ها (در رشته پس‌زمینه ساخته می‌شود)"""
+        results = list(rollups.category_totals(self.labels["هزینه"]).items())
+        unit = currency_name(rollups.currency)
+        
+        total_expense = sum(row[1] for row in results)
+        
+        analysis = fix_persian_text("🔍 آنالیز هزینه‌ها:\n\n")
+        
+        if results:
+            # مرتب‌سازی بر اساس مبلغ
+            results.sort(key=lambda x: x[1], reverse=True)
             
-            total_expense = sum(row[1] for row in results)
+            analysis += fix_persian_text("📊 دسته‌بندی هزینه‌ها (از بیشترین به کمترین):\n")
+            for i, (category, amount) in enumerate(results, 1):
+                percentage = (amount / total_expense * 100) if total_expense > 0 else 0
+                analysis += fix_persian_text(f"{i}. {category}: {amount:,.0f} {unit} ({percentage:.1f}%)\n")
             
-            analysis = fix_persian_text("🔍 آنالیز هزینه‌ها:\n\n")
+            # پیدا کردن بیشترین و کمترین هزینه
+            max_category = results[0][0]
+            min_category = results[-1][0]
             
-            if results:
-                # مرتب‌سازی بر اساس مبلغ
-                results.sort(key=lambda x: x[1], reverse=True)
-                
-                analysis += fix_persian_text("📊 دسته‌بندی هزینه‌ها (از بیشترین به کمترین):\n")
-                for i, (category, amount) in enumerate(results, 1):
-                    percentage = (amount / total_expense * 100) if total_expense > 0 else 0
-                    analysis += fix_persian_text(f"{i}. {category}: {amount:,.0f} تومان ({percentage:.1f}%)\n")
-                
-                # پیدا کردن بیشترین و کمترین هزینه
-                max_category = results[0][0]
-                min_category = results[-1][0]
-                
-                analysis += fix_persian_text(f"\n📈 بیشترین هزینه: {max_category}\n")
-                analysis += fix_persian_text(f"📉 کمترین هزینه: {min_category}\n")
-                
-                # میانگین هزینه
-                avg_expense = total_expense / len(results)
-                analysis += fix_persian_text(f"\n📊 میانگین هزینه در هر دسته: {avg_expense:,.0f} تومان\n")
-            else:
-                analysis += fix_persian_text("هیچ هزینه‌ای ثبت نشده است.\n")
-                
-            self.analysis_text.delete(1.0, tk.END)
-            self.analysis_text.insert(tk.END, analysis)
+            analysis += fix_persian_text(f"\n📈 بیشترین هزینه: {max_category}\n")
+            analysis += fix_persian_text(f"📉 کمترین هزینه: {min_category}\n")
             
-        except Exception as e:
-            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در آنالیز هزینه‌ها: {str(e)}"))
+            # میانگین هزینه
+            avg_expense = total_expense / len(results)
+            analysis += fix_persian_text(f"\n📊 میانگین هزینه در هر دسته: {avg_expense:,.0f} {unit}\n")
+            
+            # بزرگ‌ترین هزینه‌ها (فقط همین چند ردیف از دیتابیس خوانده می‌شوند)
+            top_expenses = ledger.top_transactions(self.labels["هزینه"], 5, rollups.currency)
+            details = ledger.transaction_details([trans_id for trans_id, amount in top_expenses])
             
+            analysis += fix_persian_text("\n💸 بزرگ‌ترین هزینه‌ها:\n")
+            for trans_id, amount in top_expenses:
+                date, category, description = details.get(trans_id, ("", "", ""))
+                analysis += fix_persian_text(f"• {amount:,.0f} {unit} - {category} ({date}) {description}\n")
+        else:
+            analysis += fix_persian_text("هیچ هزینه‌ای ثبت نشده است.\n")
+        return analysis
+        
     def analyze_patterns(self):
         """آنالیز الگوهای مصرف"""
-        try:
-            self.cursor.execute("SELECT date, type, amount, category FROM transactions ORDER BY date")
-            transactions = self.cursor.fetchall()
-            
-            analysis = fix_persian_text("📊 آنالیز الگوهای مصرف:\n\n")
+        self.run_analysis(self.build_pattern_analysis, fix_persian_text("آنالیز الگوهای مصرف"), "خطا در آنالیز الگوها",
+                          timing_name='analyze_patterns')
+        
+    def build_pattern_analysis(self, rollups, ledger):
+        """متن آنالیز الگوهای مصرف (در رشته پس‌زمینه ساخته می‌شود)"""
+        analysis = fix_persian_text("📊 آنالیز الگوهای مصرف:\n\n")
+        
+        if len(rollups):
+            # تجزیه و تحلیل بر اساس زمان (گروه‌بندی روی ستون ماه)
+            income_type = self.labels["درآمد"]
+            monthly_list = []
+            for (year, month_index), totals in rollups.monthly_totals():
+                income = totals.get(income_type, 0)
+                expense = sum(amount for name, amount in totals.items() if name != income_type)
+                monthly_list.append((f"{year}-{month_index + 1:02d}", {'income': income, 'expense': expense}))
             
-            if transactions:
-                # تجزیه و تحلیل بر اساس زمان
-                monthly_data = defaultdict(lambda: {'income': 0, 'expense': 0})
-                
-                for trans in transactions:
-                    date = datetime.strptime(trans[0], "%Y-%m-%d %H:%M")
-                    month_key = date.strftime("%Y-%m")
+            analysis += fix_persian_text("📅 روند مالی ماهانه:\n")
+            for month, data in monthly_list[-6:]:  # ۶ ماه اخیر
+                balance = data['income'] - data['expense']
+                # نمایش صحیح اعداد منفی
+                if balance < 0:
+                    balance_text = f"-{abs(balance):,.0f}"
+                else:
+                    balance_text = f"{balance:,.0f}"
                     
-                    if trans[1] == fix_persian_text("درآمد"):
-                        monthly_data[month_key]['income'] += trans[2]
-                    else:
-                        monthly_data[month_key]['expense'] += trans[2]
-                
-                # تبدیل به لیست و مرتب‌سازی
-                monthly_list = [(month, data) for month, data in monthly_data.items()]
-                monthly_list.sort()
-                
-                analysis += fix_persian_text("📅 روند مالی ماهانه:\n")
-                for month, data in monthly_list[-6:]:  # ۶ ماه اخیر
-                    balance = data['income'] - data['expense']
-                    # نمایش صحیح اعداد منفی
-                    if balance < 0:
-                        balance_text = f"-{abs(balance):,.0f}"
-                    else:
-                        balance_text = f"{balance:,.0f}"
-                        
-                    analysis += fix_persian_text(f"{month}: درآمد {data['income']:,.0f} | هزینه {data['expense']:,.0f} | موجودی {balance_text}\n")
-                
-                # آنالیز روزهای هفته
-                weekday_expense = defaultdict(float)
-                for trans in transactions:
-                    if trans[1] == fix_persian_text("هزینه"):
-                        date = datetime.strptime(trans[0], "%Y-%m-%d %H:%M")
-                        weekday = date.weekday()  # 0=دوشنبه, 6=یکشنبه
-                        weekday_expense[weekday] += trans[2]
-                
-                weekdays = [fix_persian_text('دوشنبه'), fix_persian_text('سه‌شنبه'), fix_persian_text('چهارشنبه'), 
-                           fix_persian_text('پنج‌شنبه'), fix_persian_text('جمعه'), fix_persian_text('شنبه'), 
-                           fix_persian_text('یکشنبه')]
-                
-                analysis += fix_persian_text("\n📅 هزینه‌های بر اساس روزهای هفته:\n")
-                for i in range(7):
-                    amount = weekday_expense[i]
-                    analysis += fix_persian_text(f"{weekdays[i]}: {amount:,.0f} تومان\n")
-                
-                # پیدا کردن روز پرخرج‌ترین
-                if weekday_expense:
-                    max_weekday = max(weekday_expense.items(), key=lambda x: x[1])[0]
-                    analysis += fix_persian_text(f"\n💰 بیشترین هزینه در: {weekdays[max_weekday]}\n")
-                
-            else:
-                analysis += fix_persian_text("داده‌ای برای آنالیز وجود ندارد.\n")
-                
-            self.analysis_text.delete(1.0, tk.END)
-            self.analysis_text.insert(tk.END, analysis)
+                analysis += fix_persian_text(f"{month}: درآمد {data['income']:,.0f} | هزینه {data['expense']:,.0f} | موجودی {balance_text}\n")
             
-        except Exception as e:
-            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در آنالیز الگوها: {str(e)}"))
+            # آنالیز روزهای هفته (0=دوشنبه, 6=یکشنبه)
+            weekday_expense = dict(enumerate(rollups.weekday_totals(self.labels["هزینه"])))
+            
+            weekdays = [self.labels[day] for day in WEEKDAY_NAMES]
+            
+            analysis += fix_persian_text("\n📅 هزینه‌های بر اساس روزهای هفته:\n")
+            for i in range(7):
+                amount = weekday_expense[i]
+                analysis += fix_persian_text(f"{weekdays[i]}: {amount:,.0f} {currency_name(rollups.currency)}\n")
             
+            # پیدا کردن روز پرخرج‌ترین
+            if any(weekday_expense.values()):
+                max_weekday = max(weekday_expense.items(), key=lambda x: x[1])[0]
+                analysis += fix_persian_text(f"\n💰 بیشترین هزینه در: {weekdays[max_weekday]}\n")
+            
+        else:
+            analysis += fix_persian_text("داده‌ای برای آنالیز وجود ندارد.\n")
+        return analysis
+        
     def generate_tips(self):
         """تولید پیشنهادات هوشمند"""
-        try:
-            self.cursor.execute("SELECT type, amount, category FROM transactions")
-            transactions = self.cursor.fetchall()
+        self.run_analysis(self.build_tips, fix_persian_text("تولید پیشنهادات"), "خطا در تولید پیشنهادات",
+                          timing_name='generate_tips')
+        
+    def build_tips(self, rollups, ledger):
+        """متن پیشنهادات هوشمند (در رشته پس‌زمینه ساخته می‌شود)"""
+        tips = fix_persian_text("💡 پیشنهادات هوشمند:\n\n")
+        
+        if len(rollups):
+            # آنالیز هزینه‌ها
+            totals = rollups.totals_by_type()
+            total_expense = totals.get(self.labels["هزینه"], 0)
+            total_income = totals.get(self.labels["درآمد"], 0)
             
-            tips = fix_persian_text("💡 پیشنهادات هوشمند:\n\n")
-            
-            if transactions:
-                # آنالیز هزینه‌ها
-                expenses = [t for t in transactions if t[0] == fix_persian_text("هزینه")]
-                incomes = [t for t in transactions if t[0] == fix_persian_text("درآمد")]
+            if total_expense > 0:
+                # تجزیه و تحلیل دسته‌بندی
+                category_expense = rollups.category_totals(self.labels["هزینه"])
                 
-                total_expense = sum(t[1] for t in expenses)
-                total_income = sum(t[1] for t in incomes)
+                # پیشنهادات بر اساس دسته‌بندی
+                tips += fix_persian_text("🎯 پیشنهادات بر اساس هزینه‌ها:\n")
                 
-                if total_expense > 0:
-                    # تجزیه و تحلیل دسته‌بندی
-                    category_expense = defaultdict(float)
-                    for exp in expenses:
-                        category_expense[exp[2]] += exp[1]
-                    
-                    # پیشنهادات بر اساس دسته‌بندی
-                    tips += fix_persian_text("🎯 پیشنهادات بر اساس هزینه‌ها:\n")
-                    
-                    # پیدا کردن دسته‌های پرخرج
-                    sorted_categories = sorted(category_expense.items(), key=lambda x: x[1], reverse=True)
-                    
-                    if sorted_categories:
-                        max_category, max_amount = sorted_categories[0]
-                        percentage = (max_amount / total_expense * 100) if total_expense > 0 else 0
-                        
-                        if percentage > 30:
-                            tips += fix_persian_text(f"⚠️ هزینه‌های '{max_category}' ({percentage:.1f}%) بسیار بالا است. سعی کنید کاهش دهید.\n")
-                        elif percentage > 20:
-                            tips += fix_persian_text(f"🔔 هزینه‌های '{max_category}' ({percentage:.1f}%) نسبتاً بالا است.\n")
-                    
-                    # پیشنهادات کلی
-                    tips += fix_persian_text("\n📋 پیشنهادات عمومی:\n")
-                    
-                    if total_income > total_expense:
-                        tips += fix_persian_text("✅ وضعیت مالی شما خوب است. درآمد بیشتر از هزینه است.\n")
-                        tips += fix_persian_text("💰 پیشنهاد می‌کنیم بخشی از سود را پس‌انداز کنید.\n")
-                    elif total_income < total_expense:
-                        tips += fix_persian_text("⚠️ هشدار: هزینه‌های شما بیشتر از درآمد است.\n")
-                        tips += fix_persian_text("📉 لطفاً هزینه‌های غیرضروری را کاهش دهید.\n")
-                    else:
-                        tips += fix_persian_text("⚖️ درآمد و هزینه‌های شما متعادل است.\n")
-                        tips += fix_persian_text("📈 سعی کنید درآمد خود را افزایش دهید.\n")
-                    
-                    # پیشنهادات بر اساس دسته‌بندی
-                    tips += fix_persian_text("\n🛍️ پیشنهادات خاص:\n")
-                    
-                    if fix_persian_text('غذا') in category_expense:
-                        food_expense = category_expense[fix_persian_text('غذا')]
-                        if food_expense > total_expense * 0.25:
-                            tips += fix_persian_text("🍱 هزینه‌های غذا بسیار بالا است. سعی کنید بیشتر غذا درست کنید.\n")
-                    
-                    if fix_persian_text('سرگرمی') in category_expense:
-                        entertainment_expense = category_expense[fix_persian_text('سرگرمی')]
-                        if entertainment_expense > total_expense * 0.15:
-                            tips += fix_persian_text("🎮 هزینه‌های سرگرمی زیاد است. برنامه‌ریزی کنید.\n")
+                # پیدا کردن دسته‌های پرخرج
+                sorted_categories = sorted(category_expense.items(), key=lambda x: x[1], reverse=True)
+                
+                if sorted_categories:
+                    max_category, max_amount = sorted_categories[0]
+                    percentage = (max_amount / total_expense * 100) if total_expense > 0 else 0
                     
-                    if fix_persian_text('خرید') in category_expense:
-                        shopping_expense = category_expense[fix_persian_text('خرید')]
-                        if shopping_expense > total_expense * 0.20:
-                            tips += fix_persian_text("🛍️ هزینه‌های خرید بسیار بالا است. قبل از خرید فکر کنید.\n")
+                    if percentage > 30:
+                        tips += fix_persian_text(f"⚠️ هزینه‌های '{max_category}' ({percentage:.1f}%) بسیار بالا است. سعی کنید کاهش دهید.\n")
+                    elif percentage > 20:
+                        tips += fix_persian_text(f"🔔 هزینه‌های '{max_category}' ({percentage:.1f}%) نسبتاً بالا است.\n")
                 
-                # پیشنهادات برای ذخیره‌سازی
-                tips += fix_persian_text("\n💰 پیشنهادات ذخیره‌سازی:\n")
-                tips += fix_persian_text("🏦 حداقل ۱۰٪ از درآمد را پس‌انداز کنید.\n")
-                tips += fix_persian_text("🎯 اهداف مالی کوتاه‌مدت و بلندمدت تعیین کنید.\n")
-                tips += fix_persian_text("📈 هر ماه گزارش مالی خود را بررسی کنید.\n")
+                # پیشنهادات کلی
+                tips += fix_persian_text("\n📋 پیشنهادات عمومی:\n")
                 
-            else:
-                tips += fix_persian_text("هنوز تراکنشی ثبت نکرده‌اید. شروع کنید تا پیشنهادات دریافت کنید!\n")
+                if total_income > total_expense:
+                    tips += fix_persian_text("✅ وضعیت مالی شما خوب است. درآمد بیشتر از هزینه است.\n")
+                    tips += fix_persian_text("💰 پیشنهاد می‌کنیم بخشی از سود را پس‌انداز کنید.\n")
+                elif total_income < total_expense:
+                    tips += fix_persian_text("⚠️ هشدار: هزینه‌های شما بیشتر از درآمد است.\n")
+                    tips += fix_persian_text("📉 لطفاً هزینه‌های غیرضروری را کاهش دهید.\n")
+                else:
+                    tips += fix_persian_text("⚖️ درآمد و هزینه‌های شما متعادل است.\n")
+                    tips += fix_persian_text("📈 سعی کنید درآمد خود را افزایش دهید.\n")
                 
-            self.analysis_text.delete(1.0, tk.END)
-            self.analysis_text.insert(tk.END, tips)
+                # پیشنهادات بر اساس دسته‌بندی
+                tips += fix_persian_text("\n🛍️ پیشنهادات خاص:\n")
+                
+                if self.labels["غذا"] in category_expense:
+                    food_expense = category_expense[self.labels["غذا"]]
+                    if food_expense > total_expense * 0.25:
+                        tips += fix_persian_text("🍱 هزینه‌های غذا بسیار بالا است. سعی کنید بیشتر غذا درست کنید.\n")
+                
+                if self.labels["سرگرمی"] in category_expense:
+                    entertainment_expense = category_expense[self.labels["سرگرمی"]]
+                    if entertainment_expense > total_expense * 0.15:
+                        tips += fix_persian_text("🎮 هزینه‌های سرگرمی زیاد است. برنامه‌ریزی کنید.\n")
+                
+                if self.labels["خرید"] in category_expense:
+                    shopping_expense = category_expense[self.labels["خرید"]]
+                    if shopping_expense > total_expense * 0.20:
+                        tips += fix_persian_text("🛍️ هزینه‌های خرید بسیار بالا است. قبل از خرید فکر کنید.\n")
             
-        except Exception as e:
-            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در تولید پیشنهادات: {str(e)}"))
+            # پیشنهادات برای ذخیره‌سازی
+            tips += fix_persian_text("\n💰 پیشنهادات ذخیره‌سازی:\n")
+            tips += fix_persian_text("🏦 حداقل ۱۰٪ از درآمد را پس‌انداز کنید.\n")
+            tips += fix_persian_text("🎯 اهداف مالی کوتاه‌مدت و بلندمدت تعیین کنید.\n")
+            tips += fix_persian_text("📈 هر ماه گزارش مالی خود را بررسی کنید.\n")
             
+        else:
+            tips += fix_persian_text("هنوز تراکنشی ثبت نکرده‌اید. شروع کنید تا پیشنهادات دریافت کنید!\n")
+        return tips
+        
     def delete_selected(self):
-        """حذف تراکنش انتخاب شده"""
+        """حذف تراکنش‌های انتخاب شده"""
+        # ردیف‌های صف ورود سریع اول ثبت می‌شوند تا شناسه واقعی داشته باشند
+        self.flush_rapid_entries()
         selected = self.tree.selection()
         if not selected:
             messagebox.showwarning(fix_persian_text("هشدار"), fix_persian_text("لطفاً یک تراکنش را انتخاب کنید"))
             return
             
-        if messagebox.askyesno(fix_persian_text("تأیید"), fix_persian_text("آیا از حذف تراکنش انتخاب شده مطمئن هستید؟")):
+        if messagebox.askyesno(fix_persian_text("تأیید"), fix_persian_text(f"آیا از حذف {len(selected)} تراکنش انتخاب شده مطمئن هستید؟")):
             try:
-                # گرفتن اطلاعات تراکنش انتخاب شده
-                item = self.tree.item(selected[0])
-                values = item['values']
-                
-                # پیدا کردن تراکنش در دیتابیس (با تاریخ و مبلغ)
-                date = values[0]
-                amount_text = values[2].replace(fix_persian_text(' تومان'), '').replace(',', '')
-                amount = float(amount_text)
+                # شناسه ردیف‌ها همان id تراکنش‌هاست
+                self.ledger.delete_transactions([int(item) for item in selected])
                 
-                # حذف از دیتابیس
-                self.cursor.execute('''
-                    DELETE FROM transactions 
-                    WHERE date = ? AND amount = ?
-                ''', (date, amount))
-                
-                self.conn.commit()
-                self.refresh_display()
+                # حذف از جدول بدون بارگذاری دوباره
+                selected_items = set(selected)
+                self.tree.delete(*selected)
+                for page in self.loaded_pages:
+                    page['items'] = [item for item in page['items'] if item not in selected_items]
+                self.update_summary()
                 
                 messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("تراکنش با موفقیت حذف شد"))
                 
@@ -1163,65 +2170,92 @@ class UltimateFinanceManager:
                 
     def export_data(self):
         """ذخیره داده‌ها به فایل"""
-        try:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".json",
-                filetypes=[("JSON files", "*.json"), ("CSV files", "*.csv"), ("All files", "*.*")]
-            )
-            
-            if filename:
-                self.cursor.execute("SELECT * FROM transactions")
-                transactions = self.cursor.fetchall()
+        export_window = tk.Toplevel(self.root)
+        export_window.title(fix_persian_text("ذخیره به فایل"))
+        export_window.transient(self.root)
+        export_window.grab_set()
+        
+        # فیلتر اختیاری خروجی
+        form_frame = ttk.LabelFrame(export_window, text=fix_persian_text("فیلتر خروجی (اختیاری)"), padding="15")
+        form_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        start_var = tk.StringVar()
+        end_var = tk.StringVar()
+        category_var = tk.StringVar(value=self.labels["همه"])
+        
+        ttk.Label(form_frame, text=fix_persian_text("از تاریخ:")).grid(row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Entry(form_frame, textvariable=start_var, width=15).grid(row=0, column=1, sticky=tk.W, pady=5)
+        ttk.Label(form_frame, text=fix_persian_text("تا تاریخ:")).grid(row=1, column=0, sticky=tk.W, pady=5)
+        ttk.Entry(form_frame, textvariable=end_var, width=15).grid(row=1, column=1, sticky=tk.W, pady=5)
+        ttk.Label(form_frame, text=fix_persian_text("(فرمت: YYYY-MM-DD)")).grid(row=0, column=2, rowspan=2, padx=(5, 0))
+        ttk.Label(form_frame, text=fix_persian_text("دسته:")).grid(row=2, column=0, sticky=tk.W, pady=5)
+        ttk.Combobox(form_frame, textvariable=category_var, values=[self.labels["همه"]] + self.categories, 
+                    width=15).grid(row=2, column=1, sticky=tk.W, pady=5)
+        
+        def save():
+            start_date = start_var.get().strip() or None
+            end_date = end_var.get().strip() or None
+            try:
+                for date in (start_date, end_date):
+                    if date:
+                        datetime.strptime(date, "%Y-%m-%d")
+            except ValueError:
+                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text("لطفاً تاریخ را به درستی وارد کنید (YYYY-MM-DD)"))
+                return
                 
-                # تبدیل به فرمت مناسب
-                data = []
-                for trans in transactions:
-                    data.append({
-                        'id': trans[0],
-                        'date': trans[1],
-                        'type': trans[2],
-                        'amount': trans[3],
-                        'description': trans[4],
-                        'category': trans[5]
-                    })
+            try:
+                category = category_var.get()
+                if category == self.labels["همه"]:
+                    category = None
+                    
+                filename = filedialog.asksaveasfilename(
+                    parent=export_window,
+                    defaultextension=".json",
+                    filetypes=[("JSON files", "*.json"), ("JSON Lines files", "*.jsonl"), 
+                               ("CSV files", "*.csv"), ("Columnar files", "*.fmcol"), ("All files", "*.*")]
+                )
+                if not filename:
+                    return
+                export_window.destroy()
                 
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                def job(ledger, task):
+                    def show_progress(written_count):
+                        task.report_progress(None, fix_persian_text(f"{written_count:,} تراکنش نوشته شد"))
+                    return ledger.export_transactions(filename, start_date, end_date, category,
+                                                      progress=show_progress, check_cancelled=task.check_cancelled)
                     
-                messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("داده‌ها با موفقیت ذخیره شدند"))
+                def done(written_count):
+                    messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text(f"داده‌ها با موفقیت ذخیره شدند\n{written_count:,} تراکنش"))
+                    
+                self.run_in_background(job, fix_persian_text("ذخیره داده‌ها"), done, "خطا در ذخیره داده‌ها")
                 
-        except Exception as e:
-            messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در ذخیره داده‌ها: {str(e)}"))
-            
+            except Exception as e:
+                messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در ذخیره داده‌ها: {str(e)}"))
+                
+        ttk.Button(export_window, text=fix_persian_text("انتخاب فایل و ذخیره"), command=save).pack(pady=(0, 10))
+        
     def import_data(self):
         """بارگذاری داده‌ها از فایل"""
         try:
             filename = filedialog.askopenfilename(
-                filetypes=[("JSON files", "*.json"), ("CSV files", "*.csv"), ("All files", "*.*")]
+                filetypes=[("JSON files", "*.json"), ("JSON Lines files", "*.jsonl"), 
+                           ("CSV files", "*.csv"), ("Columnar files", "*.fmcol"), ("All files", "*.*")]
             )
             
             if filename:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # اضافه کردن داده‌های جدید
-                for item in data:
-                    # بررسی تکراری نبودن
-                    self.cursor.execute('''
-                        SELECT COUNT(*) FROM transactions 
-                        WHERE date = ? AND amount = ? AND type = ?
-                    ''', (item['date'], item['amount'], item['type']))
+                def job(ledger, task):
+                    def show_progress(fraction, read_count, inserted_count):
+                        task.report_progress(fraction, fix_persian_text(f"{read_count:,} خوانده شد، {inserted_count:,} اضافه شد"))
+                    return ledger.import_transactions(filename, progress=show_progress,
+                                                      check_cancelled=task.check_cancelled)
                     
-                    if self.cursor.fetchone()[0] == 0:  # اگر تکراری نبود
-                        self.cursor.execute('''
-                            INSERT INTO transactions (date, type, amount, description, category)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (item['date'], item['type'], item['amount'], 
-                              item['description'], item['category']))
-                
-                self.conn.commit()
-                self.refresh_display()
-                messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("داده‌ها با موفقیت بارگذاری شدند"))
+                def done(result):
+                    read_count, inserted_count = result
+                    self.refresh_display()
+                    messagebox.showinfo(fix_persian_text("موفق"), 
+                                      fix_persian_text(f"داده‌ها با موفقیت بارگذاری شدند\n{inserted_count:,} تراکنش جدید از {read_count:,} رکورد"))
+                    
+                self.run_in_background(job, fix_persian_text("بارگذاری داده‌ها"), done, "خطا در بارگذاری داده‌ها")
                 
         except Exception as e:
             messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در بارگذاری داده‌ها: {str(e)}"))
@@ -1231,16 +2265,20 @@ class UltimateFinanceManager:
         try:
             filename = filedialog.asksaveasfilename(
                 defaultextension=".db",
-                filetypes=[("Database files", "*.db"), ("All files", "*.*")],
+                filetypes=self.backup_filetypes(),
                 initialfile=f"finance_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
             )
             
             if filename:
-                import shutil
-                self.conn.commit()  # ذخیره تغییرات
-                shutil.copy2('finance.db', filename)
-                
-                messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text(f"پشتیبان با موفقیت ایجاد شد:\n{filename}"))
+                # کپی صفحه‌به‌صفحه با API پشتیبان SQLite (با پسوند .gz یا .zst فشرده می‌شود)
+                def job(ledger, task):
+                    ledger.backup(filename, progress=lambda fraction: task.report_progress(fraction),
+                                  check_cancelled=task.check_cancelled)
+                    
+                def done(result):
+                    messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text(f"پشتیبان با موفقیت ایجاد شد:\n{filename}"))
+                    
+                self.run_in_background(job, fix_persian_text("ایجاد پشتیبان"), done, "خطا در ایجاد پشتیبان")
                 
         except Exception as e:
             messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در ایجاد پشتیبان: {str(e)}"))
@@ -1249,20 +2287,23 @@ class UltimateFinanceManager:
         """بازیابی پشتیبان"""
         try:
             filename = filedialog.askopenfilename(
-                filetypes=[("Database files", "*.db"), ("All files", "*.*")]
+                filetypes=self.backup_filetypes()
             )
             
             if filename:
                 if messagebox.askyesno(fix_persian_text("تأیید"), fix_persian_text("آیا از بازیابی پشتیبان مطمئن هستید؟ داده‌های فعلی از بین می‌روند!")):
-                    import shutil
-                    shutil.copy2(filename, 'finance.db')
+                    # صفحه‌های پشتیبان در دیتابیس زنده کپی می‌شوند؛ اتصال رابط کاربری باز می‌ماند
+                    def job(ledger, task):
+                        ledger.restore(filename, progress=lambda fraction: task.report_progress(fraction),
+                                       check_cancelled=task.check_cancelled)
                     
-                    # بستن و دوباره باز کردن اتصال
-                    self.conn.close()
-                    self.setup_database()
-                    self.refresh_display()
-                    
-                    messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("پشتیبان با موفقیت بازیابی شد"))
+                    def done(result):
+                        self.refresh_display()
+                        self.reload_reminders()
+                        
+                        messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("پشتیبان با موفقیت بازیابی شد"))
+                        
+                    self.run_in_background(job, fix_persian_text("بازیابی پشتیبان"), done, "خطا در بازیابی پشتیبان")
                 
         except Exception as e:
             messagebox.showerror(fix_persian_text("خطا"), fix_persian_text(f"خطا در بازیابی پشتیبان: {str(e)}"))
@@ -1271,10 +2312,8 @@ class UltimateFinanceManager:
         """پاک کردن تمام داده‌ها"""
         if messagebox.askyesno(fix_persian_text("تأیید"), fix_persian_text("آیا از پاک کردن تمام داده‌ها مطمئن هستید؟ این عمل غیرقابل بازگشت است!")):
             try:
-                self.cursor.execute("DELETE FROM transactions")
-                self.cursor.execute("DELETE FROM goals")
-                self.cursor.execute("DELETE FROM reminders")
-                self.conn.commit()
+                self.ledger.clear()
+                self.reload_reminders()
                 self.refresh_display()
                 messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text("تمام داده‌ها پاک شدند"))
                 
@@ -1287,10 +2326,8 @@ class UltimateFinanceManager:
                               fix_persian_text("آیا از شروع مجدد مطمئن هستید؟ تمام داده‌ها پاک خواهند شد!")):
             try:
                 # پاک کردن تمام جداول
-                self.cursor.execute("DELETE FROM transactions")
-                self.cursor.execute("DELETE FROM goals")
-                self.cursor.execute("DELETE FROM reminders")
-                self.conn.commit()
+                self.ledger.clear()
+                self.reload_reminders()
                 
                 # به‌روزرسانی نمایش
                 self.refresh_display()
@@ -1298,8 +2335,8 @@ class UltimateFinanceManager:
                 # پاک کردن فیلدهای ورودی
                 self.amount_var.set("")
                 self.desc_var.set("")
-                self.category_var.set(fix_persian_text("سایر"))
-                self.type_var.set(fix_persian_text("درآمد"))
+                self.category_var.set(self.labels["سایر"])
+                self.type_var.set(self.labels["درآمد"])
                 
                 messagebox.showinfo(fix_persian_text("موفق"), 
                                   fix_persian_text("همه داده‌ها پاک شدند. از اول شروع کنید!"))
@@ -1320,20 +2357,37 @@ class UltimateFinanceManager:
         messagebox.showinfo(fix_persian_text("موفق"), fix_persian_text(f"تم {theme} اعمال شد"))
         
     def clear_filter(self):
-        """حذف فیلتر"""
-        self.filter_var.set(fix_persian_text("همه"))
+        """حذف فیلتر و متن جستجو"""
+        self.filter_var.set(self.labels["همه"])
+        self.search_var.set("")
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+            self.search_after_id = None
         self.refresh_display()
         
     def run(self):
         """اجرا کردن برنامه"""
         self.root.mainloop()
+        # تراکنش‌های صف ورود سریع پیش از خروج ثبت می‌شوند
+        self.ledger.flush_transactions()
+        if self.ledger.get_setting('cache.persist', '1') == '1':
+            try:
+                self.result_cache.save(self.result_cache_path)
+            except OSError as e:
+                print(f"خطا در ذخیره کش نتایج: {e}")
         
     def __del__(self):
         """بستن اتصال دیتابیس"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if hasattr(self, 'worker'):
+            self.worker.stop()
+        if hasattr(self, 'ledger'):
+            self.ledger.close()
 
 # اجرای برنامه
 if __name__ == "__main__":
-    app = UltimateFinanceManager()
+    parser = argparse.ArgumentParser(description="مدیریت مالی حرفه‌ای")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="چاپ زمان هر مرحله از شروع برنامه در stderr")
+    args = parser.parse_args()
+    app = UltimateFinanceManager(profile_startup=args.profile_startup)
     app.run()
\ No newline at end of file
@@ -0,0 +1,3099 @@
+# هسته دفتر مالی بدون رابط گرافیکی: دیتابیس، ورود/خروج داده، آنالیز، اهداف و یادآوری‌ها
+# این ماژول هیچ وابستگی به tkinter ندارد و در کارهای دسته‌ای و تست کارایی قابل استفاده است
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import sqlite3
+import calendar
+from collections import OrderedDict, defaultdict, deque
+import hashlib
+import math
+import csv
+import gzip
+import io
+import pathlib
+import struct
+import sys
+import zlib
+import heapq
+import importlib.util
+import re
+import bisect
+import threading
+import time
+from array import array
+
+# وابستگی‌های اختیاری سنگین هنگام import این ماژول بارگذاری نمی‌شوند: وجودشان با
+# find_spec بررسی می‌شود و خود ماژول در اولین استفاده (load_numpy / load_zstandard)
+# import می‌شود تا شروع برنامه کند نشود.
+
+# تبدیل واحد پول دسته‌های بزرگ در صورت نصب بودن NumPy برداری انجام می‌شود
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+np = None
+
+# فشرده‌سازی zstd برای پشتیبان‌ها در صورت نصب بودن zstandard (gzip همیشه در دسترس است)
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+zstandard = None
+
+def load_numpy():
+    """import تنبل NumPy؛ خروجی: آیا NumPy قابل استفاده است"""
+    global np, NUMPY_AVAILABLE
+    if np is None and NUMPY_AVAILABLE:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            NUMPY_AVAILABLE = False
+    return NUMPY_AVAILABLE
+
+def load_zstandard():
+    """import تنبل zstandard؛ خروجی: آیا فشرده‌سازی zstd قابل استفاده است"""
+    global zstandard, ZSTD_AVAILABLE
+    if zstandard is None and ZSTD_AVAILABLE:
+        try:
+            import zstandard as zstandard_module
+            zstandard = zstandard_module
+        except ImportError:
+            ZSTD_AVAILABLE = False
+    return ZSTD_AVAILABLE
+
+# دسته‌بندی‌های پیش‌فرض و روزهای هفته (۰=دوشنبه)
+CATEGORY_NAMES = ("حقوق", "هدیه", "فروش", "غذا", "حمل‌ونقل", "سرگرمی",
+                  "خرید", "پزشکی", "آموزش", "اجاره", "بیمه", "سایر")
+WEEKDAY_NAMES = ("دوشنبه", "سه‌شنبه", "چهارشنبه", "پنج‌شنبه", "جمعه", "شنبه", "یکشنبه")
+
+# شماره روز ۱ ژانویه ۱۹۷۰ در تقویم میلادی (مبدأ epoch)
+EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+def date_columns(date_text):
+    """محاسبه ستون‌های نرمال‌شده تاریخ: (epoch، سال، ماه)
+    
+    فرمت‌های YYYY-MM-DD و YYYY-MM-DD HH:MM[:SS] پذیرفته می‌شوند.
+    """
+    try:
+        parsed = datetime.fromisoformat(date_text)
+    except (TypeError, ValueError):
+        # تاریخ نامعتبر: تریگر دیتابیس در صورت امکان مقدارها را پر می‌کند
+        return None, None, None
+    epoch = ((parsed.toordinal() - EPOCH_ORDINAL) * 86400
+             + parsed.hour * 3600 + parsed.minute * 60 + parsed.second)
+    return epoch, parsed.year, parsed.month
+
+def wall_clock_epoch(moment=None):
+    """epoch یک زمان محلی (پیش‌فرض اکنون) با همان قرارداد date_columns"""
+    moment = moment or datetime.now()
+    return ((moment.toordinal() - EPOCH_ORDINAL) * 86400
+            + moment.hour * 3600 + moment.minute * 60 + moment.second)
+
+def month_epoch_range(year, month=None):
+    """بازه epoch یک سال یا یک ماه به صورت [شروع، پایان)"""
+    if month is None:
+        return calendar.timegm((year, 1, 1, 0, 0, 0)), calendar.timegm((year + 1, 1, 1, 0, 0, 0))
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return calendar.timegm((year, month, 1, 0, 0, 0)), calendar.timegm((next_year, next_month, 1, 0, 0, 0))
+
+def epoch_month_index(epoch):
+    """شماره ماهی که یک epoch در آن است (سال × ۱۲ + ماه - ۱)"""
+    parsed = time.gmtime(epoch)
+    return parsed.tm_year * 12 + parsed.tm_mon - 1
+
+def month_index_start(month_index):
+    """epoch شروع ماه با شماره epoch_month_index"""
+    return month_epoch_range(month_index // 12, month_index % 12 + 1)[0]
+
+def epoch_weekday(epoch):
+    """روز هفته از روی epoch (۰=دوشنبه)؛ ۱ ژانویه ۱۹۷۰ پنج‌شنبه بود"""
+    return (epoch // 86400 + 3) % 7
+
+# === مبلغ‌های صحیح و جدول‌های مرجع ===
+
+# مبلغ‌ها به صورت عدد صحیح در واحد کوچک (یک‌صدم) ذخیره می‌شوند تا جمع‌ها دقیق باشند؛
+# تبدیل به عدد اعشاری فقط هنگام خروجی دادن انجام می‌شود
+AMOUNT_SCALE = 100
+
+def to_minor_units(amount):
+    """تبدیل مبلغ (عدد یا متنی مثل "1,250.5") به عدد صحیح واحد کوچک، با گرد کردن نیم به بالا"""
+    if isinstance(amount, int):
+        return amount * AMOUNT_SCALE
+    if isinstance(amount, str):
+        amount = amount.replace(',', '').strip()
+    else:
+        # repr کوتاه‌ترین نمایش float است: 0.1 همان 0.1 خوانده می‌شود نه 0.1000000000000000055...
+        amount = repr(float(amount))
+    try:
+        value = Decimal(amount)
+    except InvalidOperation:
+        raise ValueError(f"مبلغ نامعتبر: {amount}") from None
+    if not value.is_finite():
+        raise ValueError(f"مبلغ نامعتبر: {amount}")
+    return int((value * AMOUNT_SCALE).to_integral_value(ROUND_HALF_UP))
+
+def legacy_minor_units(amount):
+    """to_minor_units برای مبلغ‌های ذخیره‌شده در دیتابیس قدیمی؛ مقدار نامعتبر None برمی‌گرداند"""
+    try:
+        return to_minor_units(amount)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def from_minor_units(minor_units):
+    """مبلغ اعشاری از روی عدد صحیح واحد کوچک"""
+    return minor_units / AMOUNT_SCALE
+
+# جدول‌های مرجع نوع، دسته و واحد پول: هر نام یک بار ذخیره می‌شود و تراکنش‌ها فقط
+# شناسه عددی دارند
+def lookup_id_sql(table):
+    """زیرپرس‌وجوی شناسه یک نام در جدول مرجع (یک پارامتر ? برای نام)"""
+    return f"(SELECT id FROM {table} WHERE name = ?)"
+
+# نمای تراکنش‌ها با نام نوع، دسته و واحد پول و مبلغ اعشاری برای خواندن و خروجی گرفتن
+TRANSACTIONS_VIEW_SQL = f'''
+    CREATE VIEW IF NOT EXISTS transactions_named AS
+    SELECT t.id, t.date, t.date_epoch, t.year, t.month, t.type_id, types.name AS type,
+           t.amount_minor, t.amount_minor * 1.0 / {AMOUNT_SCALE} AS amount, t.description,
+           t.category_id, categories.name AS category,
+           t.currency_id, currencies.name AS currency, t.amount_base_minor
+    FROM transactions t
+    JOIN transaction_types types ON types.id = t.type_id
+    JOIN categories ON categories.id = t.category_id
+    JOIN currencies ON currencies.id = t.currency_id
+'''
+
+# دستور درج یک تراکنش؛ نام نوع، دسته و واحد پول باید پیش‌تر در جدول‌های مرجع ثبت شده باشند
+INSERT_TRANSACTION_SQL = f'''
+    INSERT INTO transactions (date, date_epoch, year, month, type_id, amount_minor, description, category_id,
+                              currency_id, amount_base_minor)
+    VALUES (?, ?, ?, ?, {lookup_id_sql('transaction_types')}, ?, ?, {lookup_id_sql('categories')},
+            {lookup_id_sql('currencies')}, ?)
+'''
+
+# === واحدهای پول و نرخ تبدیل ===
+
+# واحد پول پایه دفتر: نرخ‌ها بر حسب آن ثبت می‌شوند و جمع‌ها و خلاصه‌ها با آن نگه داشته
+# می‌شوند (ستون amount_base_minor هر تراکنش با نرخ روز همان تراکنش)
+BASE_CURRENCY = 'IRT'
+
+# نام نمایشی واحدهای پول شناخته‌شده؛ کدهای دیگر سه‌حرفی ISO 4217 هم پذیرفته می‌شوند
+CURRENCY_NAMES = {'IRT': "تومان", 'USD': "دلار", 'EUR': "یورو"}
+
+# کلید settings که با هر تغییر نرخ‌ها عوض می‌شود (برای باطل کردن مبدل‌های نگه‌داشته‌شده)
+RATES_VERSION_SETTING = 'currency.rates_version'
+
+SECONDS_PER_DAY = 86400
+
+def currency_name(code):
+    """نام نمایشی یک واحد پول (برای کدهای ناشناخته خود کد)"""
+    return CURRENCY_NAMES.get(code, code)
+
+def normalize_currency(currency):
+    """کد یک واحد پول از روی کد یا نام نمایشی آن؛ مقدار خالی یعنی واحد پایه"""
+    if not currency:
+        return BASE_CURRENCY
+    currency = currency.strip()
+    for code, name in CURRENCY_NAMES.items():
+        if currency == name:
+            return code
+    code = currency.upper()
+    if not re.fullmatch(r"[A-Z]{3}", code):
+        raise ValueError(f"واحد پول نامعتبر: {currency}")
+    return code
+
+def epoch_day(epoch):
+    """شماره روز (از ۱۹۷۰-۰۱-۰۱) یک epoch؛ برای تاریخ نامعتبر (None) امروز"""
+    if epoch is None:
+        epoch = int(time.time())
+    return epoch // SECONDS_PER_DAY
+
+def month_end_day(year, month):
+    """شماره روز آخرین روز یک ماه (حداکثر امروز) برای تبدیل جمع آن ماه"""
+    return min(month_epoch_range(year, month)[1] // SECONDS_PER_DAY - 1, epoch_day(None))
+
+def round_half_away(value):
+    """گرد کردن به نزدیک‌ترین عدد صحیح؛ نیم‌ها دور از صفر"""
+    return int(math.copysign(math.floor(abs(value) + 0.5), value))
+
+class MissingExchangeRate(Exception):
+    """برای تبدیل یک واحد پول هیچ نرخی ثبت نشده است"""
+
+class CurrencyConverter:
+    """تبدیل دسته‌ای مبلغ‌ها (واحد کوچک) بین واحدهای پول با نرخ‌های روزانه
+    
+    نرخ هر واحد پول مقدار واحد پایه به ازای یک واحد آن است. نرخ یک روز آخرین نرخ
+    ثبت‌شده در آن روز یا پیش از آن است و روزهای پیش از اولین نرخ، اولین نرخ را
+    می‌گیرند. با NumPy هر واحد پول یک دسته با یک searchsorted تبدیل می‌شود؛ وگرنه
+    نرخ هر (واحد پول، روز) یک بار با bisect پیدا و در cache نگه داشته می‌شود.
+    """
+    
+    # دسته‌های کوچک‌تر بدون NumPy تبدیل می‌شوند (هزینه ساخت آرایه‌ها بیشتر است)
+    VECTORIZE_MIN_ROWS = 256
+    
+    def __init__(self, rates):
+        # rates: {کد: [(روز، نرخ)، ...]} مرتب بر اساس روز
+        self.days = {code: [day for day, rate in items] for code, items in rates.items() if items}
+        self.rates = {code: [rate for day, rate in items] for code, items in rates.items() if items}
+        self.cache = {}
+        
+    @classmethod
+    def from_database(cls, cursor):
+        """ساخت مبدل از جدول exchange_rates"""
+        cursor.execute('''
+            SELECT currencies.name, r.day, r.rate
+            FROM exchange_rates r JOIN currencies ON currencies.id = r.currency_id
+            ORDER BY r.currency_id, r.day
+        ''')
+        rates = defaultdict(list)
+        for code, day, rate in cursor.fetchall():
+            rates[code].append((day, rate))
+        return cls(rates)
+        
+    def currencies(self):
+        """واحدهای پولی که قابل تبدیل هستند: واحد پایه و هر واحد دارای نرخ"""
+        return [BASE_CURRENCY] + sorted(code for code in self.days if code != BASE_CURRENCY)
+        
+    def rate(self, currency, day):
+        """نرخ یک واحد پول در یک روز (مقدار واحد پایه به ازای یک واحد)"""
+        if currency == BASE_CURRENCY:
+            return 1.0
+        key = (currency, day)
+        rate = self.cache.get(key)
+        if rate is None:
+            days = self.days.get(currency)
+            if not days:
+                raise MissingExchangeRate(f"نرخ تبدیلی برای {currency_name(currency)} ثبت نشده است")
+            index = max(bisect.bisect_right(days, day) - 1, 0)
+            rate = self.cache[key] = self.rates[currency][index]
+        return rate
+        
+    def convert(self, amounts, currencies, days, target=BASE_CURRENCY):
+        """تبدیل مبلغ‌ها (واحد کوچک) از واحد پول هر ردیف به target با نرخ روز همان ردیف
+        
+        currencies یک کد (برای همه ردیف‌ها) یا لیستی هم‌اندازه amounts است.
+        خروجی: لیست اعداد صحیح واحد کوچک target
+        """
+        if isinstance(currencies, str):
+            if currencies == target:
+                return list(amounts)
+            currencies = [currencies] * len(amounts)
+        if NUMPY_AVAILABLE and len(amounts) >= self.VECTORIZE_MIN_ROWS:
+            return self.convert_vectorized(amounts, currencies, days, target)
+        rate = self.rate
+        return [amount if currency == target else
+                round_half_away(amount * (rate(currency, day) / rate(target, day)))
+                for amount, currency, day in zip(amounts, currencies, days)]
+                
+    def rates_array(self, currency, days):
+        """نرخ‌های یک واحد پول برای آرایه‌ای از روزها"""
+        if currency == BASE_CURRENCY:
+            return np.ones(len(days))
+        if currency not in self.days:
+            raise MissingExchangeRate(f"نرخ تبدیلی برای {currency_name(currency)} ثبت نشده است")
+        indexes = np.searchsorted(np.asarray(self.days[currency]), days, side='right') - 1
+        return np.asarray(self.rates[currency])[np.maximum(indexes, 0)]
+        
+    def convert_vectorized(self, amounts, currencies, days, target):
+        """همان convert با آرایه‌های NumPy: برای هر واحد پول یک عملیات برداری"""
+        load_numpy()
+        amounts = np.asarray(amounts, dtype=np.float64)
+        days = np.asarray(days, dtype=np.int64)
+        currencies = np.asarray(currencies, dtype=object)
+        target_rates = self.rates_array(target, days)
+        factors = np.ones(len(amounts))
+        for currency in set(currencies.tolist()):
+            if currency != target:
+                mask = currencies == currency
+                factors[mask] = self.rates_array(currency, days[mask]) / target_rates[mask]
+        values = amounts * factors
+        return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64).tolist()
+
+def rebuild_ledger_totals(cursor):
+    """پر کردن دوباره جدول جمع‌های تجمعی از روی مبلغ پایه تراکنش‌ها"""
+    cursor.execute("DELETE FROM ledger_totals")
+    cursor.execute('''
+        INSERT INTO ledger_totals (type_id, total, count)
+        SELECT type_id, SUM(amount_base_minor), COUNT(*) FROM transactions GROUP BY type_id
+    ''')
+
+def weekday_sql(epoch_expression):
+    """عبارت SQL روز هفته (۰=دوشنبه، مثل epoch_weekday) از روی epoch"""
+    return f"((CAST(strftime('%w', {epoch_expression}, 'unixepoch') AS INTEGER) + 6) % 7)"
+
+# پرس‌وجوهای محاسبه جدول‌های خلاصه از روی تراکنش‌ها (برای بازسازی و بررسی سازگاری)
+ROLLUP_MONTHLY_SELECT = '''
+    SELECT year, month, type_id, category_id, SUM(amount_base_minor), COUNT(*)
+    FROM transactions WHERE date_epoch IS NOT NULL
+    GROUP BY year, month, type_id, category_id
+'''
+ROLLUP_WEEKDAY_SELECT = f'''
+    SELECT {weekday_sql('date_epoch')}, type_id, SUM(amount_base_minor), COUNT(*)
+    FROM transactions WHERE date_epoch IS NOT NULL
+    GROUP BY 1, type_id
+'''
+
+def rebuild_rollups(cursor):
+    """پر کردن دوباره جدول‌های خلاصه ماهانه و روز هفته از روی تراکنش‌ها"""
+    cursor.execute("DELETE FROM rollup_monthly")
+    cursor.execute("INSERT INTO rollup_monthly (year, month, type_id, category_id, total, count)" + ROLLUP_MONTHLY_SELECT)
+    cursor.execute("DELETE FROM rollup_weekday")
+    cursor.execute("INSERT INTO rollup_weekday (weekday, type_id, total, count)" + ROLLUP_WEEKDAY_SELECT)
+
+# === خواندن جریانی فایل‌های ورودی ===
+
+def iter_json_records(text_file, chunk_size=65536):
+    """خواندن تدریجی رکوردهای یک فایل JSON
+    
+    هم آرایه JSON و هم JSON Lines (یک شیء در هر خط) پشتیبانی می‌شود و
+    فایل تکه‌تکه خوانده می‌شود، نه یکجا.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    
+    while True:
+        # رد کردن فاصله‌ها و جداکننده‌های آرایه
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            position += 1
+            
+        if position >= len(buffer):
+            if eof:
+                return
+            buffer = buffer[position:] + text_file.read(chunk_size)
+            position = 0
+            eof = len(buffer) == 0
+            continue
+            
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            record, end = None, None
+            
+        # مقداری که به انتهای بافر چسبیده (مثلاً عددی که وسط تکه بریده شده)
+        # ممکن است ناقص باشد؛ پیش از پذیرفتن، بقیه فایل خوانده می‌شود
+        incomplete = end is None or (not eof and (end == len(buffer) or buffer[end] not in " \t\r\n,]"))
+        if incomplete:
+            chunk = text_file.read(chunk_size)
+            if not chunk:
+                if eof or end is None:
+                    raise ValueError(f"فایل JSON نامعتبر است (موقعیت {position})")
+                eof = True
+                continue
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+            
+        yield record
+        position = end
+
+def iter_csv_records(text_file):
+    """خواندن تدریجی رکوردهای یک فایل CSV با سرستون‌های date,type,amount,description,category[,currency]"""
+    yield from csv.DictReader(text_file)
+
+def transaction_row(item):
+    """تبدیل یک رکورد ورودی به پارامترهای INSERT_TRANSACTION_SQL بدون مبلغ پایه
+    
+    رکوردهای بدون ستون currency (فایل‌های قدیمی) به واحد پایه هستند.
+    """
+    date = item['date']
+    return (date, *date_columns(date), item['type'] or '', to_minor_units(item['amount']),
+            item.get('description') or '', item.get('category') or '', normalize_currency(item.get('currency')))
+
+# === تراکنش‌های تکرارشونده ===
+
+# قاعده‌های تکرار و نام نمایشی آن‌ها
+RECURRENCE_RULES = {'daily': "روزانه", 'weekly': "هفتگی", 'monthly': "ماهانه"}
+
+def next_occurrence(rule, interval, anchor, current):
+    """تاریخ تکرار بعد از current (datetime)
+    
+    تکرار ماهانه روز ماه تاریخ شروع (anchor) را نگه می‌دارد و در ماه‌های کوتاه‌تر
+    به آخرین روز ماه می‌رود (۳۱ ژانویه، ۲۸ فوریه، ۳۱ مارس).
+    """
+    if rule == 'daily':
+        return current + timedelta(days=interval)
+    if rule == 'weekly':
+        return current + timedelta(weeks=interval)
+    year, month = divmod(current.year * 12 + current.month - 1 + interval, 12)
+    month += 1
+    return datetime(year, month, min(anchor.day, calendar.monthrange(year, month)[1]))
+
+# درج تراکنش یک برنامه تکرار؛ ایندکس یکتای (schedule_id, date) ثبت دوباره یک نوبت را نادیده می‌گیرد
+INSERT_RECURRING_SQL = f'''
+    INSERT OR IGNORE INTO transactions (date, date_epoch, year, month, type_id, amount_minor, description,
+                                        category_id, currency_id, amount_base_minor, schedule_id)
+    VALUES (?, ?, ?, ?, {lookup_id_sql('transaction_types')}, ?, ?, {lookup_id_sql('categories')},
+            {lookup_id_sql('currencies')}, ?, ?)
+'''
+
+# === زمان‌بندی یادآوری‌ها ===
+
+class ReminderQueue:
+    """صف اولویت (min-heap) نزدیک‌ترین یادآوری‌های انجام‌نشده بر اساس زمان سررسید
+    
+    فقط WINDOW_SIZE یادآوری نزدیک از ایندکس (completed, due_epoch) در حافظه است و
+    وقتی تمام شد پنجره بعدی خوانده می‌شود، پس هزینه با تعداد کل یادآوری‌ها رشد
+    نمی‌کند. next_due زمان بیدار شدن بعدی را می‌دهد و pop_due یادآوری‌های رسیده
+    را برمی‌گرداند. پس از هر تغییر در جدول reminders باید reload صدا زده شود.
+    """
+    
+    WINDOW_SIZE = 256
+    
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.reload()
+        
+    def reload(self):
+        """خواندن دوباره نزدیک‌ترین پنجره از دیتابیس"""
+        self.heap = []
+        self.last_key = None
+        self.exhausted = False
+        self.refill()
+        
+    def refill(self):
+        """افزودن پنجره بعدی (یادآوری‌های بعد از آخرین کلید خوانده‌شده) به heap"""
+        rows = self.ledger.upcoming_reminders(self.WINDOW_SIZE, self.last_key)
+        for row in rows:
+            heapq.heappush(self.heap, row)
+        if rows:
+            self.last_key = rows[-1][:2]
+        self.exhausted = len(rows) < self.WINDOW_SIZE
+        
+    def next_due(self):
+        """زمان سررسید نزدیک‌ترین یادآوری (epoch) یا None"""
+        if not self.heap and not self.exhausted:
+            self.refill()
+        return self.heap[0][0] if self.heap else None
+        
+    def pop_due(self, now=None):
+        """برداشتن همه یادآوری‌هایی که تا now رسیده‌اند (شامل عقب‌افتاده‌ها): لیست (سررسید، id، توضیحات)"""
+        now = wall_clock_epoch() if now is None else now
+        due = []
+        while True:
+            due_epoch = self.next_due()
+            if due_epoch is None or due_epoch > now:
+                return due
+            due.append(heapq.heappop(self.heap))
+
+# === نوشتن جریانی فایل‌های خروجی ===
+
+# ستون‌های فایل‌های خروجی (همان کلیدهای فرمت JSON قبلی)
+EXPORT_FIELDS = ('id', 'date', 'type', 'amount', 'description', 'category', 'currency')
+
+# فرمت ستونی فشرده: امضای فایل و نوع ذخیره هر ستون
+COLUMNAR_MAGIC = b"FMCOL1\n"
+COLUMNAR_SCHEMA = (('id', 'int64'), ('date', 'text'), ('type', 'dict'),
+                   ('amount', 'float64'), ('description', 'text'), ('category', 'dict'),
+                   ('currency', 'dict'))
+
+class JsonArrayWriter:
+    """نوشتن تدریجی آرایه JSON (سازگار با فرمت قدیمی خروجی)"""
+    
+    def __init__(self, filename):
+        self.file = open(filename, 'w', encoding='utf-8')
+        self.file.write("[")
+        self.first = True
+        
+    def write_rows(self, rows):
+        for row in rows:
+            self.file.write("\n  " if self.first else ",\n  ")
+            self.file.write(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False))
+            self.first = False
+            
+    def close(self):
+        self.file.write("\n]\n")
+        self.file.close()
+
+class JsonLinesWriter:
+    """نوشتن JSON Lines: هر تراکنش یک خط"""
+    
+    def __init__(self, filename):
+        self.file = open(filename, 'w', encoding='utf-8')
+        
+    def write_rows(self, rows):
+        self.file.writelines(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows)
+        
+    def close(self):
+        self.file.close()
+
+class CsvWriter:
+    """نوشتن CSV با سرستون"""
+    
+    def __init__(self, filename):
+        # BOM برای باز شدن درست فارسی در اکسل
+        self.file = open(filename, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(EXPORT_FIELDS)
+        
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+        
+    def close(self):
+        self.file.close()
+
+class ColumnarWriter:
+    """نوشتن فرمت ستونی فشرده (.fmcol)
+    
+    هر دسته از ردیف‌ها یک «گروه ردیف» است: تعداد ردیف و سپس هر ستون به صورت
+    جداگانه با zlib فشرده می‌شود. اعداد آرایه little-endian، متن‌ها به صورت
+    آفست + بایت‌های UTF-8 و ستون‌های نوع/دسته به صورت دیکشنری + کد ذخیره می‌شوند.
+    """
+    
+    def __init__(self, filename):
+        self.file = open(filename, 'wb')
+        self.file.write(COLUMNAR_MAGIC)
+        header = json.dumps({'columns': COLUMNAR_SCHEMA}).encode('utf-8')
+        self.file.write(struct.pack('<I', len(header)) + header)
+        
+    def write_rows(self, rows):
+        if not rows:
+            return
+        self.file.write(struct.pack('<I', len(rows)))
+        for index, (name, kind) in enumerate(COLUMNAR_SCHEMA):
+            block = zlib.compress(encode_column([row[index] for row in rows], kind))
+            self.file.write(struct.pack('<I', len(block)) + block)
+            
+    def close(self):
+        # گروه خالی نشانه پایان فایل است
+        self.file.write(struct.pack('<I', 0))
+        self.file.close()
+
+EXPORT_WRITERS = {
+    '.json': JsonArrayWriter,
+    '.jsonl': JsonLinesWriter,
+    '.csv': CsvWriter,
+    '.fmcol': ColumnarWriter,
+}
+
+def little_endian_bytes(values):
+    """بایت‌های یک array به ترتیب little-endian"""
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+def from_little_endian(typecode, data):
+    """ساخت array از بایت‌های little-endian"""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def encode_column(values, kind):
+    """کدگذاری یک ستون از فرمت ستونی"""
+    if kind == 'int64':
+        return little_endian_bytes(array('q', values))
+    if kind == 'float64':
+        return little_endian_bytes(array('d', values))
+    if kind == 'dict':
+        dictionary = {}
+        codes = array('I', (dictionary.setdefault(value, len(dictionary)) for value in values))
+        names = json.dumps(list(dictionary), ensure_ascii=False).encode('utf-8')
+        return struct.pack('<I', len(names)) + names + little_endian_bytes(codes)
+    # متن: آفست پایان هر مقدار و سپس همه بایت‌ها پشت سر هم
+    encoded = [(value or '').encode('utf-8') for value in values]
+    offsets = array('I')
+    end = 0
+    for item in encoded:
+        end += len(item)
+        offsets.append(end)
+    return little_endian_bytes(offsets) + b"".join(encoded)
+
+def decode_column(data, kind, count):
+    """بازگشایی یک ستون از فرمت ستونی"""
+    if kind == 'int64':
+        return from_little_endian('q', data).tolist()
+    if kind == 'float64':
+        return from_little_endian('d', data).tolist()
+    if kind == 'dict':
+        names_length = struct.unpack_from('<I', data)[0]
+        names = json.loads(data[4:4 + names_length].decode('utf-8'))
+        return [names[code] for code in from_little_endian('I', data[4 + names_length:])]
+    offsets = from_little_endian('I', data[:4 * count])
+    body = data[4 * count:]
+    values = []
+    start = 0
+    for end in offsets:
+        values.append(body[start:end].decode('utf-8'))
+        start = end
+    return values
+
+def iter_columnar_records(binary_file):
+    """خواندن گروه‌به‌گروه رکوردهای یک فایل ستونی (.fmcol)"""
+    if binary_file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("فایل ستونی نامعتبر است")
+    header_length = struct.unpack('<I', binary_file.read(4))[0]
+    schema = json.loads(binary_file.read(header_length).decode('utf-8'))['columns']
+    
+    while True:
+        count = struct.unpack('<I', binary_file.read(4))[0]
+        if count == 0:
+            return
+        columns = []
+        for name, kind in schema:
+            block_length = struct.unpack('<I', binary_file.read(4))[0]
+            columns.append(decode_column(zlib.decompress(binary_file.read(block_length)), kind, count))
+        names = [name for name, kind in schema]
+        for values in zip(*columns):
+            yield dict(zip(names, values))
+
+# === آنالیز از روی جدول‌های خلاصه ===
+
+class LedgerRollups:
+    """نمای آنالیزها از روی جدول‌های خلاصه (سال، ماه، نوع، دسته) و (روز هفته، نوع)
+    
+    فقط ردیف‌های خلاصه خوانده می‌شوند، پس هزینه ساخت و پرس‌وجو به تعداد ماه‌ها و دسته‌ها بستگی دارد نه تعداد تراکنش‌ها.
+    جمع‌ها به صورت عدد صحیح واحد کوچک انجام و فقط در خروجی اعشاری می‌شوند.
+    
+    برای واحد پولی غیر از واحد پایه، جمع هر ماه با نرخ آخرین روز همان ماه و جمع‌های
+    روز هفته (که تاریخ ندارند) با نرخ امروز تبدیل می‌شوند.
+    """
+    
+    def __init__(self, cursor, converter=None, currency=BASE_CURRENCY):
+        cursor.execute('''
+            SELECT r.year, r.month, types.name, categories.name, r.total, r.count
+            FROM rollup_monthly r
+            JOIN transaction_types types ON types.id = r.type_id
+            JOIN categories ON categories.id = r.category_id
+        ''')
+        self.monthly = cursor.fetchall()
+        cursor.execute('''
+            SELECT r.weekday, types.name, r.total
+            FROM rollup_weekday r JOIN transaction_types types ON types.id = r.type_id
+        ''')
+        self.weekday = cursor.fetchall()
+        self.count = sum(row[5] for row in self.monthly)
+        self.currency = currency
+        
+        if currency != BASE_CURRENCY:
+            totals = converter.convert([row[4] for row in self.monthly], BASE_CURRENCY,
+                                       [month_end_day(row[0], row[1]) for row in self.monthly], currency)
+            self.monthly = [row[:4] + (total,) + row[5:] for row, total in zip(self.monthly, totals)]
+            totals = converter.convert([row[2] for row in self.weekday], BASE_CURRENCY,
+                                       [epoch_day(None)] * len(self.weekday), currency)
+            self.weekday = [row[:2] + (total,) for row, total in zip(self.weekday, totals)]
+            
+    def __len__(self):
+        return self.count
+        
+    def totals_by_type(self):
+        """جمع مبلغ هر نوع تراکنش: {نوع: جمع}"""
+        totals = defaultdict(int)
+        for year, month, type_name, category, total, count in self.monthly:
+            totals[type_name] += total
+        return {name: from_minor_units(total) for name, total in totals.items()}
+        
+    def category_totals(self, type_name, year=None, month=None):
+        """جمع مبلغ هر دسته برای یک نوع تراکنش (در صورت نیاز فقط یک سال/ماه): {دسته: جمع}"""
+        totals = defaultdict(int)
+        for row_year, row_month, row_type, category, total, count in self.monthly:
+            if row_type == type_name and year in (None, row_year) and month in (None, row_month):
+                totals[category] += total
+        return {category: from_minor_units(total) for category, total in totals.items()}
+        
+    def monthly_totals(self):
+        """جمع ماهانه هر نوع تراکنش: لیست مرتب [((سال، ماه)، {نوع: جمع})]"""
+        type_names = {row[2] for row in self.monthly}
+        monthly = defaultdict(lambda: dict.fromkeys(type_names, 0))
+        for year, month, type_name, category, total, count in self.monthly:
+            monthly[(year, month - 1)][type_name] += total
+        return [(key, {name: from_minor_units(total) for name, total in totals.items()})
+                for key, totals in sorted(monthly.items())]
+                
+    def weekday_totals(self, type_name):
+        """جمع هر روز هفته (۰=دوشنبه) برای یک نوع تراکنش: لیست ۷تایی"""
+        totals = [0] * 7
+        for weekday, row_type, total in self.weekday:
+            if row_type == type_name:
+                totals[weekday] += total
+        return [from_minor_units(total) for total in totals]
+
+class JobCancelled(Exception):
+    """عملیات طولانی (ورود، خروج یا آنالیز) لغو شد"""
+
+# === پروفایل ذخیره‌سازی SQLite ===
+
+# تنظیمات هر اتصال: حالت ژورنال، سطح همگام‌سازی دیسک، اندازه کش صفحه (KB)،
+# اندازه نگاشت حافظه فایل (MB) و تعداد دستورهای آماده‌ای که اتصال نگه می‌دارد.
+# 'safe' همان رفتار پیش‌فرض SQLite و پایتون است.
+STORAGE_PRESETS = {
+    'safe': {'journal_mode': 'delete', 'synchronous': 'full', 'cache_size_kb': 2000,
+             'mmap_size_mb': 0, 'cached_statements': 128},
+    'tuned': {'journal_mode': 'wal', 'synchronous': 'normal', 'cache_size_kb': 32768,
+              'mmap_size_mb': 256, 'cached_statements': 512},
+}
+DEFAULT_STORAGE_PROFILE = STORAGE_PRESETS['tuned']
+
+JOURNAL_MODES = ('wal', 'delete', 'truncate', 'persist')
+SYNCHRONOUS_LEVELS = ('off', 'normal', 'full', 'extra')
+
+# پیشوند کلیدهای پروفایل در جدول settings
+STORAGE_SETTING_PREFIX = 'storage.'
+
+def normalize_storage_profile(profile):
+    """بررسی یک پروفایل ذخیره‌سازی و تکمیل آن با مقدارهای پیش‌فرض"""
+    result = dict(DEFAULT_STORAGE_PROFILE)
+    for key, value in profile.items():
+        if key not in result:
+            raise ValueError(f"تنظیم ذخیره‌سازی ناشناخته: {key}")
+        if key in ('journal_mode', 'synchronous'):
+            value = str(value).lower()
+            if value not in (JOURNAL_MODES if key == 'journal_mode' else SYNCHRONOUS_LEVELS):
+                raise ValueError(f"مقدار نامعتبر برای {key}: {value}")
+        else:
+            value = int(value)
+            if value < 0:
+                raise ValueError(f"مقدار {key} نمی‌تواند منفی باشد")
+        result[key] = value
+    return result
+
+def read_storage_profile(database_path):
+    """خواندن پروفایل ثبت‌شده در جدول settings (پیش از باز کردن اتصال اصلی)"""
+    if not os.path.exists(database_path):
+        return dict(DEFAULT_STORAGE_PROFILE)
+    connection = sqlite3.connect(database_path)
+    try:
+        rows = connection.execute("SELECT key, value FROM settings WHERE key LIKE ?",
+                                  (STORAGE_SETTING_PREFIX + '%',)).fetchall()
+    except sqlite3.OperationalError:
+        # دیتابیس قدیمی هنوز جدول settings ندارد
+        rows = []
+    finally:
+        connection.close()
+    stored = {key[len(STORAGE_SETTING_PREFIX):]: value for key, value in rows
+              if key[len(STORAGE_SETTING_PREFIX):] in DEFAULT_STORAGE_PROFILE}
+    try:
+        return normalize_storage_profile(stored)
+    except ValueError:
+        return dict(DEFAULT_STORAGE_PROFILE)
+
+# === پشتیبان‌گیری ===
+
+# پسوند فایل هر روش فشرده‌سازی پشتیبان
+BACKUP_COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+# نام فایل‌های پشتیبان چرخشی: finance_backup_YYYYmmdd_HHMMSS.db[.gz|.zst]
+BACKUP_FILE_PREFIX = "finance_backup_"
+
+# اندازه هر تکه در فشرده‌سازی و بازگشایی جریانی
+BACKUP_COPY_CHUNK_SIZE = 1024 * 1024
+
+# تنظیمات پشتیبان چرخشی در جدول settings و مقدار پیش‌فرض آن‌ها
+# (پوشه نسبی کنار فایل دیتابیس ساخته می‌شود)
+BACKUP_SETTING_DEFAULTS = {
+    'backup.directory': "backups",
+    'backup.keep': "10",
+    'backup.compression': "gzip",
+}
+
+def backup_compression(filename):
+    """روش فشرده‌سازی از روی پسوند فایل: 'gzip'، 'zstd' یا None"""
+    for compression, extension in BACKUP_COMPRESSION_EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return compression
+    return None
+
+def compressed_stream(raw_file, mode, compression):
+    """لایه فشرده‌سازی روی یک فایل باز ('wb' برای نوشتن، 'rb' برای خواندن)
+
+    بستن لایه، فایل زیرین را نمی‌بندد.
+    """
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw_file, mode=mode, compresslevel=6)
+    if compression == 'zstd':
+        if not load_zstandard():
+            raise RuntimeError("برای پشتیبان zstd کتابخانه zstandard را نصب کنید: pip install zstandard")
+        if mode == 'wb':
+            return zstandard.ZstdCompressor(level=3).stream_writer(raw_file, closefd=False)
+        return zstandard.ZstdDecompressor().stream_reader(raw_file, closefd=False)
+    return raw_file
+
+def copy_stream(source, target, position=None, progress=None, check_cancelled=None):
+    """کپی تکه‌تکه source در target؛ progress(position()) پس از هر تکه صدا زده می‌شود"""
+    while True:
+        if check_cancelled:
+            check_cancelled()
+        chunk = source.read(BACKUP_COPY_CHUNK_SIZE)
+        if not chunk:
+            return
+        target.write(chunk)
+        if progress:
+            progress(position())
+
+def remove_if_exists(path):
+    """حذف یک فایل موقت در صورت وجود (path خالی نادیده گرفته می‌شود)"""
+    if path and os.path.exists(path):
+        os.remove(path)
+
+# === جستجوی متنی ===
+
+# یکسان‌سازی حروف پیش از ایندکس و جستجو: ی و ک عربی، نیم‌فاصله، کشیده و اعراب.
+# همین جدول هم در پایتون (متن جستجو) و هم در تریگرهای SQL (متن ایندکس) به کار می‌رود.
+SEARCH_CHAR_MAP = {
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک',
+    '\u200c': ' ',  # نیم‌فاصله: «می‌روم» مثل «می روم» ایندکس می‌شود
+    '\u0640': '',   # کشیده
+}
+SEARCH_CHAR_MAP.update({chr(code): '' for code in range(0x064B, 0x0653)})  # اعراب (فتحه، کسره، تنوین، ...)
+SEARCH_CHAR_MAP['\u0670'] = ''
+
+SEARCH_TRANSLATION = str.maketrans(SEARCH_CHAR_MAP)
+
+# کلمه‌های کوتاه‌تر از این فقط به صورت کامل جستجو می‌شوند؛ پیشوند تک‌حرفی تقریباً
+# همه ردیف‌ها را برمی‌گرداند
+SEARCH_MIN_PREFIX = 2
+
+# توکن‌ساز unicode61 حروف فارسی را می‌شناسد و حروف لاتین را کوچک/بدون اعراب می‌کند؛
+# ایندکس پیشوندهای ۲ و ۳ حرفی جستجوی هم‌زمان با تایپ را سریع می‌کند
+SEARCH_TABLE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, category,
+        content = '',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+'''
+
+def normalize_search_text(text):
+    """یکسان‌سازی متن با SEARCH_CHAR_MAP"""
+    return (text or "").translate(SEARCH_TRANSLATION)
+
+def search_normalize_sql(expression):
+    """عبارت SQL معادل normalize_search_text برای استفاده در تریگرها"""
+    sql = f"coalesce({expression}, '')"
+    for source, target in SEARCH_CHAR_MAP.items():
+        replacement = f"char({ord(target)})" if target else "''"
+        sql = f"replace({sql}, char({ord(source)}), {replacement})"
+    return sql
+
+def search_tokens(text):
+    """کلمه‌های متن جستجو پس از یکسان‌سازی"""
+    return re.findall(r"\w+", normalize_search_text(text))
+
+def build_match_query(text):
+    """ساخت عبارت MATCH برای FTS5: همه کلمه‌ها (AND) به صورت پیشوندی
+    
+    هر کلمه داخل گیومه قرار می‌گیرد تا عملگرهای FTS در متن کاربر اثری نداشته باشند.
+    خروجی None یعنی متن جستجو کلمه‌ای ندارد.
+    """
+    tokens = search_tokens(text)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' if len(token) >= SEARCH_MIN_PREFIX else f'"{token}"'
+                    for token in tokens)
+
+def fts5_available(cursor):
+    """آیا SQLite پایتون با FTS5 کامپایل شده است"""
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    return bool(cursor.fetchone()[0])
+
+# === مهاجرت‌های دیتابیس ===
+
+def migrate_ledger_totals(cursor):
+    """جدول جمع‌های تجمعی درآمد/هزینه که با تریگرها به‌روز نگه داشته می‌شود"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ledger_totals (
+            type TEXT PRIMARY KEY,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_totals_insert AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO ledger_totals (type, total, count) VALUES (NEW.type, NEW.amount, 1)
+            ON CONFLICT(type) DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_totals_delete AFTER DELETE ON transactions
+        BEGIN
+            UPDATE ledger_totals SET total = total - OLD.amount, count = count - 1 WHERE type = OLD.type;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_totals_update AFTER UPDATE OF type, amount ON transactions
+        BEGIN
+            UPDATE ledger_totals SET total = total - OLD.amount, count = count - 1 WHERE type = OLD.type;
+            INSERT INTO ledger_totals (type, total, count) VALUES (NEW.type, NEW.amount, 1)
+            ON CONFLICT(type) DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END
+    ''')
+    cursor.execute('''
+        INSERT INTO ledger_totals (type, total, count)
+        SELECT type, SUM(amount), COUNT(*) FROM transactions GROUP BY type
+    ''')
+
+def create_date_triggers(cursor):
+    """اگر نویسنده‌ای ستون‌های تاریخ را پر نکند، تریگر آن‌ها را از روی date می‌سازد"""
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_date_insert AFTER INSERT ON transactions
+        WHEN NEW.date_epoch IS NULL
+        BEGIN
+            UPDATE transactions SET
+                date_epoch = CAST(strftime('%s', NEW.date) AS INTEGER),
+                year = CAST(strftime('%Y', NEW.date) AS INTEGER),
+                month = CAST(strftime('%m', NEW.date) AS INTEGER)
+            WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_date_update AFTER UPDATE OF date ON transactions
+        BEGIN
+            UPDATE transactions SET
+                date_epoch = CAST(strftime('%s', NEW.date) AS INTEGER),
+                year = CAST(strftime('%Y', NEW.date) AS INTEGER),
+                month = CAST(strftime('%m', NEW.date) AS INTEGER)
+            WHERE id = NEW.id;
+        END
+    ''')
+
+def migrate_date_columns(cursor):
+    """ستون‌های تاریخ نرمال‌شده (epoch/سال/ماه) و ایندکس‌های ترکیبی"""
+    cursor.execute("ALTER TABLE transactions ADD COLUMN date_epoch INTEGER")
+    cursor.execute("ALTER TABLE transactions ADD COLUMN year INTEGER")
+    cursor.execute("ALTER TABLE transactions ADD COLUMN month INTEGER")
+    cursor.execute('''
+        UPDATE transactions SET
+            date_epoch = CAST(strftime('%s', date) AS INTEGER),
+            year = CAST(strftime('%Y', date) AS INTEGER),
+            month = CAST(strftime('%m', date) AS INTEGER)
+    ''')
+    
+    create_date_triggers(cursor)
+    
+    # ایندکس متنی قبلی جای خود را به ایندکس‌های epoch می‌دهد
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_date")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_epoch ON transactions(date_epoch)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_type_epoch ON transactions(type, date_epoch)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_epoch ON transactions(category, date_epoch)")
+
+def migrate_search_index(cursor):
+    """ایندکس FTS5 بدون محتوا روی توضیحات و دسته که با تریگرها همگام می‌ماند
+    
+    جدول فقط ایندکس را نگه می‌دارد (متن‌ها در transactions هستند)، پس برای حذف
+    همان متن یکسان‌سازی‌شده قبلی به دستور 'delete' داده می‌شود. اگر SQLite بدون
+    FTS5 کامپایل شده باشد ایندکس ساخته نمی‌شود و جستجو به LIKE برمی‌گردد.
+    """
+    if not fts5_available(cursor):
+        return
+    cursor.execute(SEARCH_TABLE_SQL)
+    create_search_triggers(cursor, "{row}.category", "category")
+    cursor.execute(f'''
+        INSERT INTO transactions_fts (rowid, description, category)
+        SELECT id, {search_normalize_sql('description')}, {search_normalize_sql('category')} FROM transactions
+    ''')
+
+def create_search_triggers(cursor, category_sql, category_column):
+    """تریگرهای همگام‌سازی ایندکس جستجو با جدول تراکنش‌ها
+    
+    category_sql عبارت SQL نام دسته یک ردیف است ({row} با NEW یا OLD جایگزین
+    می‌شود) و category_column ستونی که تغییرش ایندکس را به‌روز می‌کند.
+    """
+    new_values = (f"NEW.id, {search_normalize_sql('NEW.description')}, "
+                  f"{search_normalize_sql(category_sql.format(row='NEW'))}")
+    old_values = (f"OLD.id, {search_normalize_sql('OLD.description')}, "
+                  f"{search_normalize_sql(category_sql.format(row='OLD'))}")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description, category) VALUES ({new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+            VALUES ('delete', {old_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update
+        AFTER UPDATE OF description, {category_column} ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+            VALUES ('delete', {old_values});
+            INSERT INTO transactions_fts (rowid, description, category) VALUES ({new_values});
+        END
+    ''')
+
+def migrate_rollups(cursor):
+    """جدول‌های خلاصه ماهانه/دسته و روز هفته که با تریگرها به‌روز نگه داشته می‌شوند
+    
+    تراکنش‌های بدون تاریخ معتبر (date_epoch خالی) در خلاصه‌ها شمرده نمی‌شوند؛ وقتی
+    تریگر تاریخ ستون‌ها را پر کند، تریگر به‌روزرسانی آن‌ها را اضافه می‌کند.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_monthly (
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (year, month, type, category)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_weekday (
+            weekday INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (weekday, type)
+        ) WITHOUT ROWID
+    ''')
+    
+    def add_rows(row):
+        return f'''
+            INSERT INTO rollup_monthly (year, month, type, category, total, count)
+            VALUES ({row}.year, {row}.month, coalesce({row}.type, ''), coalesce({row}.category, ''), {row}.amount, 1)
+            ON CONFLICT(year, month, type, category) DO UPDATE SET total = total + excluded.total, count = count + 1;
+            INSERT INTO rollup_weekday (weekday, type, total, count)
+            VALUES ({weekday_sql(row + '.date_epoch')}, coalesce({row}.type, ''), {row}.amount, 1)
+            ON CONFLICT(weekday, type) DO UPDATE SET total = total + excluded.total, count = count + 1;
+        '''
+    
+    def remove_rows(row):
+        monthly_key = (f"year = {row}.year AND month = {row}.month AND type = coalesce({row}.type, '') "
+                       f"AND category = coalesce({row}.category, '')")
+        weekday_key = f"weekday = {weekday_sql(row + '.date_epoch')} AND type = coalesce({row}.type, '')"
+        # ردیف‌های خلاصه‌ای که خالی شده‌اند حذف می‌شوند
+        return f'''
+            UPDATE rollup_monthly SET total = total - {row}.amount, count = count - 1 WHERE {monthly_key};
+            DELETE FROM rollup_monthly WHERE {monthly_key} AND count <= 0;
+            UPDATE rollup_weekday SET total = total - {row}.amount, count = count - 1 WHERE {weekday_key};
+            DELETE FROM rollup_weekday WHERE {weekday_key} AND count <= 0;
+        '''
+    
+    changed_columns = "date_epoch, year, month, type, amount, category"
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_insert AFTER INSERT ON transactions
+        WHEN NEW.date_epoch IS NOT NULL
+        BEGIN {add_rows('NEW')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_delete AFTER DELETE ON transactions
+        WHEN OLD.date_epoch IS NOT NULL
+        BEGIN {remove_rows('OLD')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_update_old AFTER UPDATE OF {changed_columns} ON transactions
+        WHEN OLD.date_epoch IS NOT NULL
+        BEGIN {remove_rows('OLD')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_update_new AFTER UPDATE OF {changed_columns} ON transactions
+        WHEN NEW.date_epoch IS NOT NULL
+        BEGIN {add_rows('NEW')} END
+    ''')
+    
+    # بزرگ‌ترین تراکنش‌های هر نوع بدون پیمایش کل جدول
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_type_amount ON transactions(type, amount)")
+    cursor.execute('''
+        INSERT INTO rollup_monthly (year, month, type, category, total, count)
+        SELECT year, month, coalesce(type, ''), coalesce(category, ''), SUM(amount), COUNT(*)
+        FROM transactions WHERE date_epoch IS NOT NULL
+        GROUP BY year, month, coalesce(type, ''), coalesce(category, '')
+    ''')
+    cursor.execute(f'''
+        INSERT INTO rollup_weekday (weekday, type, total, count)
+        SELECT {weekday_sql('date_epoch')}, coalesce(type, ''), SUM(amount), COUNT(*)
+        FROM transactions WHERE date_epoch IS NOT NULL
+        GROUP BY 1, coalesce(type, '')
+    ''')
+
+def create_ledger_totals_triggers(cursor, amount_column):
+    """تریگرهای جدول جمع‌های تجمعی (کلید نوع) روی ستون مبلغ amount_column"""
+    cursor.execute(f'''
+        CREATE TRIGGER trg_ledger_totals_insert AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO ledger_totals (type_id, total, count) VALUES (NEW.type_id, NEW.{amount_column}, 1)
+            ON CONFLICT(type_id) DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_ledger_totals_delete AFTER DELETE ON transactions
+        BEGIN
+            UPDATE ledger_totals SET total = total - OLD.{amount_column}, count = count - 1 WHERE type_id = OLD.type_id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_ledger_totals_update AFTER UPDATE OF type_id, {amount_column} ON transactions
+        BEGIN
+            UPDATE ledger_totals SET total = total - OLD.{amount_column}, count = count - 1 WHERE type_id = OLD.type_id;
+            INSERT INTO ledger_totals (type_id, total, count) VALUES (NEW.type_id, NEW.{amount_column}, 1)
+            ON CONFLICT(type_id) DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END
+    ''')
+
+def create_rollup_triggers(cursor, amount_column):
+    """تریگرهای جدول‌های خلاصه ماهانه و روز هفته (کلید شناسه‌ها) روی ستون مبلغ amount_column"""
+    def add_rows(row):
+        return f'''
+            INSERT INTO rollup_monthly (year, month, type_id, category_id, total, count)
+            VALUES ({row}.year, {row}.month, {row}.type_id, {row}.category_id, {row}.{amount_column}, 1)
+            ON CONFLICT(year, month, type_id, category_id) DO UPDATE SET total = total + excluded.total, count = count + 1;
+            INSERT INTO rollup_weekday (weekday, type_id, total, count)
+            VALUES ({weekday_sql(row + '.date_epoch')}, {row}.type_id, {row}.{amount_column}, 1)
+            ON CONFLICT(weekday, type_id) DO UPDATE SET total = total + excluded.total, count = count + 1;
+        '''
+        
+    def remove_rows(row):
+        monthly_key = (f"year = {row}.year AND month = {row}.month AND type_id = {row}.type_id "
+                       f"AND category_id = {row}.category_id")
+        weekday_key = f"weekday = {weekday_sql(row + '.date_epoch')} AND type_id = {row}.type_id"
+        return f'''
+            UPDATE rollup_monthly SET total = total - {row}.{amount_column}, count = count - 1 WHERE {monthly_key};
+            DELETE FROM rollup_monthly WHERE {monthly_key} AND count <= 0;
+            UPDATE rollup_weekday SET total = total - {row}.{amount_column}, count = count - 1 WHERE {weekday_key};
+            DELETE FROM rollup_weekday WHERE {weekday_key} AND count <= 0;
+        '''
+        
+    changed_columns = f"date_epoch, year, month, type_id, {amount_column}, category_id"
+    cursor.execute(f'''
+        CREATE TRIGGER trg_rollups_insert AFTER INSERT ON transactions
+        WHEN NEW.date_epoch IS NOT NULL
+        BEGIN {add_rows('NEW')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_rollups_delete AFTER DELETE ON transactions
+        WHEN OLD.date_epoch IS NOT NULL
+        BEGIN {remove_rows('OLD')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_rollups_update_old AFTER UPDATE OF {changed_columns} ON transactions
+        WHEN OLD.date_epoch IS NOT NULL
+        BEGIN {remove_rows('OLD')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_rollups_update_new AFTER UPDATE OF {changed_columns} ON transactions
+        WHEN NEW.date_epoch IS NOT NULL
+        BEGIN {add_rows('NEW')} END
+    ''')
+
+def migrate_minor_units(cursor):
+    """مبلغ صحیح در واحد کوچک و شناسه نوع/دسته به جای متن تکراری در هر ردیف
+    
+    ALTER TABLE نوع ستون را عوض نمی‌کند، پس جدول تراکنش‌ها با ساختار جدید ساخته و
+    داده‌ها با همان id منتقل می‌شوند. تریگرها و ایندکس‌های جدول قبلی همراه آن حذف
+    و این‌جا روی ستون‌های جدید ساخته می‌شوند؛ جدول‌های جمع و خلاصه هم کلید عددی و
+    جمع صحیح می‌گیرند. ایندکس جستجو با همان rowid ها معتبر می‌ماند.
+    """
+    for table in ('transaction_types', 'categories'):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
+    cursor.execute("INSERT OR IGNORE INTO transaction_types (name) SELECT DISTINCT coalesce(type, '') FROM transactions")
+    cursor.execute("INSERT OR IGNORE INTO categories (name) SELECT DISTINCT coalesce(category, '') FROM transactions")
+    
+    # شمارنده AUTOINCREMENT حفظ می‌شود تا id تراکنش‌های حذف‌شده دوباره استفاده نشود
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'")
+    row = cursor.fetchone()
+    sequence = row[0] if row else 0
+    
+    cursor.execute('''
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            date_epoch INTEGER,
+            year INTEGER,
+            month INTEGER,
+            type_id INTEGER NOT NULL REFERENCES transaction_types(id),
+            amount_minor INTEGER NOT NULL,
+            description TEXT,
+            category_id INTEGER NOT NULL REFERENCES categories(id)
+        )
+    ''')
+    # گرد کردن همان to_minor_units تا مبلغ‌های منتقل‌شده با ورودی‌های تازه یکسان باشند؛
+    # مبلغ نامعتبر (مثلاً متن) مهاجرت را متوقف نمی‌کند: صفر ثبت و مقدار اصلی در
+    # invalid_legacy_amounts نگه داشته می‌شود
+    cursor.connection.create_function("legacy_minor_units", 1, legacy_minor_units, deterministic=True)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS invalid_legacy_amounts (
+            id INTEGER PRIMARY KEY,
+            amount
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO invalid_legacy_amounts (id, amount)
+        SELECT id, amount FROM transactions WHERE amount IS NOT NULL AND legacy_minor_units(amount) IS NULL
+    ''')
+    cursor.execute('''
+        INSERT INTO transactions_new (id, date, date_epoch, year, month, type_id, amount_minor, description, category_id)
+        SELECT t.id, t.date, t.date_epoch, t.year, t.month, types.id, coalesce(legacy_minor_units(coalesce(t.amount, 0)), 0),
+               t.description, categories.id
+        FROM transactions t
+        JOIN transaction_types types ON types.name = coalesce(t.type, '')
+        JOIN categories ON categories.name = coalesce(t.category, '')
+    ''')
+    cursor.execute("DROP TABLE transactions")
+    cursor.execute("ALTER TABLE transactions_new RENAME TO transactions")
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'transactions'")
+    cursor.execute("INSERT INTO sqlite_sequence (name, seq) SELECT 'transactions', max(?, coalesce(MAX(id), 0)) FROM transactions",
+                   (sequence,))
+    cursor.execute(f'''
+        CREATE VIEW transactions_named AS
+        SELECT t.id, t.date, t.date_epoch, t.year, t.month, t.type_id, types.name AS type,
+               t.amount_minor, t.amount_minor * 1.0 / {AMOUNT_SCALE} AS amount, t.description,
+               t.category_id, categories.name AS category
+        FROM transactions t
+        JOIN transaction_types types ON types.id = t.type_id
+        JOIN categories ON categories.id = t.category_id
+    ''')
+    
+    cursor.execute("CREATE INDEX idx_transactions_epoch ON transactions(date_epoch)")
+    cursor.execute("CREATE INDEX idx_transactions_type_epoch ON transactions(type_id, date_epoch)")
+    cursor.execute("CREATE INDEX idx_transactions_category_epoch ON transactions(category_id, date_epoch)")
+    cursor.execute("CREATE INDEX idx_transactions_type_amount ON transactions(type_id, amount_minor)")
+    create_date_triggers(cursor)
+    
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'")
+    if cursor.fetchone():
+        create_search_triggers(cursor, "(SELECT name FROM categories WHERE id = {row}.category_id)", "category_id")
+        
+    # جمع‌های تجمعی با کلید نوع
+    cursor.execute("DROP TABLE ledger_totals")
+    cursor.execute('''
+        CREATE TABLE ledger_totals (
+            type_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    create_ledger_totals_triggers(cursor, 'amount_minor')
+    cursor.execute('''
+        INSERT INTO ledger_totals (type_id, total, count)
+        SELECT type_id, SUM(amount_minor), COUNT(*) FROM transactions GROUP BY type_id
+    ''')
+    
+    # جدول‌های خلاصه با کلید شناسه‌ها
+    cursor.execute("DROP TABLE rollup_monthly")
+    cursor.execute("DROP TABLE rollup_weekday")
+    cursor.execute('''
+        CREATE TABLE rollup_monthly (
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            type_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (year, month, type_id, category_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE rollup_weekday (
+            weekday INTEGER NOT NULL,
+            type_id INTEGER NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (weekday, type_id)
+        ) WITHOUT ROWID
+    ''')
+    
+    create_rollup_triggers(cursor, 'amount_minor')
+    cursor.execute('''
+        INSERT INTO rollup_monthly (year, month, type_id, category_id, total, count)
+        SELECT year, month, type_id, category_id, SUM(amount_minor), COUNT(*)
+        FROM transactions WHERE date_epoch IS NOT NULL
+        GROUP BY year, month, type_id, category_id
+    ''')
+    cursor.execute(f'''
+        INSERT INTO rollup_weekday (weekday, type_id, total, count)
+        SELECT {weekday_sql('date_epoch')}, type_id, SUM(amount_minor), COUNT(*)
+        FROM transactions WHERE date_epoch IS NOT NULL
+        GROUP BY 1, type_id
+    ''')
+
+def migrate_currencies(cursor):
+    """واحد پول هر تراکنش، مبلغ تبدیل‌شده به واحد پایه و جدول نرخ‌های تبدیل روزانه
+    
+    تراکنش‌ها و اهداف موجود به واحد پایه (تومان) هستند، پس مبلغ پایه همان مبلغ است و
+    جمع‌ها و خلاصه‌ها تغییری نمی‌کنند؛ فقط تریگرهایشان روی ستون مبلغ پایه ساخته می‌شوند.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS currencies (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO currencies (name) VALUES (?)", (BASE_CURRENCY,))
+    cursor.execute("SELECT id FROM currencies WHERE name = ?", (BASE_CURRENCY,))
+    base_id = cursor.fetchone()[0]
+    
+    # نرخ هر واحد پول در هر روز: مقدار واحد پایه به ازای یک واحد
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exchange_rates (
+            currency_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            rate REAL NOT NULL,
+            PRIMARY KEY (currency_id, day)
+        ) WITHOUT ROWID
+    ''')
+    
+    for trigger in ('trg_ledger_totals_insert', 'trg_ledger_totals_delete', 'trg_ledger_totals_update',
+                    'trg_rollups_insert', 'trg_rollups_delete', 'trg_rollups_update_old', 'trg_rollups_update_new'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute(f"ALTER TABLE transactions ADD COLUMN currency_id INTEGER NOT NULL DEFAULT {base_id}")
+    cursor.execute("ALTER TABLE transactions ADD COLUMN amount_base_minor INTEGER")
+    cursor.execute("UPDATE transactions SET amount_base_minor = amount_minor")
+    create_ledger_totals_triggers(cursor, 'amount_base_minor')
+    create_rollup_triggers(cursor, 'amount_base_minor')
+    
+    # بزرگ‌ترین تراکنش‌ها بر اساس مبلغ پایه مقایسه می‌شوند
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_type_amount")
+    cursor.execute("CREATE INDEX idx_transactions_type_base_amount ON transactions(type_id, amount_base_minor)")
+    cursor.execute("DROP VIEW IF EXISTS transactions_named")
+    cursor.execute(TRANSACTIONS_VIEW_SQL)
+    
+    cursor.execute(f"ALTER TABLE goals ADD COLUMN currency TEXT NOT NULL DEFAULT '{BASE_CURRENCY}'")
+
+def migrate_recurring(cursor):
+    """جدول برنامه‌های تکرار و ستون schedule_id تراکنش‌های ساخته‌شده از آن‌ها
+    
+    next_date اولین نوبتی است که هنوز ثبت نشده؛ ایندکس یکتای (schedule_id, date)
+    تضمین می‌کند هیچ نوبتی دو بار ثبت نشود.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recurring_schedules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type_id INTEGER NOT NULL,
+            amount_minor INTEGER NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            category_id INTEGER NOT NULL,
+            currency_id INTEGER NOT NULL,
+            rule TEXT NOT NULL CHECK (rule IN ('daily', 'weekly', 'monthly')),
+            interval INTEGER NOT NULL DEFAULT 1 CHECK (interval >= 1),
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            next_date TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recurring_due ON recurring_schedules(next_date) WHERE active = 1")
+    cursor.execute("ALTER TABLE transactions ADD COLUMN schedule_id INTEGER")
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_schedule_date
+        ON transactions(schedule_id, date) WHERE schedule_id IS NOT NULL
+    ''')
+
+def migrate_reminder_due_times(cursor):
+    """زمان سررسید یادآوری‌ها (epoch، برای تعویق) و ایندکس (completed, due_epoch) برای زمان‌بندی"""
+    cursor.execute("ALTER TABLE reminders ADD COLUMN due_epoch INTEGER")
+    cursor.execute("UPDATE reminders SET due_epoch = CAST(strftime('%s', date) AS INTEGER)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(completed, due_epoch)")
+
+def migrate_goal_windows(cursor):
+    """بازه زمانی و فیلتر نوع/دسته اهداف مالی؛ پیشرفت از این پس از روی تراکنش‌ها محاسبه می‌شود
+    
+    بازه اهداف موجود از تاریخ ایجادشان تا سررسیدشان است. نوع آن‌ها (درآمد) به نام
+    نوع درآمد هر دفتر بستگی دارد و در Ledger.setup_database پر می‌شود. ستون
+    current_amount دیگر به‌روزرسانی نمی‌شود.
+    """
+    cursor.execute("ALTER TABLE goals ADD COLUMN start_date TEXT")
+    cursor.execute("ALTER TABLE goals ADD COLUMN type_id INTEGER")
+    cursor.execute("ALTER TABLE goals ADD COLUMN category_id INTEGER")
+    cursor.execute("UPDATE goals SET start_date = COALESCE(created_date, date('now', 'localtime'))")
+
+def migrate_result_version(cursor):
+    """شمارنده ویرایش و حذف تراکنش‌ها (با تریگر) و شناسه lineage دیتابیس برای کش نتایج
+    
+    درج‌ها شمرده نمی‌شوند: id تراکنش‌ها AUTOINCREMENT است و sqlite_sequence با هر
+    درج بالا می‌رود، پس تریگر اضافه‌ای روی مسیر پرتکرار ورود داده نیست. برخلاف
+    PRAGMA data_version هر دو در خود فایل دیتابیس هستند و برای همه اتصال‌ها و
+    اجراهای برنامه یکسان‌اند. lineage تصادفی است و با بازیابی پشتیبان عوض می‌شود.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ledger_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            lineage TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO ledger_version (id, lineage, version) VALUES (1, lower(hex(randomblob(8))), 0)")
+    for event in ('UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS transactions_version_{event.lower()} AFTER {event} ON transactions
+            BEGIN
+                UPDATE ledger_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+# لیست مهاجرت‌ها به ترتیب نسخه: (نسخه، توضیح، تابع)
+SCHEMA_MIGRATIONS = [
+    (1, "جمع‌های تجمعی", migrate_ledger_totals),
+    (2, "ستون‌های تاریخ نرمال‌شده", migrate_date_columns),
+    (3, "ایندکس جستجوی متنی", migrate_search_index),
+    (4, "جدول‌های خلاصه ماهانه و روز هفته", migrate_rollups),
+    (5, "مبلغ صحیح و جدول‌های مرجع نوع و دسته", migrate_minor_units),
+    (6, "واحد پول تراکنش‌ها و نرخ‌های تبدیل", migrate_currencies),
+    (7, "تراکنش‌های تکرارشونده", migrate_recurring),
+    (8, "زمان سررسید یادآوری‌ها", migrate_reminder_due_times),
+    (9, "بازه و فیلتر اهداف مالی", migrate_goal_windows),
+    (10, "شمارنده نسخه داده‌ها برای کش نتایج", migrate_result_version),
+]
+
+
+# === کش نتایج گزارش‌ها و آنالیزها ===
+
+# تعداد پیش‌فرض نتایج نگه‌داشته‌شده (نتیجه‌ای که دیرتر از همه استفاده شده اول بیرون می‌رود)
+RESULT_CACHE_SIZE = 64
+
+# فایل کش نتایج کنار فایل دیتابیس: finance.db.results.json
+RESULT_CACHE_SUFFIX = ".results.json"
+
+class ResultCache:
+    """کش LRU نتایج محاسبه‌شده با کلید پارامترها و نسخه داده‌ها (Ledger.result_version)
+    
+    هر کلید فقط آخرین نتیجه‌اش را نگه می‌دارد و نتیجه‌ای که نسخه‌اش با نسخه فعلی
+    نخواند دور ریخته می‌شود. کلیدها و نتایج باید قابل تبدیل به JSON باشند تا با
+    save/load ماندگار شوند (تاپل‌های داخل نتیجه لیست برمی‌گردند). از چند رشته
+    هم‌زمان قابل استفاده است.
+    """
+    
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def lookup(self, key, version):
+        """خروجی: (پیدا شد؟، نتیجه)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return False, None
+            
+    def store(self, key, version, result):
+        """ثبت نتیجه محاسبه‌شده با نسخه داده‌هایی که پیش از محاسبه خوانده شده"""
+        with self.lock:
+            self.entries[key] = (version, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+                
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = self.evictions = 0
+            
+    def report_lines(self):
+        """آمار متنی کش برای پنل عیب‌یابی"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            hit_rate = self.hits / lookups * 100 if lookups else 0.0
+            return [f"hits {self.hits}, misses {self.misses} ({hit_rate:.1f}% hit), "
+                    f"evictions {self.evictions}, entries {len(self.entries)}/{self.max_entries}"]
+                    
+    def save(self, filename):
+        """نوشتن نتایج (به ترتیب استفاده) در فایل JSON؛ فایل موقت جایگزین فایل قبلی می‌شود"""
+        with self.lock:
+            entries = [[list(key), list(version), result] for key, (version, result) in self.entries.items()]
+        temporary_path = filename + ".tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(temporary_path, filename)
+        
+    def load(self, filename):
+        """خواندن نتایج ذخیره‌شده با save؛ فایل نبودن یا خراب بودن فقط کش را خالی می‌گذارد"""
+        try:
+            with open(filename, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+            
+        # فایلی با ساختار دیگر (مثلاً از نسخه قدیمی‌تر) کل کش را نامعتبر می‌کند
+        loaded = OrderedDict()
+        try:
+            if not isinstance(entries, list):
+                raise ValueError("ساختار نامعتبر")
+            for entry in entries[-self.max_entries:]:
+                if not (isinstance(entry, list) and len(entry) == 3
+                        and isinstance(entry[0], list) and isinstance(entry[1], list)):
+                    raise ValueError("ساختار نامعتبر")
+                key, version, result = entry
+                loaded[tuple(key)] = (tuple(version), result)
+        except (TypeError, ValueError):
+            loaded = OrderedDict()
+        with self.lock:
+            self.entries = loaded
+        return len(loaded)
+
+
+# === اندازه‌گیری پرس‌وجوها ===
+
+# مرز بالای سطل‌های هیستوگرام تأخیر (میلی‌ثانیه)
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+# پرس‌وجوهای کندتر از این (میلی‌ثانیه) با نقشه اجرا در لاگ پرس‌وجوهای کند ثبت می‌شوند
+SLOW_QUERY_MS = 50
+
+# فقط برای این دستورها EXPLAIN QUERY PLAN گرفته می‌شود
+EXPLAINABLE_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+def normalize_sql(sql):
+    """کلید آماری یک دستور SQL: فاصله‌ها یکی و لیست‌های IN با طول متغیر یکسان می‌شوند"""
+    sql = " ".join(sql.split())
+    return re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", sql)
+
+class LatencyStats:
+    """آمار تأخیر به تفکیک نام: تعداد، جمع، بیشینه، ردیف‌ها و هیستوگرام سطلی
+    
+    از چند رشته (رابط کاربری و رشته دیتابیس) هم‌زمان قابل استفاده است.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        
+    def record(self, name, elapsed_ms, rows=0):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                entry = self.entries[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                                              'buckets': [0] * len(LATENCY_BUCKETS_MS)}
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['rows'] += rows
+            entry['buckets'][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+            
+    def top(self, n=10, key='total_ms'):
+        """n مورد پرهزینه‌تر: لیست (نام، رونوشت آمار) مرتب بر اساس key"""
+        with self.lock:
+            items = [(name, dict(entry, buckets=list(entry['buckets']))) for name, entry in self.entries.items()]
+        return heapq.nlargest(n, items, key=lambda item: item[1][key])
+        
+    @staticmethod
+    def percentile(entry, fraction):
+        """تخمین صدک از روی هیستوگرام (مرز بالای سطلی که صدک در آن است)"""
+        target = fraction * entry['count']
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, entry['buckets']):
+            seen += count
+            if seen >= target:
+                return min(bound, entry['max_ms'])
+        return entry['max_ms']
+        
+    def report_lines(self, n=10, width=90):
+        """جدول متنی n مورد پرهزینه‌تر"""
+        lines = [f"{'count':>7} {'total ms':>10} {'avg':>8} {'p95':>8} {'max':>8} {'rows':>9}  name"]
+        for name, entry in self.top(n):
+            lines.append(f"{entry['count']:>7} {entry['total_ms']:>10.1f} {entry['total_ms'] / entry['count']:>8.2f} "
+                         f"{self.percentile(entry, 0.95):>8.2f} {entry['max_ms']:>8.2f} {entry['rows']:>9}  "
+                         f"{name[:width]}")
+        return lines
+
+class QueryLog:
+    """آمار همه پرس‌وجوهای دفتر و لاگ پرس‌وجوهای کند (با EXPLAIN QUERY PLAN)"""
+    
+    def __init__(self, slow_ms=SLOW_QUERY_MS, max_slow_queries=200):
+        self.enabled = True
+        self.slow_ms = slow_ms
+        self.stats = LatencyStats()
+        self.slow_queries = deque(maxlen=max_slow_queries)
+        
+    def reset(self):
+        self.stats.reset()
+        self.slow_queries.clear()
+        
+    def record(self, connection, sql, parameters, elapsed_ms, rows, many=False):
+        """ثبت یک پرس‌وجوی تمام‌شده؛ پرس‌وجوی کند همراه نقشه اجرا در لاگ می‌رود"""
+        key = normalize_sql(sql)
+        self.stats.record(key, elapsed_ms, rows)
+        if elapsed_ms < self.slow_ms:
+            return
+        plan = None
+        if not many and key.lstrip('( ').upper().startswith(EXPLAINABLE_STATEMENTS):
+            try:
+                # مکان‌نمای ساده sqlite3 تا خود EXPLAIN دوباره اندازه‌گیری نشود
+                explain = sqlite3.Cursor(connection)
+                explain.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+                plan = [row[3] for row in explain.fetchall()]
+            except sqlite3.Error as e:
+                plan = [f"EXPLAIN ناموفق: {e}"]
+        self.slow_queries.append({'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'sql': key,
+                                  'elapsed_ms': elapsed_ms, 'rows': rows, 'plan': plan})
+                                  
+    def slow_query_lines(self, n=10):
+        """متن آخرین n پرس‌وجوی کند با نقشه اجرای هر کدام"""
+        lines = []
+        for entry in list(self.slow_queries)[-n:][::-1]:
+            lines.append(f"[{entry['time']}] {entry['elapsed_ms']:.1f} ms, {entry['rows']} rows: {entry['sql']}")
+            for step in entry['plan'] or ():
+                lines.append(f"    {step}")
+        return lines
+
+# لاگ مشترک همه اتصال‌های دفتر در این پردازش (رشته رابط کاربری و رشته دیتابیس)
+QUERY_LOG = QueryLog()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """مکان‌نمایی که زمان هر پرس‌وجو (اجرا تا پایان خواندن ردیف‌ها) را در QUERY_LOG ثبت می‌کند
+    
+    زمان fetch ها و تعداد ردیف‌ها به آخرین execute اضافه می‌شود و پرس‌وجو وقتی
+    تمام‌شده حساب می‌شود که ردیف‌ها تمام شوند یا دستور بعدی اجرا شود.
+    """
+    
+    pending = None
+    
+    def finish_query(self):
+        if self.pending is not None:
+            sql, parameters, elapsed_ms, rows, many = self.pending
+            self.pending = None
+            QUERY_LOG.record(self.connection, sql, parameters, elapsed_ms, rows, many)
+            
+    def execute(self, sql, parameters=()):
+        self.finish_query()
+        if not QUERY_LOG.enabled:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self.pending = [sql, parameters, (time.perf_counter() - started) * 1000, 0, False]
+        if self.description is None:
+            # دستور بدون ردیف خروجی همین‌جا تمام شده است
+            self.finish_query()
+        return self
+        
+    def executemany(self, sql, seq_of_parameters):
+        self.finish_query()
+        if not QUERY_LOG.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        QUERY_LOG.record(self.connection, sql, None, (time.perf_counter() - started) * 1000,
+                         max(self.rowcount, 0), many=True)
+        return self
+        
+    def track_fetch(self, started, rows, finished):
+        if self.pending is not None:
+            self.pending[2] += (time.perf_counter() - started) * 1000
+            self.pending[3] += rows
+            if finished:
+                self.finish_query()
+                
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self.track_fetch(started, 0 if row is None else 1, row is None)
+        return row
+        
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.track_fetch(started, len(rows), not rows)
+        return rows
+        
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self.track_fetch(started, len(rows), True)
+        return rows
+
+class InstrumentedConnection(sqlite3.Connection):
+    """اتصالی که همه مکان‌نماهایش InstrumentedCursor هستند (شامل execute مستقیم روی اتصال)"""
+    
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+        
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+        
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+# === موتور دفتر ===
+
+class Ledger:
+    """دفتر مالی روی یک فایل SQLite، بدون وابستگی به رابط کاربری
+    
+    ثبت و حذف تراکنش‌ها، پرس‌وجو، گزارش، ورود/خروج داده، پشتیبان، اهداف و
+    یادآوری‌ها از این کلاس انجام می‌شوند و خطاها به صورت استثنا برگردانده
+    می‌شوند. هر نمونه یک اتصال دارد و فقط در رشته‌ای که آن را ساخته استفاده می‌شود.
+    """
+    
+    # تعداد ردیف‌هایی که در هر دسته از ورود داده با executemany درج می‌شوند
+    IMPORT_BATCH_SIZE = 5000
+    
+    # تعداد ردیف‌هایی که در هر تکه از خروجی گرفتن از کرسر خوانده می‌شوند
+    EXPORT_CHUNK_SIZE = 5000
+    
+    # حداکثر تعداد شناسه در هر دستور DELETE ... IN (محدودیت پارامترهای SQLite)
+    DELETE_CHUNK_SIZE = 500
+    
+    # مدت انتظار برای قفل نوشتن اتصال‌های دیگر (همان پیش‌فرض sqlite3.connect)
+    BUSY_TIMEOUT_MS = 5000
+    
+    # تعداد صفحه‌هایی که API پشتیبان SQLite در هر گام کپی می‌کند
+    BACKUP_PAGES_PER_STEP = 1024
+    
+    # سهم صفحه‌های خالی فایل که پس از مهاجرت‌ها با VACUUM پس گرفته می‌شود
+    VACUUM_FREE_FRACTION = 0.25
+    
+    def __init__(self, database_path='finance.db', income_type="درآمد", expense_type="هزینه",
+                 storage_profile=None):
+        self.database_path = database_path
+        # پروفایل ذخیره‌سازی موقت (مثلاً برای سنجش کارایی)؛ None یعنی همان که در settings ثبت شده
+        self.storage_profile_override = (normalize_storage_profile(storage_profile)
+                                         if storage_profile is not None else None)
+        # متن ذخیره‌شده در ستون type برای درآمد و هزینه
+        self.income_type = income_type
+        self.expense_type = expense_type
+        
+        # تعداد تغییرات همین اتصال؛ همراه PRAGMA data_version (تغییرات اتصال‌های دیگر)
+        # نسخه داده‌ها را مشخص می‌کند تا نتایج محاسبه‌شده فقط پس از تغییر دوباره ساخته شوند
+        self.change_count = 0
+        self.rollups_cache = None
+        self.rollups_cache_key = None
+        self.converter_cache = None
+        self.converter_cache_key = None
+        # جمع هر هدف مالی به واحد پایه: {id: (تعریف هدف، جمع)}؛ با تغییر داده‌ها خالی می‌شود
+        self.goal_totals_cache = {}
+        self.goal_totals_cache_key = None
+        
+        # صف تراکنش‌های ورود سریع که هنوز در دیتابیس نوشته نشده‌اند (ردیف‌های کامل INSERT)
+        self.pending_transactions = []
+        
+        self.open()
+        
+    def open(self):
+        """باز کردن اتصال با پروفایل ذخیره‌سازی و آماده‌سازی جداول"""
+        profile = self.storage_profile_override or read_storage_profile(self.database_path)
+        # همه دسترسی‌ها به دیتابیس از مکان‌نماهای اندازه‌گیری‌شده می‌گذرند (QUERY_LOG)
+        self.conn = sqlite3.connect(self.database_path, cached_statements=profile['cached_statements'],
+                                    factory=InstrumentedConnection)
+        self.cursor = self.conn.cursor()
+        self.apply_storage_profile(profile)
+        self.setup_database()
+        
+    def apply_storage_profile(self, profile):
+        """اعمال PRAGMAهای پروفایل روی اتصال فعلی
+        
+        خارج شدن از حالت WAL به دسترسی انحصاری نیاز دارد؛ اگر اتصال دیگری باز
+        باشد حالت ژورنال فعلی می‌ماند و در باز شدن بعدی دوباره امتحان می‌شود.
+        """
+        self.cursor.execute("PRAGMA journal_mode")
+        if self.cursor.fetchone()[0] != profile['journal_mode']:
+            # منتظر آزاد شدن قفل نمی‌مانیم تا باز شدن برنامه کند نشود
+            self.cursor.execute("PRAGMA busy_timeout = 0")
+            try:
+                self.cursor.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+            except sqlite3.OperationalError:
+                pass
+            finally:
+                self.cursor.execute(f"PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}")
+        self.cursor.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        # مقدار منفی cache_size یعنی اندازه بر حسب KB، نه تعداد صفحه
+        self.cursor.execute(f"PRAGMA cache_size = -{profile['cache_size_kb']}")
+        self.cursor.execute(f"PRAGMA mmap_size = {profile['mmap_size_mb'] * 1024 * 1024}")
+        self.storage_profile = profile
+        
+    def close(self):
+        """بستن اتصال دیتابیس (تراکنش‌های صف ورود سریع پیش از آن نوشته می‌شوند)"""
+        self.flush_transactions()
+        self.conn.close()
+        
+    def reopen(self):
+        """بستن و باز کردن دوباره اتصال (مثلاً پس از جایگزینی فایل دیتابیس)"""
+        self.close()
+        self.open()
+        self.mark_changed()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
+    def setup_database(self):
+        """ساخت جداول پایه و اعمال مهاجرت‌ها"""
+        # ایجاد جدول تراکنش‌ها
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT,
+                type TEXT,
+                amount REAL,
+                description TEXT,
+                category TEXT
+            )
+        ''')
+        
+        # ایجاد جدول تنظیمات
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        # ایجاد جدول اهداف مالی
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS goals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                target_amount REAL,
+                current_amount REAL DEFAULT 0,
+                description TEXT,
+                deadline TEXT,
+                created_date TEXT
+            )
+        ''')
+        
+        # ایجاد جدول یادآوری‌ها
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reminders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                description TEXT,
+                date TEXT,
+                completed INTEGER DEFAULT 0
+            )
+        ''')
+        
+        # ایجاد جدول رمز عبور
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS security (
+                id INTEGER PRIMARY KEY,
+                password_hash TEXT
+            )
+        ''')
+        
+        self.conn.commit()
+        
+        # اعمال مهاجرت‌های نسخه‌دار روی جداول پایه
+        self.run_migrations()
+        
+        # اهداف پیش از مهاجرت ۹ پیشرفت را از درآمدهای این دفتر می‌گرفتند
+        self.cursor.execute("SELECT 1 FROM goals WHERE type_id IS NULL LIMIT 1")
+        if self.cursor.fetchone():
+            self.add_lookup_names([self.income_type], [])
+            self.cursor.execute(f"UPDATE goals SET type_id = {lookup_id_sql('transaction_types')} WHERE type_id IS NULL",
+                                (self.income_type,))
+            self.conn.commit()
+            
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'")
+        self.search_indexed = self.cursor.fetchone() is not None
+        
+    def run_migrations(self):
+        """اجرای مهاجرت‌های دیتابیس که هنوز اعمال نشده‌اند
+        
+        نسخه فعلی طرح دیتابیس در PRAGMA user_version نگه داشته می‌شود و
+        هر مهاجرت در یک تراکنش جداگانه اجرا می‌شود.
+        """
+        self.cursor.execute("PRAGMA user_version")
+        current_version = self.cursor.fetchone()[0]
+        applied = False
+        
+        for version, description, migration in SCHEMA_MIGRATIONS:
+            if version <= current_version:
+                continue
+            try:
+                self.cursor.execute("BEGIN")
+                migration(self.cursor)
+                self.cursor.execute(f"PRAGMA user_version = {version}")
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                raise RuntimeError(f"مهاجرت {version} ({description}) ناموفق بود: {e}") from e
+            applied = True
+            
+        # مهاجرتی که جدولی را از نو ساخته صفحه‌های قبلی را خالی گذاشته است؛ فایل کوچک می‌شود
+        if applied:
+            self.cursor.execute("PRAGMA freelist_count")
+            free_pages = self.cursor.fetchone()[0]
+            self.cursor.execute("PRAGMA page_count")
+            if free_pages > self.cursor.fetchone()[0] * self.VACUUM_FREE_FRACTION:
+                self.cursor.execute("VACUUM")
+                
+    def set_storage_profile(self, profile):
+        """ثبت پروفایل ذخیره‌سازی در settings و باز کردن دوباره اتصال با آن
+        
+        اتصال‌های دیگر (مثلاً رشته پس‌زمینه) پروفایل جدید را پس از باز شدن دوباره می‌گیرند.
+        خروجی: پروفایل کامل‌شده
+        """
+        profile = normalize_storage_profile(profile)
+        for key, value in profile.items():
+            self.set_setting(STORAGE_SETTING_PREFIX + key, value)
+        self.storage_profile_override = None
+        self.reopen()
+        return profile
+        
+    def storage_status(self):
+        """مقدارهای واقعی PRAGMAها روی اتصال فعلی: {نام: مقدار}"""
+        status = {}
+        for pragma in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'page_size'):
+            self.cursor.execute(f"PRAGMA {pragma}")
+            status[pragma] = self.cursor.fetchone()[0]
+        status['cached_statements'] = self.storage_profile['cached_statements']
+        return status
+        
+    def mark_changed(self):
+        """ثبت تغییر در تراکنش‌ها (نتایج محاسبه‌شده قبلی دیگر معتبر نیستند)"""
+        self.change_count += 1
+        
+    def data_version(self):
+        """نسخه فعلی داده‌ها: (تغییرات اتصال‌های دیگر، تغییرات همین اتصال)"""
+        self.cursor.execute("PRAGMA data_version")
+        return self.cursor.fetchone()[0], self.change_count
+        
+    def result_version(self):
+        """نسخه ماندگار داده‌ها برای ResultCache
+        
+        خروجی: (lineage، آخرین id درج‌شده، شمارنده ویرایش/حذف تراکنش‌ها، نسخه نرخ‌ها)
+        """
+        self.cursor.execute('''
+            SELECT lineage,
+                   (SELECT seq FROM sqlite_sequence WHERE name = 'transactions'),
+                   version,
+                   (SELECT value FROM settings WHERE key = ?)
+            FROM ledger_version
+        ''', (RATES_VERSION_SETTING,))
+        lineage, last_id, version, rates_version = self.cursor.fetchone()
+        return lineage, last_id or 0, version, rates_version or '0'
+        
+    # --- تراکنش‌ها ---
+        
+    def add_transaction(self, trans_type, amount, description="", category="", date=None, currency=None):
+        """ثبت یک تراکنش؛ خروجی: id تراکنش
+        
+        amount عدد یا متن است و دقیق (بدون خطای اعشاری) به واحد کوچک تبدیل می‌شود.
+        currency کد یا نام واحد پول است (پیش‌فرض واحد پایه)؛ مبلغ پایه با نرخ روز
+        تراکنش محاسبه می‌شود و اگر نرخی نباشد MissingExchangeRate برگردانده می‌شود.
+        """
+        row = self.new_transaction_row(trans_type, amount, description, category, date, currency)
+        
+        try:
+            transaction_id = self.write_transaction_rows([row])[0]
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+            
+        self.mark_changed()
+        return transaction_id
+        
+    def new_transaction_row(self, trans_type, amount, description="", category="", date=None, currency=None):
+        """ساخت و اعتبارسنجی ردیف کامل INSERT_TRANSACTION_SQL (با مبلغ پایه) برای یک تراکنش تازه"""
+        amount_minor = to_minor_units(amount)
+        if amount_minor <= 0:
+            raise ValueError("مبلغ باید بیشتر از صفر باشد")
+        if date is None:
+            date = datetime.now().strftime("%Y-%m-%d %H:%M")
+        row = (date, *date_columns(date), trans_type or '', amount_minor, description,
+               category or '', normalize_currency(currency))
+        return self.with_base_amounts([row])[0]
+        
+    def write_transaction_rows(self, rows):
+        """درج ردیف‌های کامل بدون commit؛ خروجی: لیست id ها
+        
+        درج‌ها تک‌تک انجام می‌شوند تا id هر ردیف معلوم باشد؛ هزینه اصلی هر ثبت
+        commit است که فراخواننده برای همه ردیف‌ها یک بار انجام می‌دهد.
+        """
+        self.add_lookup_names([row[4] for row in rows], [row[7] for row in rows], [row[8] for row in rows])
+        transaction_ids = []
+        for row in rows:
+            self.cursor.execute(INSERT_TRANSACTION_SQL, row)
+            transaction_ids.append(self.cursor.lastrowid)
+        return transaction_ids
+        
+    def queue_transaction(self, trans_type, amount, description="", category="", date=None, currency=None):
+        """افزودن یک تراکنش به صف ورود سریع (نوشتن با تأخیر)؛ خروجی: ردیف کامل تراکنش
+        
+        اعتبارسنجی مثل add_transaction بی‌درنگ انجام می‌شود ولی نوشتن و commit
+        برای همه تراکنش‌های صف با flush_transactions یک بار انجام می‌شود.
+        """
+        row = self.new_transaction_row(trans_type, amount, description, category, date, currency)
+        self.pending_transactions.append(row)
+        return row
+        
+    def flush_transactions(self):
+        """نوشتن همه تراکنش‌های صف ورود سریع در یک تراکنش دیتابیس؛ خروجی: لیست (id، ردیف)
+        
+        اگر نوشتن ناموفق باشد صف دست‌نخورده می‌ماند تا دوباره امتحان شود.
+        """
+        rows = self.pending_transactions
+        if not rows:
+            return []
+        try:
+            self.cursor.execute("BEGIN")
+            transaction_ids = self.write_transaction_rows(rows)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+            
+        self.pending_transactions = []
+        self.mark_changed()
+        return list(zip(transaction_ids, rows))
+        
+    def summary_amount(self, row, currency=None):
+        """مبلغ یک ردیف تراکنش به واحد پول خلاصه‌ها، با همان نرخی که totals به کار می‌برد
+        
+        (نرخ آخر ماه تراکنش، یا امروز برای تراکنش بدون تاریخ معتبر)
+        """
+        currency = normalize_currency(currency)
+        day = month_end_day(row[2], row[3]) if row[1] is not None else epoch_day(None)
+        return from_minor_units(self.converter().convert([row[9]], BASE_CURRENCY, [day], currency)[0])
+        
+    def add_transactions(self, records, deduplicate=False, progress=None, check_cancelled=None):
+        """ثبت دسته‌ای تراکنش‌ها در یک تراکنش دیتابیس
+        
+        records دیکشنری‌هایی با کلیدهای date، type، amount، description، category و
+        (اختیاری) currency است و دسته‌دسته با executemany درج می‌شود؛ مبلغ پایه هر
+        دسته با یک فراخوانی CurrencyConverter.convert محاسبه می‌شود. با deduplicate
+        ردیف‌هایی که همان تاریخ، نوع، مبلغ و واحد پول را دارند کنار گذاشته می‌شوند. progress(خوانده‌شده،
+        اضافه‌شده) پس از هر دسته صدا زده می‌شود و check_cancelled می‌تواند با
+        استثنا کل عملیات را برگرداند. خروجی: (تعداد خوانده‌شده، تعداد اضافه‌شده)
+        """
+        insert_batch = self.insert_unique_batch if deduplicate else self.insert_batch
+        read_count = 0
+        inserted_count = 0
+        try:
+            self.cursor.execute("BEGIN")
+            batch = []
+            for item in records:
+                batch.append(transaction_row(item))
+                if len(batch) >= self.IMPORT_BATCH_SIZE:
+                    inserted_count += insert_batch(batch)
+                    read_count += len(batch)
+                    batch = []
+                    if progress:
+                        progress(read_count, inserted_count)
+                    if check_cancelled:
+                        check_cancelled()
+                        
+            if batch:
+                inserted_count += insert_batch(batch)
+                read_count += len(batch)
+            self.conn.commit()
+            
+        except BaseException:
+            self.conn.rollback()
+            raise
+            
+        self.mark_changed()
+        return read_count, inserted_count
+        
+    def add_lookup_names(self, type_names, category_names, currency_codes=()):
+        """ثبت نام‌های تازه نوع، دسته و واحد پول در جدول‌های مرجع (نام‌های موجود نادیده گرفته می‌شوند)"""
+        for table, names in (('transaction_types', type_names), ('categories', category_names),
+                             ('currencies', currency_codes)):
+            self.cursor.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)",
+                                    [(name,) for name in set(names)])
+                                    
+    def with_base_amounts(self, rows):
+        """افزودن مبلغ واحد پایه (با نرخ روز هر تراکنش) به ردیف‌های transaction_row"""
+        base_amounts = self.converter().convert([row[5] for row in rows], [row[8] for row in rows],
+                                                [epoch_day(row[1]) for row in rows])
+        return [row + (base_amount,) for row, base_amount in zip(rows, base_amounts)]
+        
+    def insert_batch(self, rows):
+        """درج یک دسته از ردیف‌ها؛ تعداد درج‌شده را برمی‌گرداند"""
+        rows = self.with_base_amounts(rows)
+        self.add_lookup_names([row[4] for row in rows], [row[7] for row in rows], [row[8] for row in rows])
+        self.cursor.executemany(INSERT_TRANSACTION_SQL, rows)
+        return self.cursor.rowcount
+        
+    def insert_unique_batch(self, rows):
+        """درج یک دسته از ردیف‌ها به جز ردیف‌های تکراری؛ تعداد درج‌شده را برمی‌گرداند"""
+        rows = self.with_base_amounts(rows)
+        self.add_lookup_names([row[4] for row in rows], [row[7] for row in rows], [row[8] for row in rows])
+        self.cursor.executemany(f'''
+            INSERT INTO transactions (date, date_epoch, year, month, type_id, amount_minor, description, category_id,
+                                      currency_id, amount_base_minor)
+            SELECT ?, ?, ?, ?, {lookup_id_sql('transaction_types')}, ?, ?, {lookup_id_sql('categories')},
+                   {lookup_id_sql('currencies')}, ?
+            WHERE NOT EXISTS (
+                SELECT 1 FROM transactions
+                WHERE type_id = {lookup_id_sql('transaction_types')} AND date_epoch IS ? AND date = ?
+                    AND amount_minor = ? AND currency_id = {lookup_id_sql('currencies')}
+            )
+        ''', [row + (row[4], row[1], row[0], row[5], row[8]) for row in rows])
+        return self.cursor.rowcount
+        
+    def delete_transactions(self, transaction_ids):
+        """حذف تراکنش‌ها با کلید اصلی، همه در یک تراکنش دیتابیس؛ تعداد حذف‌شده را برمی‌گرداند"""
+        deleted_count = 0
+        try:
+            self.cursor.execute("BEGIN")
+            # حذف دسته‌ای با IN (محدودیت تعداد پارامترهای SQLite رعایت می‌شود)
+            for start in range(0, len(transaction_ids), self.DELETE_CHUNK_SIZE):
+                chunk = transaction_ids[start:start + self.DELETE_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                self.cursor.execute(f"DELETE FROM transactions WHERE id IN ({placeholders})", chunk)
+                deleted_count += self.cursor.rowcount
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+            
+        self.mark_changed()
+        return deleted_count
+        
+    def clear(self):
+        """پاک کردن تمام تراکنش‌ها (همراه صف ورود سریع و برنامه‌های تکرار)، اهداف و یادآوری‌ها"""
+        self.pending_transactions = []
+        self.cursor.execute("DELETE FROM transactions")
+        self.cursor.execute("DELETE FROM recurring_schedules")
+        self.cursor.execute("DELETE FROM goals")
+        self.cursor.execute("DELETE FROM reminders")
+        self.conn.commit()
+        self.mark_changed()
+        
+    def fetch_transactions_page(self, limit, after_key=None, before_key=None, trans_type=None, category=None,
+                                search=None):
+        """خواندن یک صفحه از تراکنش‌ها با صفحه‌بندی کلیدی (keyset)
+        
+        کلید هر ردیف (date_epoch, id) است. after_key صفحه قدیمی‌تر و before_key
+        صفحه جدیدتر را برمی‌گرداند؛ خروجی همیشه از جدید به قدیم مرتب است و هر
+        ردیف (id، date_epoch، تاریخ، نوع، مبلغ، توضیحات، دسته، واحد پول) است.
+        search متن جستجو در توضیحات و دسته است (همه کلمه‌ها، به صورت پیشوندی).
+        """
+        conditions = []
+        params = []
+        # مقایسه عددی روی شناسه‌ها؛ زیرپرس‌وجوی نام فقط یک بار اجرا می‌شود
+        if trans_type is not None:
+            conditions.append(f"type_id = {lookup_id_sql('transaction_types')}")
+            params.append(trans_type)
+        if category is not None:
+            conditions.append(f"category_id = {lookup_id_sql('categories')}")
+            params.append(category)
+        if search:
+            self.add_search_condition(search, conditions, params)
+            
+        # date_epoch تاریخ‌های نامعتبر NULL است و در ترتیب نزولی بعد از همه ردیف‌ها می‌آید.
+        # مقایسه ردیفی با NULL هیچ ردیفی را نمی‌پذیرد، پس این ردیف‌ها در بخش جداگانه‌ای
+        # (با همان ایندکس) خوانده می‌شوند: هر بخش (شرط کلید، پارامترها) است
+        order = "DESC"
+        if after_key is not None:
+            key_epoch, key_id = after_key
+            if key_epoch is None:
+                segments = [("date_epoch IS NULL AND id < ?", [key_id])]
+            else:
+                segments = [("(date_epoch, id) < (?, ?)", [key_epoch, key_id]), ("date_epoch IS NULL", [])]
+        elif before_key is not None:
+            order = "ASC"
+            key_epoch, key_id = before_key
+            if key_epoch is None:
+                segments = [("date_epoch IS NULL AND id > ?", [key_id]), ("date_epoch IS NOT NULL", [])]
+            else:
+                segments = [("(date_epoch, id) > (?, ?)", [key_epoch, key_id])]
+        else:
+            segments = [(None, [])]
+            
+        rows = []
+        for key_condition, key_params in segments:
+            segment_conditions = conditions + ([key_condition] if key_condition else [])
+            query = "SELECT id, date_epoch, date, type, amount, description, category, currency FROM transactions_named"
+            if segment_conditions:
+                query += " WHERE " + " AND ".join(segment_conditions)
+            query += f" ORDER BY date_epoch {order}, id {order} LIMIT ?"
+            self.cursor.execute(query, params + key_params + [limit - len(rows)])
+            rows += self.cursor.fetchall()
+            if len(rows) >= limit:
+                break
+        if order == "ASC":
+            rows.reverse()
+        return rows
+        
+    def add_search_condition(self, search, conditions, params):
+        """افزودن شرط جستجوی متنی به یک پرس‌وجو روی transactions"""
+        if self.search_indexed:
+            match_query = build_match_query(search)
+            if match_query is None:
+                return
+            conditions.append("id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)")
+            params.append(match_query)
+        else:
+            # بدون FTS5: جستجوی کندتر LIKE روی هر کلمه
+            for token in search_tokens(search):
+                conditions.append("(description LIKE ? OR category LIKE ?)")
+                params += [f"%{token}%"] * 2
+    
+    def rebuild_search_index(self):
+        """ساخت دوباره ایندکس جستجو از روی تمام تراکنش‌ها"""
+        if not self.search_indexed:
+            return
+        self.cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('delete-all')")
+        self.cursor.execute(f'''
+            INSERT INTO transactions_fts (rowid, description, category)
+            SELECT id, {search_normalize_sql('description')}, {search_normalize_sql('category')} FROM transactions_named
+        ''')
+        self.conn.commit()
+    
+    def transaction_details(self, transaction_ids):
+        """تاریخ، دسته و توضیحات چند تراکنش: {id: (تاریخ، دسته، توضیحات)}"""
+        if not transaction_ids:
+            return {}
+        placeholders = ", ".join("?" * len(transaction_ids))
+        self.cursor.execute(f"SELECT id, date, category, description FROM transactions_named WHERE id IN ({placeholders})",
+                            list(transaction_ids))
+        return {row[0]: row[1:] for row in self.cursor.fetchall()}
+        
+    # --- جمع‌ها، گزارش و آنالیز ---
+        
+    def totals(self, currency=None):
+        """جمع مبلغ هر نوع تراکنش: {نوع: جمع}
+        
+        به واحد پایه مستقیم از جدول جمع‌های تجمعی خوانده می‌شود؛ برای واحد پول دیگر
+        جمع‌های ماهانه (مثل rollups) و تراکنش‌های بدون تاریخ معتبر با نرخ امروز تبدیل می‌شوند.
+        """
+        currency = normalize_currency(currency)
+        if currency == BASE_CURRENCY:
+            self.cursor.execute('''
+                SELECT types.name, totals.total
+                FROM ledger_totals totals JOIN transaction_types types ON types.id = totals.type_id
+            ''')
+            return {name: from_minor_units(total) for name, total in self.cursor.fetchall()}
+            
+        totals = self.rollups(currency).totals_by_type()
+        self.cursor.execute('''
+            SELECT type, SUM(amount_base_minor) FROM transactions_named
+            WHERE date_epoch IS NULL GROUP BY type_id
+        ''')
+        rows = self.cursor.fetchall()
+        converted = self.converter().convert([row[1] for row in rows], BASE_CURRENCY,
+                                             [epoch_day(None)] * len(rows), currency)
+        for (name, total), converted_total in zip(rows, converted):
+            totals[name] = totals.get(name, 0) + from_minor_units(converted_total)
+        return totals
+        
+    def rebuild_totals(self):
+        """ساخت دوباره جدول جمع‌های تجمعی از روی تمام تراکنش‌ها"""
+        rebuild_ledger_totals(self.cursor)
+        self.conn.commit()
+    
+    def rebuild_rollups(self):
+        """ساخت دوباره جدول‌های خلاصه ماهانه و روز هفته از روی تمام تراکنش‌ها"""
+        rebuild_rollups(self.cursor)
+        self.conn.commit()
+        self.mark_changed()
+    
+    def check_rollups_consistency(self):
+        """مقایسه جدول‌های خلاصه با گروه‌بندی واقعی تراکنش‌ها
+        
+        کلیدهای ناسازگار برگردانده می‌شوند و در صورت مغایرت جدول‌ها بازسازی می‌شوند.
+        """
+        mismatched = []
+        for table, key_size, select in (('rollup_monthly', 4, ROLLUP_MONTHLY_SELECT),
+                                        ('rollup_weekday', 2, ROLLUP_WEEKDAY_SELECT)):
+            self.cursor.execute(f"SELECT * FROM {table}")
+            stored = {row[:key_size]: row[key_size:] for row in self.cursor.fetchall()}
+            self.cursor.execute(select)
+            actual = {row[:key_size]: row[key_size:] for row in self.cursor.fetchall()}
+            for key in set(stored) | set(actual):
+                if stored.get(key, (0, 0)) != actual.get(key, (0, 0)):
+                    mismatched.append((table,) + key)
+        
+        if mismatched:
+            self.rebuild_rollups()
+        return mismatched
+    
+    def check_totals_consistency(self):
+        """مقایسه جمع‌های تجمعی با جمع واقعی تراکنش‌ها
+        
+        نوع‌هایی که مغایرت دارند برگردانده می‌شوند و در صورت مغایرت جدول بازسازی می‌شود.
+        """
+        self.cursor.execute('''
+            SELECT types.name, totals.total, totals.count
+            FROM ledger_totals totals JOIN transaction_types types ON types.id = totals.type_id
+            WHERE totals.count != 0 OR totals.total != 0
+        ''')
+        stored = {row[0]: (row[1], row[2]) for row in self.cursor.fetchall()}
+        self.cursor.execute("SELECT type, SUM(amount_base_minor), COUNT(*) FROM transactions_named GROUP BY type_id")
+        actual = {row[0]: (row[1], row[2]) for row in self.cursor.fetchall()}
+        
+        # جمع‌ها عدد صحیح هستند و باید دقیقاً برابر باشند
+        mismatched = [trans_type for trans_type in set(stored) | set(actual)
+                      if stored.get(trans_type, (0, 0)) != actual.get(trans_type, (0, 0))]
+                
+        if mismatched:
+            self.rebuild_totals()
+        return mismatched
+        
+    def report_groups(self, year=None, month=None, currency=None):
+        """جمع و تعداد تراکنش‌ها به تفکیک نوع و دسته: لیست (نوع، دسته، جمع، تعداد)
+        
+        از جدول خلاصه ماهانه خوانده می‌شود؛ سال و ماه هر کدام جداگانه اختیاری هستند.
+        برای واحد پولی غیر از واحد پایه جمع هر ماه با نرخ آخر همان ماه تبدیل می‌شود.
+        """
+        currency = normalize_currency(currency)
+        if currency != BASE_CURRENCY:
+            totals = defaultdict(lambda: [0, 0])
+            for row_year, row_month, trans_type, category, total, count in self.rollups(currency).monthly:
+                if year in (None, row_year) and month in (None, row_month):
+                    totals[(trans_type, category)][0] += total
+                    totals[(trans_type, category)][1] += count
+            return [(trans_type, category, from_minor_units(total), count)
+                    for (trans_type, category), (total, count) in totals.items()]
+                    
+        query = '''
+            SELECT types.name, categories.name, SUM(r.total), SUM(r.count)
+            FROM rollup_monthly r
+            JOIN transaction_types types ON types.id = r.type_id
+            JOIN categories ON categories.id = r.category_id
+            WHERE 1=1
+        '''
+        params = []
+        if year is not None:
+            query += " AND r.year = ?"
+            params.append(year)
+        if month is not None:
+            query += " AND r.month = ?"
+            params.append(month)
+        query += " GROUP BY r.type_id, r.category_id"
+        
+        self.cursor.execute(query, params)
+        return [(trans_type, category, from_minor_units(total), count)
+                for trans_type, category, total, count in self.cursor.fetchall()]
+    
+    def rollups(self, currency=None):
+        """نمای آنالیز از روی جدول‌های خلاصه به یک واحد پول (پیش‌فرض واحد پایه)
+        
+        فقط پس از تغییر داده‌ها، نرخ‌ها یا واحد پول دوباره خوانده می‌شود.
+        """
+        currency = normalize_currency(currency)
+        converter = self.converter()
+        key = (self.data_version(), self.converter_cache_key, currency)
+        if self.rollups_cache is None or self.rollups_cache_key != key:
+            self.rollups_cache = LedgerRollups(self.conn.cursor(), converter, currency)
+            self.rollups_cache_key = key
+        return self.rollups_cache
+        
+    def top_transactions(self, trans_type, n, currency=None):
+        """n تراکنش با بیشترین مبلغ پایه از یک نوع (با ایندکس نوع/مبلغ): لیست [(id، مبلغ)]
+        
+        مبلغ‌ها با نرخ روز هر تراکنش به واحد پول currency برگردانده می‌شوند.
+        """
+        self.cursor.execute(f'''
+            SELECT id, amount_base_minor, date_epoch FROM transactions
+            WHERE type_id = {lookup_id_sql('transaction_types')} ORDER BY amount_base_minor DESC LIMIT ?
+        ''', (trans_type, n))
+        rows = self.cursor.fetchall()
+        amounts = self.converter().convert([row[1] for row in rows], BASE_CURRENCY,
+                                           [epoch_day(row[2]) for row in rows], normalize_currency(currency))
+        return [(row[0], from_minor_units(amount)) for row, amount in zip(rows, amounts)]
+        
+    # --- ورود و خروج داده ---
+        
+    def export_transactions(self, filename, start_date=None, end_date=None, category=None,
+                            progress=None, check_cancelled=None):
+        """نوشتن جریانی تراکنش‌ها در فایل با حافظه ثابت
+        
+        فرمت از پسوند فایل تعیین می‌شود (.json، .jsonl، .csv یا .fmcol). ردیف‌ها
+        تکه‌تکه با fetchmany خوانده می‌شوند و فیلتر تاریخ (YYYY-MM-DD، شامل هر دو
+        سر بازه) و دسته از ایندکس‌های date_epoch استفاده می‌کند. اگر کار لغو شود یا
+        خطا رخ دهد فایل نیمه‌کاره پاک می‌شود. خروجی: تعداد تراکنش‌های نوشته‌شده
+        """
+        writer_class = EXPORT_WRITERS.get(os.path.splitext(filename)[1].lower(), JsonArrayWriter)
+        
+        query = "SELECT id, date, type, amount, description, category, currency FROM transactions_named WHERE 1=1"
+        params = []
+        if start_date:
+            query += " AND date_epoch >= ?"
+            params.append(date_columns(start_date)[0])
+        if end_date:
+            query += " AND date_epoch < ?"
+            params.append(date_columns(end_date)[0] + 86400)
+        if category:
+            query += f" AND category_id = {lookup_id_sql('categories')}"
+            params.append(category)
+        query += " ORDER BY date_epoch, id"
+        
+        # کرسر جداگانه تا خواندن تکه‌ای با کوئری‌های دیگر تداخل نداشته باشد
+        export_cursor = self.conn.cursor()
+        export_cursor.execute(query, params)
+        
+        writer = writer_class(filename)
+        written_count = 0
+        try:
+            while True:
+                if check_cancelled:
+                    check_cancelled()
+                rows = export_cursor.fetchmany(self.EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                writer.write_rows(rows)
+                written_count += len(rows)
+                if progress:
+                    progress(written_count)
+        except BaseException:
+            writer.close()
+            os.remove(filename)
+            raise
+        else:
+            writer.close()
+        finally:
+            export_cursor.close()
+        return written_count
+        
+    def import_transactions(self, filename, progress=None, check_cancelled=None):
+        """وارد کردن جریانی تراکنش‌ها از فایل JSON، JSON Lines، CSV یا ستونی
+        
+        رکوردها با add_transactions و بدون تکراری‌ها (همان تاریخ، نوع، مبلغ و واحد پول)
+        درج می‌شوند. progress(کسر پیشرفت، خوانده‌شده، اضافه‌شده) پس از هر دسته
+        صدا زده می‌شود. خروجی: (تعداد خوانده‌شده، تعداد اضافه‌شده)
+        """
+        total_size = os.path.getsize(filename) or 1
+        
+        with open(filename, 'rb') as raw_file:
+            extension = os.path.splitext(filename)[1].lower()
+            if extension == '.fmcol':
+                records = iter_columnar_records(raw_file)
+            elif extension == '.csv':
+                records = iter_csv_records(io.TextIOWrapper(raw_file, encoding='utf-8-sig', newline=''))
+            else:
+                records = iter_json_records(io.TextIOWrapper(raw_file, encoding='utf-8-sig', newline=''))
+                
+            def batch_progress(read_count, inserted_count):
+                progress(raw_file.tell() / total_size, read_count, inserted_count)
+                
+            read_count, inserted_count = self.add_transactions(
+                records, deduplicate=True, progress=batch_progress if progress else None,
+                check_cancelled=check_cancelled)
+                
+        if progress:
+            progress(1.0, read_count, inserted_count)
+        return read_count, inserted_count
+        
+    # --- واحد پول و نرخ تبدیل ---
+    
+    def converter(self):
+        """مبدل واحد پول با نرخ‌های فعلی؛ فقط پس از تغییر نرخ‌ها دوباره ساخته می‌شود"""
+        key = self.get_setting(RATES_VERSION_SETTING, '0')
+        if self.converter_cache is None or self.converter_cache_key != key:
+            self.converter_cache = CurrencyConverter.from_database(self.conn.cursor())
+            self.converter_cache_key = key
+        return self.converter_cache
+        
+    def load_exchange_rates(self, filename, progress=None, check_cancelled=None):
+        """ورود نرخ‌های تبدیل از فایل CSV با سرستون‌های date,currency,rate
+        
+        rate مقدار واحد پایه به ازای یک واحد است و نرخ تکراری یک روز جایگزین قبلی
+        می‌شود. مبلغ پایه تراکنش‌های واحدهای پول تغییرکرده در همان تراکنش دیتابیس
+        دوباره محاسبه می‌شود (تریگرها جمع‌ها و خلاصه‌ها را به‌روز نگه می‌دارند).
+        خروجی: (تعداد نرخ‌ها، تعداد تراکنش‌های دوباره تبدیل‌شده)
+        """
+        rows = []
+        with open(filename, encoding='utf-8-sig', newline='') as rates_file:
+            for item in csv.DictReader(rates_file):
+                currency = normalize_currency(item['currency'])
+                if currency == BASE_CURRENCY:
+                    continue
+                rate = float(item['rate'])
+                if not math.isfinite(rate) or rate <= 0:
+                    raise ValueError(f"نرخ نامعتبر برای {currency_name(currency)}: {item['rate']}")
+                rows.append((currency, epoch_day(date_columns(item['date'])[0]), rate))
+        if check_cancelled:
+            check_cancelled()
+            
+        try:
+            self.cursor.execute("BEGIN")
+            self.add_lookup_names((), (), [row[0] for row in rows])
+            self.cursor.executemany(f'''
+                INSERT INTO exchange_rates (currency_id, day, rate) VALUES ({lookup_id_sql('currencies')}, ?, ?)
+                ON CONFLICT(currency_id, day) DO UPDATE SET rate = excluded.rate
+            ''', rows)
+            self.cursor.execute('''
+                INSERT INTO settings (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            ''', (RATES_VERSION_SETTING, str(time.time_ns())))
+            reconverted = self.reconvert_transactions({row[0] for row in rows}, progress, check_cancelled)
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            self.converter_cache = None
+            raise
+            
+        self.mark_changed()
+        return len(rows), reconverted
+        
+    def reconvert_transactions(self, currencies, progress=None, check_cancelled=None):
+        """محاسبه دوباره مبلغ پایه تراکنش‌های چند واحد پول (داخل تراکنش دیتابیس فراخواننده)"""
+        if not currencies:
+            return 0
+        converter = self.converter()
+        placeholders = ", ".join("?" * len(currencies))
+        self.cursor.execute(f'''
+            SELECT COUNT(*) FROM transactions_named WHERE currency IN ({placeholders})
+        ''', list(currencies))
+        total_count = self.cursor.fetchone()[0] or 1
+        
+        # خواندن تکه‌ای بر اساس id تا حافظه ثابت بماند
+        last_id = 0
+        reconverted = 0
+        while True:
+            self.cursor.execute(f'''
+                SELECT id, amount_minor, currency, date_epoch FROM transactions_named
+                WHERE currency IN ({placeholders}) AND id > ? ORDER BY id LIMIT ?
+            ''', (*currencies, last_id, self.IMPORT_BATCH_SIZE))
+            rows = self.cursor.fetchall()
+            if not rows:
+                break
+            base_amounts = converter.convert([row[1] for row in rows], [row[2] for row in rows],
+                                             [epoch_day(row[3]) for row in rows])
+            self.cursor.executemany("UPDATE transactions SET amount_base_minor = ? WHERE id = ?",
+                                    [(base_amount, row[0]) for row, base_amount in zip(rows, base_amounts)])
+            last_id = rows[-1][0]
+            reconverted += len(rows)
+            if progress:
+                progress(reconverted / total_count)
+            if check_cancelled:
+                check_cancelled()
+        return reconverted
+        
+    def transaction_currencies(self):
+        """واحدهای پولی که در دفتر استفاده یا برایشان نرخ ثبت شده است (اول واحد پایه)"""
+        self.cursor.execute("SELECT name FROM currencies")
+        return [BASE_CURRENCY] + sorted(name for name, in self.cursor.fetchall() if name != BASE_CURRENCY)
+        
+    # --- پشتیبان ---
+    
+    def get_setting(self, key, default=None):
+        """خواندن یک مقدار از جدول settings"""
+        self.cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+        row = self.cursor.fetchone()
+        return row[0] if row else default
+        
+    def set_setting(self, key, value):
+        """ثبت یک مقدار در جدول settings"""
+        self.cursor.execute('''
+            INSERT INTO settings (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (key, str(value)))
+        self.conn.commit()
+        
+    def backup(self, filename, progress=None, check_cancelled=None):
+        """پشتیبان آنلاین با API پشتیبان SQLite
+        
+        صفحه‌ها گام‌به‌گام (BACKUP_PAGES_PER_STEP) کپی می‌شوند، پس نوشتن‌های
+        هم‌زمان اتصال‌های دیگر یک تصویر سازگار می‌سازند و اتصال قفل نمی‌ماند. با
+        پسوند .gz یا .zst تصویر به صورت جریانی فشرده می‌شود. فایل نهایی فقط پس از
+        کامل شدن جایگزین می‌شود و در لغو یا خطا فایل‌های نیمه‌کاره پاک می‌شوند.
+        progress(کسر پیشرفت) پس از هر گام صدا زده می‌شود.
+        """
+        compression = backup_compression(filename)
+        snapshot_path = filename + ".snapshot"
+        partial_path = filename + ".partial"
+        # سهم کپی صفحه‌ها از کل پیشرفت (بقیه برای فشرده‌سازی)
+        copy_share = 1.0 if compression is None else 0.5
+        
+        def page_progress(status, remaining, total):
+            if progress:
+                progress(copy_share * (total - remaining) / max(total, 1))
+            if check_cancelled:
+                check_cancelled()
+        
+        self.conn.commit()  # ذخیره تغییرات
+        try:
+            remove_if_exists(snapshot_path)
+            snapshot = sqlite3.connect(snapshot_path)
+            try:
+                self.conn.backup(snapshot, pages=self.BACKUP_PAGES_PER_STEP, progress=page_progress)
+                # فایل پشتیبان مستقل باشد و هنگام باز شدن فایل‌های -wal/-shm نسازد
+                snapshot.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                snapshot.close()
+        
+            if compression is None:
+                os.replace(snapshot_path, filename)
+            else:
+                total_size = os.path.getsize(snapshot_path) or 1
+                with open(snapshot_path, 'rb') as source, open(partial_path, 'wb') as raw_file:
+                    with compressed_stream(raw_file, 'wb', compression) as target:
+                        copy_stream(source, target, lambda: source.tell() / total_size,
+                                    progress and (lambda fraction: progress(copy_share + (1 - copy_share) * fraction)),
+                                    check_cancelled)
+                os.replace(partial_path, filename)
+                os.remove(snapshot_path)
+        
+        except BaseException:
+            remove_if_exists(snapshot_path)
+            remove_if_exists(partial_path)
+            raise
+        
+        if progress:
+            progress(1.0)
+        return filename
+        
+    def rotate_backups(self, directory=None, keep=None, compression=None, progress=None, check_cancelled=None):
+        """پشتیبان زمان‌دار در یک پوشه و حذف قدیمی‌ترها تا فقط keep نسخه بماند
+        
+        مقدارهای None از تنظیمات backup.* در جدول settings خوانده می‌شوند؛
+        compression یکی از 'gzip'، 'zstd' یا 'none' است.
+        خروجی: (مسیر پشتیبان جدید، لیست فایل‌های حذف‌شده)
+        """
+        if directory is None:
+            directory = self.get_setting('backup.directory', BACKUP_SETTING_DEFAULTS['backup.directory'])
+        if keep is None:
+            keep = self.get_setting('backup.keep', BACKUP_SETTING_DEFAULTS['backup.keep'])
+        if compression is None:
+            compression = self.get_setting('backup.compression', BACKUP_SETTING_DEFAULTS['backup.compression'])
+        keep = int(keep)
+        if keep < 1:
+            raise ValueError("تعداد پشتیبان‌های نگه‌داشته‌شده باید حداقل ۱ باشد")
+        if compression not in BACKUP_COMPRESSION_EXTENSIONS and compression != 'none':
+            raise ValueError(f"روش فشرده‌سازی ناشناخته: {compression}")
+        
+        directory = os.path.join(os.path.dirname(os.path.abspath(self.database_path)), directory)
+        os.makedirs(directory, exist_ok=True)
+        extension = ".db" + BACKUP_COMPRESSION_EXTENSIONS.get(compression, "")
+        filename = os.path.join(directory, f"{BACKUP_FILE_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{extension}")
+        self.backup(filename, progress, check_cancelled)
+        
+        # نام‌ها زمان‌دار هستند، پس ترتیب الفبایی همان ترتیب زمانی است
+        backups = sorted(name for name in os.listdir(directory)
+                         if name.startswith(BACKUP_FILE_PREFIX) and not name.endswith((".snapshot", ".partial")))
+        removed = [os.path.join(directory, name) for name in backups[:-keep]]
+        for path in removed:
+            os.remove(path)
+        return filename, removed
+        
+    def restore(self, filename, progress=None, check_cancelled=None):
+        """بازیابی دیتابیس از یک پشتیبان (ساده یا فشرده) با API پشتیبان SQLite
+        
+        پشتیبان اول در یک فایل موقت کنار دیتابیس آماده می‌شود (بازگشایی فشرده‌سازی
+        یا کپی گام‌به‌گام از فایل فقط‌خواندنی) و integrity_check روی همان فایل موقت
+        اجرا می‌شود؛ لغو یا خطا در این مرحله به دیتابیس زنده دست نمی‌زند. سپس همه
+        صفحه‌ها در یک گام (یک تراکنش نوشتن) در همین اتصال کپی می‌شوند، پس خطا در
+        جایگزینی هم دیتابیس را نیمه‌کاره نمی‌گذارد. فایل جایگزین نمی‌شود چون
+        اتصال‌های دیگر (رشته پس‌زمینه) باز هستند. پس از بازیابی مهاجرت‌های جاافتاده
+        اعمال می‌شوند.
+        """
+        compression = backup_compression(filename)
+        staging_path = self.database_path + ".restore"
+        # سهم آماده‌سازی فایل موقت از کل پیشرفت (بقیه برای بررسی و جایگزینی)
+        staging_share = 0.8
+        
+        def page_progress(status, remaining, total):
+            if progress:
+                progress(staging_share * (total - remaining) / max(total, 1))
+            if check_cancelled:
+                check_cancelled()
+        
+        try:
+            for suffix in ("", "-wal", "-shm"):
+                remove_if_exists(staging_path + suffix)
+            if compression is not None:
+                total_size = os.path.getsize(filename) or 1
+                with open(filename, 'rb') as raw_file, open(staging_path, 'wb') as target:
+                    with compressed_stream(raw_file, 'rb', compression) as source:
+                        copy_stream(source, target, lambda: raw_file.tell() / total_size,
+                                    progress and (lambda fraction: progress(staging_share * fraction)),
+                                    check_cancelled)
+            else:
+                try:
+                    source = sqlite3.connect(pathlib.Path(filename).resolve().as_uri() + "?mode=ro", uri=True)
+                except sqlite3.Error as e:
+                    raise ValueError(f"فایل پشتیبان معتبر نیست: {e}") from e
+                try:
+                    staging = sqlite3.connect(staging_path)
+                    try:
+                        source.backup(staging, pages=self.BACKUP_PAGES_PER_STEP, progress=page_progress)
+                    except sqlite3.DatabaseError as e:
+                        raise ValueError(f"فایل پشتیبان معتبر نیست: {e}") from e
+                    finally:
+                        staging.close()
+                finally:
+                    source.close()
+                    
+            staging = sqlite3.connect(pathlib.Path(staging_path).resolve().as_uri() + "?mode=ro", uri=True)
+            try:
+                # فقط فایل‌های سالمی که جدول تراکنش‌ها دارند پذیرفته می‌شوند
+                try:
+                    check = staging.execute("PRAGMA integrity_check(1)").fetchone()[0]
+                    has_transactions = staging.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions'").fetchone()
+                except sqlite3.DatabaseError as e:
+                    raise ValueError(f"فایل پشتیبان معتبر نیست: {e}") from e
+                if check != "ok" or not has_transactions:
+                    raise ValueError("فایل پشتیبان معتبر نیست")
+                if check_cancelled:
+                    check_cancelled()
+                if progress:
+                    progress(staging_share + (1 - staging_share) / 2)
+                    
+                # جایگزینی در یک گام: همه یا هیچ
+                self.conn.commit()
+                staging.backup(self.conn)
+            finally:
+                staging.close()
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                remove_if_exists(staging_path + suffix)
+        
+        # پشتیبان قدیمی‌تر ممکن است مهاجرت‌های جدید را نداشته باشد
+        self.setup_database()
+        # شمارنده نسخه پشتیبان ممکن است با نسخه‌ای از داده‌های قبلی یکی باشد
+        self.cursor.execute("UPDATE ledger_version SET lineage = lower(hex(randomblob(8)))")
+        self.conn.commit()
+        self.mark_changed()
+        if progress:
+            progress(1.0)
+        
+    # --- اهداف مالی ---
+        
+    def add_goal(self, target_amount, description="", deadline=None, currency=None, trans_type=None,
+                 category=None, start_date=None):
+        """تعریف هدف مالی جدید؛ خروجی: id هدف
+        
+        پیشرفت هدف جمع تراکنش‌های نوع trans_type (پیش‌فرض درآمد) و اختیاری فقط
+        دسته category است که از start_date (پیش‌فرض امروز) تا deadline (هر دو
+        YYYY-MM-DD و شامل خود روز؛ None یعنی بدون پایان) ثبت شده‌اند. مبلغ هدف به
+        واحد پول currency (پیش‌فرض واحد پایه) است.
+        """
+        currency = normalize_currency(currency)
+        self.converter().rate(currency, epoch_day(None))
+        created_date = datetime.now().strftime("%Y-%m-%d")
+        start_date = start_date or created_date
+        start_epoch = date_columns(start_date)[0]
+        end_epoch = date_columns(deadline)[0] if deadline else None
+        if start_epoch is None or (deadline and end_epoch is None):
+            raise ValueError("تاریخ نامعتبر است")
+        if end_epoch is not None and end_epoch < start_epoch:
+            raise ValueError("سررسید هدف نباید پیش از شروع آن باشد")
+            
+        trans_type = trans_type or self.income_type
+        self.add_lookup_names([trans_type], [category] if category else [])
+        self.cursor.execute(f'''
+            INSERT INTO goals (target_amount, description, deadline, created_date, currency, start_date,
+                               type_id, category_id)
+            VALUES (?, ?, ?, ?, ?, ?, {lookup_id_sql('transaction_types')},
+                    {lookup_id_sql('categories') if category else 'NULL'})
+        ''', (target_amount, description, deadline, created_date, currency, start_date, trans_type,
+              *([category] if category else [])))
+        self.conn.commit()
+        return self.cursor.lastrowid
+        
+    def delete_goal(self, goal_id):
+        """حذف یک هدف مالی"""
+        self.cursor.execute("DELETE FROM goals WHERE id = ?", (goal_id,))
+        self.conn.commit()
+        self.goal_totals_cache.pop(goal_id, None)
+        
+    def range_total(self, type_id, category_id, start_epoch, end_epoch):
+        """جمع مبلغ پایه تراکنش‌های یک نوع (و اختیاری یک دسته) در بازه epoch [شروع، پایان)
+        
+        ماه‌های کامل داخل بازه از جدول خلاصه ماهانه و تکه‌های ابتدا و انتهای بازه
+        با ایندکس‌های (نوع/دسته، epoch) خوانده می‌شوند، پس هزینه به طول بازه بستگی
+        ندارد و دفتر پیمایش نمی‌شود.
+        """
+        filters = "type_id = ?"
+        params = [type_id]
+        if category_id is not None:
+            filters += " AND category_id = ?"
+            params.append(category_id)
+            
+        def transactions_total(start, end):
+            if start >= end:
+                return 0
+            self.cursor.execute(f'''
+                SELECT COALESCE(SUM(amount_base_minor), 0) FROM transactions
+                WHERE {filters} AND date_epoch >= ? AND date_epoch < ?
+            ''', params + [start, end])
+            return self.cursor.fetchone()[0]
+            
+        # ماه‌های کامل: از اولین ماهی که بعد از شروع آغاز می‌شود تا ماهی که پایان در آن است
+        first_month = epoch_month_index(start_epoch)
+        if month_index_start(first_month) < start_epoch:
+            first_month += 1
+        last_month = epoch_month_index(end_epoch)
+        if first_month >= last_month:
+            return transactions_total(start_epoch, end_epoch)
+            
+        self.cursor.execute(f'''
+            SELECT COALESCE(SUM(total), 0) FROM rollup_monthly
+            WHERE year BETWEEN ? AND ? AND year * 12 + month - 1 >= ? AND year * 12 + month - 1 < ?
+                  AND {filters}
+        ''', [first_month // 12, last_month // 12, first_month, last_month] + params)
+        months_total = self.cursor.fetchone()[0]
+        return (months_total + transactions_total(start_epoch, month_index_start(first_month))
+                + transactions_total(month_index_start(last_month), end_epoch))
+                
+    def goal_total(self, goal_id, definition):
+        """جمع تراکنش‌های بازه یک هدف به واحد پایه؛ تا تغییر بعدی داده‌ها نگه داشته می‌شود
+        
+        definition همان (type_id، category_id، شروع، سررسید) ذخیره‌شده هدف است تا
+        ویرایش یا حذف و تعریف دوباره هدف جمع قدیمی را برنگرداند.
+        """
+        key = self.data_version()
+        if self.goal_totals_cache_key != key:
+            self.goal_totals_cache = {}
+            self.goal_totals_cache_key = key
+        cached = self.goal_totals_cache.get(goal_id)
+        if cached is not None and cached[0] == definition:
+            return cached[1]
+            
+        type_id, category_id, start_date, deadline = definition
+        start_epoch = date_columns(start_date)[0]
+        if deadline:
+            end_epoch = date_columns(deadline)[0] + SECONDS_PER_DAY
+        else:
+            # بدون سررسید: تا آخرین تراکنش (با ایندکس epoch)
+            self.cursor.execute("SELECT MAX(date_epoch) FROM transactions")
+            last_epoch = self.cursor.fetchone()[0]
+            end_epoch = last_epoch + 1 if last_epoch is not None else start_epoch
+        total = self.range_total(type_id, category_id, start_epoch, end_epoch)
+        self.goal_totals_cache[goal_id] = (definition, total)
+        return total
+        
+    def goal_progress(self, total_minor, currency):
+        """جمع یک هدف (واحد کوچک پایه) به واحد پول هدف با نرخ امروز"""
+        converted = self.converter().convert([total_minor], BASE_CURRENCY, [epoch_day(None)], currency)
+        return from_minor_units(converted[0])
+        
+    def goals(self):
+        """همه اهداف از جدید به قدیم با پیشرفت محاسبه‌شده از تراکنش‌ها
+        
+        خروجی: لیست (id، مبلغ هدف، مبلغ فعلی، توضیحات، واحد پول، نوع، دسته یا None،
+        شروع، سررسید یا None)؛ مبلغ فعلی به واحد پول هدف است.
+        """
+        self.cursor.execute('''
+            SELECT g.id, g.target_amount, g.description, g.currency, g.type_id, g.category_id,
+                   g.start_date, g.deadline, types.name, categories.name
+            FROM goals g
+            LEFT JOIN transaction_types types ON types.id = g.type_id
+            LEFT JOIN categories ON categories.id = g.category_id
+            ORDER BY g.id DESC
+        ''')
+        goals = []
+        for (goal_id, target, description, currency, type_id, category_id, start_date, deadline,
+             trans_type, category) in self.cursor.fetchall():
+            total = self.goal_total(goal_id, (type_id, category_id, start_date, deadline))
+            goals.append((goal_id, target, self.goal_progress(total, currency), description, currency,
+                          trans_type, category, start_date, deadline))
+        return goals
+        
+    def current_goal(self):
+        """آخرین هدف مالی: (مبلغ هدف، مبلغ فعلی به واحد پول هدف) یا None"""
+        goals = self.goals()
+        if not goals:
+            return None
+        return goals[0][1], goals[0][2]
+        
+    # --- تراکنش‌های تکرارشونده ---
+    
+    def add_schedule(self, trans_type, amount, rule, start_date, description="", category="",
+                     currency=None, end_date=None, interval=1):
+        """تعریف برنامه تکرار (قاعده روزانه/هفتگی/ماهانه هر interval بار) از start_date تا end_date
+        
+        تاریخ‌ها YYYY-MM-DD هستند و end_date اختیاری است. نوبت‌ها با post_recurring
+        ثبت می‌شوند. خروجی: id برنامه
+        """
+        if rule not in RECURRENCE_RULES:
+            raise ValueError(f"قاعده تکرار نامعتبر: {rule}")
+        interval = int(interval)
+        if interval < 1:
+            raise ValueError("فاصله تکرار باید حداقل ۱ باشد")
+        amount_minor = to_minor_units(amount)
+        if amount_minor <= 0:
+            raise ValueError("مبلغ باید بیشتر از صفر باشد")
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        if end_date and datetime.strptime(end_date, "%Y-%m-%d") < start:
+            raise ValueError("تاریخ پایان نباید پیش از تاریخ شروع باشد")
+        currency = normalize_currency(currency)
+        self.converter().rate(currency, epoch_day(None))
+        trans_type = trans_type or ''
+        category = category or ''
+        
+        self.add_lookup_names([trans_type], [category], [currency])
+        self.cursor.execute(f'''
+            INSERT INTO recurring_schedules (type_id, amount_minor, description, category_id, currency_id,
+                                             rule, interval, start_date, end_date, next_date)
+            VALUES ({lookup_id_sql('transaction_types')}, ?, ?, {lookup_id_sql('categories')},
+                    {lookup_id_sql('currencies')}, ?, ?, ?, ?, ?)
+        ''', (trans_type, amount_minor, description, category, currency, rule, interval,
+              start_date, end_date or None, start_date))
+        self.conn.commit()
+        return self.cursor.lastrowid
+        
+    def schedules(self):
+        """برنامه‌های تکرار فعال به ترتیب نوبت بعدی
+        
+        هر ردیف: (id، نوع، مبلغ، توضیحات، دسته، واحد پول، قاعده، فاصله، تاریخ شروع،
+        تاریخ پایان، نوبت بعدی)
+        """
+        self.cursor.execute('''
+            SELECT s.id, types.name, s.amount_minor, s.description, categories.name, currencies.name,
+                   s.rule, s.interval, s.start_date, s.end_date, s.next_date
+            FROM recurring_schedules s
+            JOIN transaction_types types ON types.id = s.type_id
+            JOIN categories ON categories.id = s.category_id
+            JOIN currencies ON currencies.id = s.currency_id
+            WHERE s.active = 1 ORDER BY s.next_date
+        ''')
+        return [row[:2] + (from_minor_units(row[2]),) + row[3:] for row in self.cursor.fetchall()]
+        
+    def delete_schedule(self, schedule_id):
+        """حذف یک برنامه تکرار (تراکنش‌هایی که قبلاً ثبت کرده می‌مانند)"""
+        self.cursor.execute("DELETE FROM recurring_schedules WHERE id = ?", (schedule_id,))
+        self.conn.commit()
+        
+    def post_recurring(self, today=None):
+        """ثبت همه نوبت‌های سررسیده برنامه‌های تکرار تا امروز (YYYY-MM-DD) در یک تراکنش دیتابیس
+        
+        نوبت‌های عقب‌افتاده از آخرین اجرا یکجا با executemany ثبت می‌شوند و next_date
+        هر برنامه در همان تراکنش جلو می‌رود، پس اجرای دوباره یا هم‌زمان (ایندکس یکتای
+        برنامه/تاریخ) چیزی را دو بار ثبت نمی‌کند. خروجی: تعداد تراکنش‌های ثبت‌شده
+        """
+        until = datetime.strptime(today or datetime.now().strftime("%Y-%m-%d"), "%Y-%m-%d")
+        try:
+            # قفل نوشتن از ابتدا گرفته می‌شود تا برنامه‌ها بین خواندن و ثبت تغییر نکنند
+            self.cursor.execute("BEGIN IMMEDIATE")
+            self.cursor.execute('''
+                SELECT s.id, types.name, s.amount_minor, s.description, categories.name, currencies.name,
+                       s.rule, s.interval, s.start_date, s.end_date, s.next_date
+                FROM recurring_schedules s
+                JOIN transaction_types types ON types.id = s.type_id
+                JOIN categories ON categories.id = s.category_id
+                JOIN currencies ON currencies.id = s.currency_id
+                WHERE s.active = 1 AND s.next_date <= ?
+            ''', (until.strftime("%Y-%m-%d"),))
+            
+            rows = []
+            schedule_ids = []
+            updates = []
+            for (schedule_id, trans_type, amount_minor, description, category, currency,
+                 rule, interval, start_date, end_date, next_date) in self.cursor.fetchall():
+                anchor = datetime.strptime(start_date, "%Y-%m-%d")
+                last = min(until, datetime.strptime(end_date, "%Y-%m-%d")) if end_date else until
+                occurrence = datetime.strptime(next_date, "%Y-%m-%d")
+                while occurrence <= last:
+                    date = occurrence.strftime("%Y-%m-%d 00:00")
+                    rows.append((date, *date_columns(date), trans_type, amount_minor, description, category, currency))
+                    schedule_ids.append(schedule_id)
+                    occurrence = next_occurrence(rule, interval, anchor, occurrence)
+                # برنامه‌ای که از تاریخ پایانش گذشته غیرفعال می‌شود
+                finished = bool(end_date) and occurrence > last
+                updates.append((occurrence.strftime("%Y-%m-%d"), 0 if finished else 1, schedule_id))
+                
+            posted = 0
+            if rows:
+                rows = self.with_base_amounts(rows)
+                self.cursor.executemany(INSERT_RECURRING_SQL,
+                                        [row + (schedule_id,) for row, schedule_id in zip(rows, schedule_ids)])
+                posted = self.cursor.rowcount
+            self.cursor.executemany("UPDATE recurring_schedules SET next_date = ?, active = ? WHERE id = ?", updates)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+            
+        if posted:
+            self.mark_changed()
+        return posted
+        
+    # --- یادآوری‌ها ---
+        
+    def add_reminder(self, description, date):
+        """ثبت یادآوری برای تاریخ YYYY-MM-DD (سررسید اول همان روز)؛ خروجی: id یادآوری"""
+        # بررسی فرمت تاریخ
+        datetime.strptime(date, "%Y-%m-%d")
+        self.cursor.execute('''
+            INSERT INTO reminders (description, date, completed, due_epoch)
+            VALUES (?, ?, 0, ?)
+        ''', (description, date, date_columns(date)[0]))
+        self.conn.commit()
+        return self.cursor.lastrowid
+        
+    def reminders(self):
+        """همه یادآوری‌ها به ترتیب تاریخ: لیست (id، توضیحات، تاریخ، انجام‌شده)"""
+        self.cursor.execute("SELECT id, description, date, completed FROM reminders ORDER BY date")
+        return self.cursor.fetchall()
+        
+    def complete_reminder(self, reminder_id):
+        self.complete_reminders([reminder_id])
+        
+    def complete_reminders(self, reminder_ids):
+        """علامت‌گذاری چند یادآوری به عنوان انجام‌شده با یک commit"""
+        self.cursor.executemany("UPDATE reminders SET completed = 1 WHERE id = ?",
+                                [(reminder_id,) for reminder_id in reminder_ids])
+        self.conn.commit()
+        
+    def delete_reminder(self, reminder_id):
+        self.cursor.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+        self.conn.commit()
+        
+    def due_reminders(self, date=None):
+        """توضیحات یادآوری‌های انجام‌نشده‌ای که تا پایان یک روز (پیش‌فرض امروز) سررسیده‌اند"""
+        if date is None:
+            date = datetime.now().strftime("%Y-%m-%d")
+        self.cursor.execute('''
+            SELECT description FROM reminders WHERE completed = 0 AND due_epoch < ? ORDER BY due_epoch
+        ''', (date_columns(date)[0] + 86400,))
+        return [row[0] for row in self.cursor.fetchall()]
+        
+    def upcoming_reminders(self, limit, after_key=None):
+        """یادآوری‌های انجام‌نشده به ترتیب سررسید (با ایندکس completed/due_epoch)
+        
+        after_key کلید (سررسید، id) آخرین ردیف خوانده‌شده است.
+        خروجی: لیست (سررسید، id، توضیحات)
+        """
+        query = "SELECT due_epoch, id, description FROM reminders WHERE completed = 0 AND due_epoch IS NOT NULL"
+        params = []
+        if after_key is not None:
+            query += " AND (due_epoch, id) > (?, ?)"
+            params.extend(after_key)
+        self.cursor.execute(query + " ORDER BY due_epoch, id LIMIT ?", (*params, limit))
+        return self.cursor.fetchall()
+        
+    def pending_reminder_ids(self, reminder_ids, now=None):
+        """از میان reminder_ids آن‌هایی که هنوز انجام‌نشده و سررسیده‌اند (برای کنار گذاشتن ردیف‌های کهنه صف)"""
+        now = wall_clock_epoch() if now is None else now
+        pending = set()
+        for start in range(0, len(reminder_ids), self.DELETE_CHUNK_SIZE):
+            chunk = reminder_ids[start:start + self.DELETE_CHUNK_SIZE]
+            self.cursor.execute(f'''
+                SELECT id FROM reminders WHERE id IN ({", ".join("?" * len(chunk))}) AND completed = 0 AND due_epoch <= ?
+            ''', (*chunk, now))
+            pending.update(row[0] for row in self.cursor.fetchall())
+        return pending
+        
+    def snooze_reminders(self, reminder_ids, until_epoch):
+        """تعویق چند یادآوری تا زمان until_epoch (تاریخ یادآوری هم همان روز می‌شود)"""
+        date = datetime.fromtimestamp(until_epoch, timezone.utc).strftime("%Y-%m-%d")
+        self.cursor.executemany("UPDATE reminders SET due_epoch = ?, date = ? WHERE id = ?",
+                                [(until_epoch, date, reminder_id) for reminder_id in reminder_ids])
+        self.conn.commit()
+        
+    # --- رمز عبور ---
+        
+    def hash_password(self, password):
+        """رمزگذاری رمز عبور"""
+        return hashlib.sha256(password.encode()).hexdigest()
+        
+    def set_password(self, password):
+        """تنظیم رمز عبور"""
+        password_hash = self.hash_password(password)
+        self.cursor.execute("DELETE FROM security")
+        self.cursor.execute("INSERT INTO security (id, password_hash) VALUES (1, ?)", (password_hash,))
+        self.conn.commit()
+        
+    def check_password(self, password):
+        """بررسی رمز عبور"""
+        password_hash = self.hash_password(password)
+        self.cursor.execute("SELECT password_hash FROM security WHERE id = 1")
+        result = self.cursor.fetchone()
+        if result:
+            return result[0] == password_hash
+        return False
+        
+    def has_password(self):
+        """آیا رمز عبوری تنظیم شده است"""
+        self.cursor.execute("SELECT COUNT(*) FROM security")
+        return self.cursor.fetchone()[0] > 0
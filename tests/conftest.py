@@ -0,0 +1,20 @@
+"""fixture های مشترک تست‌های دفتر مالی"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import Ledger
+
+INCOME = "درآمد"
+EXPENSE = "هزینه"
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """دفتر تازه در یک پوشه موقت"""
+    ledger = Ledger(str(tmp_path / "finance.db"))
+    yield ledger
+    ledger.close()
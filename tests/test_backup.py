@@ -0,0 +1,113 @@
+"""پشتیبان‌گیری با API پشتیبان SQLite و بازیابی مرحله‌ای (backup / restore)"""
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+from conftest import INCOME, EXPENSE
+from ledger import JobCancelled
+
+
+@pytest.fixture
+def filled_ledger(ledger):
+    for index in range(30):
+        trans_type = INCOME if index % 4 == 0 else EXPENSE
+        ledger.add_transaction(trans_type, 1000 + index, f"t{index}", "غذا", date=f"2024-03-{index % 28 + 1:02d} 10:00")
+    return ledger
+
+
+def stored_rows(ledger):
+    ledger.cursor.execute("SELECT id, date, type, amount, description, category FROM transactions_named ORDER BY id")
+    return ledger.cursor.fetchall()
+
+
+@pytest.mark.parametrize("name", ["backup.db", "backup.db.gz"])
+def test_backup_then_restore(filled_ledger, tmp_path, name):
+    filename = str(tmp_path / name)
+    original = stored_rows(filled_ledger)
+    totals = filled_ledger.totals()
+    
+    fractions = []
+    assert filled_ledger.backup(filename, progress=fractions.append) == filename
+    assert fractions[-1] == 1.0
+    assert not os.path.exists(filename + ".snapshot") and not os.path.exists(filename + ".partial")
+    
+    filled_ledger.clear()
+    filled_ledger.add_transaction(EXPENSE, 5, "پس از پشتیبان", "سایر", date="2024-04-01")
+    filled_ledger.restore(filename)
+    assert stored_rows(filled_ledger) == original
+    assert filled_ledger.totals() == totals
+    assert filled_ledger.check_totals_consistency() == []
+    # فایل موقت مرحله بازیابی پاک شده است
+    assert not os.path.exists(filled_ledger.database_path + ".restore")
+
+
+@pytest.mark.parametrize("content", [b"not a database" * 100, None])
+def test_corrupt_backup_is_rejected(filled_ledger, tmp_path, content):
+    filename = tmp_path / "broken.db"
+    if content is None:
+        # فایل SQLite سالم ولی بدون جدول تراکنش‌ها
+        other = sqlite3.connect(filename)
+        other.execute("CREATE TABLE notes (text TEXT)")
+        other.commit()
+        other.close()
+    else:
+        filename.write_bytes(content)
+    original = stored_rows(filled_ledger)
+    
+    with pytest.raises(ValueError):
+        filled_ledger.restore(str(filename))
+    assert stored_rows(filled_ledger) == original
+    assert not os.path.exists(filled_ledger.database_path + ".restore")
+
+
+def test_truncated_compressed_backup_is_rejected(filled_ledger, tmp_path):
+    filename = str(tmp_path / "backup.db.gz")
+    filled_ledger.backup(filename)
+    data = gzip.decompress(open(filename, 'rb').read())
+    with open(filename, 'wb') as f:
+        f.write(gzip.compress(data[:len(data) // 2]))
+    original = stored_rows(filled_ledger)
+    
+    with pytest.raises(ValueError):
+        filled_ledger.restore(filename)
+    assert stored_rows(filled_ledger) == original
+
+
+def test_cancelled_restore_keeps_current_data(filled_ledger, tmp_path, monkeypatch):
+    monkeypatch.setattr(type(filled_ledger), 'BACKUP_PAGES_PER_STEP', 1)
+    filename = str(tmp_path / "backup.db")
+    filled_ledger.backup(filename)
+    filled_ledger.add_transaction(EXPENSE, 7, "بعد از پشتیبان", "سایر", date="2024-04-02")
+    current = stored_rows(filled_ledger)
+    
+    def check_cancelled():
+        raise JobCancelled()
+        
+    with pytest.raises(JobCancelled):
+        filled_ledger.restore(filename, check_cancelled=check_cancelled)
+    assert stored_rows(filled_ledger) == current
+
+
+def test_rotation_keeps_newest_backups(filled_ledger, tmp_path):
+    directory = str(tmp_path / "backups")
+    created = []
+    for _ in range(4):
+        filename, removed = filled_ledger.rotate_backups(directory, keep=2, compression='gzip')
+        created.append(filename)
+    assert removed == [created[1]]
+    assert sorted(os.listdir(directory)) == sorted(os.path.basename(name) for name in created[-2:])
+    assert all(name.endswith(".db.gz") for name in os.listdir(directory))
+
+
+def test_restore_refreshes_cached_rollups(filled_ledger, tmp_path):
+    filename = str(tmp_path / "backup.db")
+    filled_ledger.backup(filename)
+    filled_ledger.clear()
+    assert len(filled_ledger.rollups()) == 0
+    
+    version = filled_ledger.data_version()
+    filled_ledger.restore(filename)
+    assert filled_ledger.data_version() != version
+    assert len(filled_ledger.rollups()) == 30
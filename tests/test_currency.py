@@ -0,0 +1,102 @@
+"""نرخ‌های روزانه تبدیل واحد پول (CurrencyConverter) و مبلغ پایه تراکنش‌ها"""
+import pytest
+
+import ledger as ledger_module
+from conftest import INCOME, EXPENSE
+from ledger import CurrencyConverter, MissingExchangeRate, date_columns, epoch_day
+
+
+def day(date_text):
+    return epoch_day(date_columns(date_text)[0])
+
+
+RATES = {
+    'USD': [(day("2024-03-01"), 50000.0), (day("2024-03-10"), 60000.0), (day("2024-03-20"), 55000.0)],
+    'EUR': [(day("2024-03-05"), 70000.0)],
+}
+
+
+@pytest.fixture(params=["bisect", "numpy"])
+def converter(request, monkeypatch):
+    """مبدل با هر دو مسیر: bisect روی لیست‌ها و searchsorted با NumPy"""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(ledger_module, 'NUMPY_AVAILABLE', True)
+        monkeypatch.setattr(CurrencyConverter, 'VECTORIZE_MIN_ROWS', 1)
+    else:
+        monkeypatch.setattr(ledger_module, 'NUMPY_AVAILABLE', False)
+    return CurrencyConverter(RATES)
+
+
+@pytest.mark.parametrize("date_text, rate", [
+    ("2024-02-01", 50000.0),  # پیش از اولین نرخ: اولین نرخ
+    ("2024-03-01", 50000.0),  # دقیقاً روز یک نرخ
+    ("2024-03-05", 50000.0),  # بین دو نرخ: نرخ قبلی
+    ("2024-03-10", 60000.0),
+    ("2024-03-19", 60000.0),
+    ("2024-03-20", 55000.0),
+    ("2025-01-01", 55000.0),  # پس از آخرین نرخ
+])
+def test_rate_lookup(converter, date_text, rate):
+    # یک واحد (۱۰۰ واحد کوچک) دلار به تومان
+    assert converter.convert([100], 'USD', [day(date_text)]) == [round(rate * 100)]
+    assert converter.rate('USD', day(date_text)) == rate
+
+
+def test_batch_mixes_currencies_and_days(converter):
+    days = [day("2024-02-01"), day("2024-03-12"), day("2024-03-12"), day("2024-03-25")]
+    converted = converter.convert([100, 250, 100, 1000], ['USD', 'USD', 'EUR', 'IRT'], days)
+    assert converted == [5000000, 15000000, 7000000, 1000]
+
+
+def test_conversion_between_foreign_currencies(converter):
+    # ۷۰٬۰۰۰ / ۶۰٬۰۰۰ دلار به ازای هر یورو در ۱۲ مارس
+    assert converter.convert([600], 'EUR', [day("2024-03-12")], target='USD') == [700]
+    assert converter.convert([600], 'USD', [day("2024-03-12")], target='USD') == [600]
+
+
+def test_missing_rate_is_reported(converter):
+    with pytest.raises(MissingExchangeRate):
+        converter.convert([100], ['GBP'], [day("2024-03-12")])
+
+
+def test_vectorized_path_matches_bisect(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(ledger_module, 'NUMPY_AVAILABLE', True)
+    days = [day("2024-02-20") + offset for offset in range(40)] * 10
+    amounts = [index * 37 + 1 for index in range(len(days))]
+    currencies = [('USD', 'EUR', 'IRT')[index % 3] for index in range(len(days))]
+    converter = CurrencyConverter(RATES)
+    monkeypatch.setattr(CurrencyConverter, 'VECTORIZE_MIN_ROWS', 1)
+    vectorized = converter.convert(amounts, currencies, days, target='USD')
+    monkeypatch.setattr(CurrencyConverter, 'VECTORIZE_MIN_ROWS', len(days) + 1)
+    assert converter.convert(amounts, currencies, days, target='USD') == vectorized
+
+
+def write_rates(tmp_path, lines):
+    filename = tmp_path / "rates.csv"
+    filename.write_text("date,currency,rate\n" + "".join(line + "\n" for line in lines), encoding='utf-8')
+    return str(filename)
+
+
+def base_amounts(ledger):
+    return [row[0] for row in ledger.cursor.execute("SELECT amount_base_minor FROM transactions ORDER BY id")]
+
+
+def test_transactions_store_base_amount_at_their_date(ledger, tmp_path):
+    with pytest.raises(MissingExchangeRate):
+        ledger.add_transaction(EXPENSE, 10, "بدون نرخ", "خرید", date="2024-03-05", currency='USD')
+    assert ledger.load_exchange_rates(write_rates(tmp_path, ["2024-03-01,USD,50000", "2024-03-10,USD,60000"])) == (2, 0)
+    
+    ledger.add_transaction(EXPENSE, 10, "قبل از تغییر نرخ", "خرید", date="2024-03-05 12:00", currency='USD')
+    ledger.add_transaction(EXPENSE, 10, "روز تغییر نرخ", "خرید", date="2024-03-10 08:00", currency='USD')
+    ledger.add_transaction(INCOME, 1000, "تومانی", "حقوق", date="2024-03-10 09:00")
+    assert base_amounts(ledger) == [50000000, 60000000, 100000]
+    assert ledger.totals()[EXPENSE] == 1100000
+    
+    # همه تراکنش‌های دلاری دوباره تبدیل می‌شوند ولی نرخ تازه فقط روزهای تا نرخ بعدی را تغییر می‌دهد
+    assert ledger.load_exchange_rates(write_rates(tmp_path, ["2024-03-04,USD,52000"])) == (1, 2)
+    assert base_amounts(ledger) == [52000000, 60000000, 100000]
+    assert ledger.totals()[EXPENSE] == 1120000
+    assert ledger.totals('USD')[EXPENSE] == pytest.approx(1120000 / 60000, abs=0.01)
+    assert ledger.check_totals_consistency() == []
@@ -0,0 +1,82 @@
+"""خروجی جریانی تراکنش‌ها (export_transactions) و ورود دوباره همان فایل"""
+import os
+
+import pytest
+
+from conftest import INCOME, EXPENSE
+from ledger import JobCancelled
+
+
+@pytest.fixture
+def filled_ledger(ledger):
+    records = []
+    for index in range(25):
+        trans_type = INCOME if index % 5 == 0 else EXPENSE
+        category = ("غذا", "خرید", "حقوق, ماهانه")[index % 3]
+        description = f'ردیف "{index}"\nخط دوم' if index % 7 == 0 else f"t{index}"
+        records.append({'date': f"2024-{index % 3 + 1:02d}-{index + 1:02d} 10:00", 'type': trans_type,
+                        'amount': index * 1000.25, 'description': description, 'category': category})
+    ledger.add_transactions(records)
+    return ledger
+
+
+def stored_rows(ledger):
+    ledger.cursor.execute("SELECT date, type, amount, description, category FROM transactions_named "
+                          "ORDER BY date_epoch, id")
+    return ledger.cursor.fetchall()
+
+
+@pytest.mark.parametrize("suffix", ['.json', '.jsonl', '.csv', '.fmcol'])
+def test_export_import_round_trip(filled_ledger, tmp_path, monkeypatch, suffix):
+    # چند تکه (و در فرمت ستونی چند گروه ردیف) نوشته می‌شود
+    monkeypatch.setattr(type(filled_ledger), 'EXPORT_CHUNK_SIZE', 7)
+    filename = str(tmp_path / f"export{suffix}")
+    original = stored_rows(filled_ledger)
+    
+    written = []
+    assert filled_ledger.export_transactions(filename, progress=written.append) == 25
+    assert written == [7, 14, 21, 25]
+    
+    # ورود دوباره در همان دفتر: همه تکراری‌اند
+    assert filled_ledger.import_transactions(filename) == (25, 0)
+    
+    filled_ledger.cursor.execute("DELETE FROM transactions")
+    filled_ledger.conn.commit()
+    assert filled_ledger.import_transactions(filename) == (25, 25)
+    assert stored_rows(filled_ledger) == original
+
+
+@pytest.mark.parametrize("suffix", ['.jsonl', '.fmcol'])
+def test_export_filters(filled_ledger, tmp_path, suffix):
+    filename = str(tmp_path / f"export{suffix}")
+    count = filled_ledger.export_transactions(filename, start_date="2024-02-02", end_date="2024-02-20",
+                                              category="خرید")
+    
+    filled_ledger.cursor.execute('''
+        DELETE FROM transactions WHERE id NOT IN (
+            SELECT id FROM transactions_named WHERE category = ? AND date >= ? AND date < ?)
+    ''', ("خرید", "2024-02-02", "2024-02-21"))
+    filled_ledger.conn.commit()
+    expected = stored_rows(filled_ledger)
+    assert count == len(expected) > 0
+    
+    filled_ledger.cursor.execute("DELETE FROM transactions")
+    filled_ledger.conn.commit()
+    assert filled_ledger.import_transactions(filename) == (count, count)
+    assert stored_rows(filled_ledger) == expected
+
+
+def test_cancelled_export_removes_partial_file(filled_ledger, tmp_path, monkeypatch):
+    monkeypatch.setattr(type(filled_ledger), 'EXPORT_CHUNK_SIZE', 7)
+    filename = str(tmp_path / "export.jsonl")
+    checks = []
+    
+    # لغو پس از نوشتن دو تکه
+    def check_cancelled():
+        checks.append(1)
+        if len(checks) > 2:
+            raise JobCancelled()
+            
+    with pytest.raises(JobCancelled):
+        filled_ledger.export_transactions(filename, check_cancelled=check_cancelled)
+    assert not os.path.exists(filename)
@@ -0,0 +1,85 @@
+"""پیشرفت اهداف مالی از بازه‌های دفتر (range_total / goals) در برابر یک SUM ساده"""
+import random
+
+import pytest
+
+from conftest import INCOME, EXPENSE
+from ledger import date_columns
+
+CATEGORIES = ("غذا", "خرید", "حقوق")
+
+
+@pytest.fixture
+def filled_ledger(ledger):
+    generator = random.Random(24)
+    records = []
+    for index in range(600):
+        records.append({
+            'date': f"2024-{generator.randint(1, 12):02d}-{generator.randint(1, 28):02d} "
+                    f"{generator.randint(0, 23):02d}:{generator.randint(0, 59):02d}",
+            'type': INCOME if index % 4 == 0 else EXPENSE,
+            'amount': f"{generator.randint(100, 500000) / 100:.2f}",
+            'description': f"t{index}",
+            'category': CATEGORIES[index % 3],
+        })
+    ledger.add_transactions(records)
+    ledger.add_transaction(INCOME, 7, "بدون تاریخ", "حقوق", date="not a date")
+    return ledger
+
+
+def plain_sum(ledger, trans_type, category, start_date, deadline):
+    """جمع مستقیم تراکنش‌های بازه [شروع، پایان سررسید] بدون جدول‌های خلاصه"""
+    query = "SELECT COALESCE(SUM(amount_base_minor), 0) FROM transactions_named WHERE type = ? AND date_epoch >= ?"
+    params = [trans_type, date_columns(start_date)[0]]
+    if category:
+        query += " AND category = ?"
+        params.append(category)
+    if deadline:
+        query += " AND date_epoch < ?"
+        params.append(date_columns(deadline)[0] + 86400)
+    return ledger.cursor.execute(query, params).fetchone()[0] / 100
+
+
+@pytest.mark.parametrize("trans_type, category, start_date, deadline", [
+    (INCOME, None, "2024-01-15", "2024-04-10"),     # شروع و پایان وسط ماه
+    (EXPENSE, "غذا", "2024-03-02", "2024-03-27"),    # داخل یک ماه
+    (EXPENSE, "خرید", "2024-02-29", "2024-03-01"),   # دو تکه بدون ماه کامل
+    (EXPENSE, None, "2024-06-01", "2024-08-31"),     # ماه‌های کامل
+    (INCOME, "حقوق", "2024-05-20", None),            # بدون سررسید
+])
+def test_goal_progress_matches_plain_sum(filled_ledger, trans_type, category, start_date, deadline):
+    filled_ledger.add_goal(1000, "هدف", deadline=deadline, trans_type=trans_type, category=category,
+                           start_date=start_date)
+    current = filled_ledger.goals()[0][2]
+    assert current == pytest.approx(plain_sum(filled_ledger, trans_type, category, start_date, deadline))
+    assert current > 0
+
+
+def test_range_total_matches_plain_sum_for_random_windows(filled_ledger):
+    generator = random.Random(7)
+    type_id = filled_ledger.cursor.execute(
+        "SELECT id FROM transaction_types WHERE name = ?", (EXPENSE,)).fetchone()[0]
+    start_of_year = date_columns("2024-01-01")[0]
+    for _ in range(50):
+        start = start_of_year + generator.randrange(366 * 86400)
+        end = start + generator.randrange(120 * 86400)
+        expected = filled_ledger.cursor.execute('''
+            SELECT COALESCE(SUM(amount_base_minor), 0) FROM transactions
+            WHERE type_id = ? AND date_epoch >= ? AND date_epoch < ?
+        ''', (type_id, start, end)).fetchone()[0]
+        assert filled_ledger.range_total(type_id, None, start, end) == expected
+
+
+def test_goal_progress_follows_ledger_changes(filled_ledger):
+    filled_ledger.add_goal(1000, "هدف", deadline="2024-03-20", trans_type=EXPENSE, category="غذا",
+                           start_date="2024-03-10")
+    before = filled_ledger.goals()[0][2]
+    
+    new_id = filled_ledger.add_transaction(EXPENSE, 250, "داخل بازه", "غذا", date="2024-03-15 12:00")
+    filled_ledger.add_transaction(EXPENSE, 999, "بیرون از بازه", "غذا", date="2024-03-21 00:00")
+    assert filled_ledger.goals()[0][2] == pytest.approx(before + 250)
+    
+    filled_ledger.delete_transactions([new_id])
+    assert filled_ledger.goals()[0][2] == pytest.approx(before)
+    assert filled_ledger.goals()[0][2] == pytest.approx(
+        plain_sum(filled_ledger, EXPENSE, "غذا", "2024-03-10", "2024-03-20"))
@@ -0,0 +1,79 @@
+"""ورود جریانی تراکنش‌ها (import_transactions) از JSON، JSON Lines و CSV"""
+import csv
+import json
+
+import pytest
+
+from conftest import INCOME, EXPENSE
+from ledger import JobCancelled
+
+RECORDS = [
+    {'date': "2024-01-05 10:00", 'type': INCOME, 'amount': 1500000, 'description': "حقوق", 'category': "حقوق"},
+    {'date': "2024-01-06 12:30", 'type': EXPENSE, 'amount': 42000.5, 'description': "ناهار", 'category': "غذا"},
+    {'date': "2024-01-06 12:30", 'type': EXPENSE, 'amount': 9000, 'description': "", 'category': "حمل و نقل"},
+    {'date': "2024-02-01 08:00", 'type': EXPENSE, 'amount': 250000, 'description': "قبض", 'category': "قبوض"},
+]
+
+
+def write_records(path, records):
+    """نوشتن رکوردها با قالبی که از پسوند فایل معلوم می‌شود"""
+    if path.suffix == '.csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['date', 'type', 'amount', 'description', 'category'])
+            writer.writeheader()
+            writer.writerows(records)
+    elif path.suffix == '.jsonl':
+        path.write_text("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records), encoding='utf-8')
+    else:
+        path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding='utf-8')
+    return str(path)
+
+
+def stored_rows(ledger):
+    ledger.cursor.execute("SELECT date, type, amount, description, category FROM transactions_named ORDER BY id")
+    return ledger.cursor.fetchall()
+
+
+@pytest.mark.parametrize("suffix", ['.json', '.jsonl', '.csv'])
+def test_import_and_dedupe(ledger, tmp_path, suffix):
+    filename = write_records(tmp_path / f"data{suffix}", RECORDS)
+    assert ledger.import_transactions(filename) == (4, 4)
+    assert stored_rows(ledger) == [(r['date'], r['type'], r['amount'], r['description'], r['category']) for r in RECORDS]
+    
+    # همان تاریخ، نوع و مبلغ تکراری است؛ حتی اگر در همان فایل تکرار شده باشد
+    again = write_records(tmp_path / f"again{suffix}", RECORDS + [dict(RECORDS[1], description="دوباره")])
+    assert ledger.import_transactions(again) == (5, 0)
+    assert len(stored_rows(ledger)) == 4
+
+
+def test_import_batches_and_progress(ledger, tmp_path, monkeypatch):
+    monkeypatch.setattr(type(ledger), 'IMPORT_BATCH_SIZE', 3)
+    records = [dict(RECORDS[1], date=f"2024-03-{day:02d} 09:00") for day in range(1, 11)]
+    records.append(records[0])
+    filename = write_records(tmp_path / "data.jsonl", records)
+    
+    calls = []
+    assert ledger.import_transactions(filename, progress=lambda *args: calls.append(args)) == (11, 10)
+    assert [call[1:] for call in calls] == [(3, 3), (6, 6), (9, 9), (11, 10)]
+    assert calls[-1][0] == 1.0
+    assert ledger.check_totals_consistency() == []
+
+
+def test_malformed_file_rolls_back(ledger, tmp_path):
+    filename = tmp_path / "broken.json"
+    filename.write_text(json.dumps(RECORDS, ensure_ascii=False)[:-40], encoding='utf-8')
+    with pytest.raises(ValueError):
+        ledger.import_transactions(str(filename))
+    assert stored_rows(ledger) == []
+
+
+def test_cancelled_import_rolls_back(ledger, tmp_path, monkeypatch):
+    monkeypatch.setattr(type(ledger), 'IMPORT_BATCH_SIZE', 2)
+    filename = write_records(tmp_path / "data.json", RECORDS)
+    
+    def check_cancelled():
+        raise JobCancelled()
+        
+    with pytest.raises(JobCancelled):
+        ledger.import_transactions(filename, check_cancelled=check_cancelled)
+    assert stored_rows(ledger) == []
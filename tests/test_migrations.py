@@ -0,0 +1,95 @@
+"""مهاجرت دیتابیس‌های قدیمی (نسخه ۰ طرح) تا آخرین نسخه SCHEMA_MIGRATIONS"""
+import sqlite3
+
+import pytest
+
+from conftest import INCOME, EXPENSE
+from ledger import Ledger, SCHEMA_MIGRATIONS
+
+
+LATEST_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, type TEXT, amount REAL,
+                               description TEXT, category TEXT);
+    CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE goals (id INTEGER PRIMARY KEY AUTOINCREMENT, target_amount REAL, current_amount REAL DEFAULT 0,
+                        description TEXT, deadline TEXT, created_date TEXT);
+    CREATE TABLE reminders (id INTEGER PRIMARY KEY AUTOINCREMENT, description TEXT, date TEXT,
+                            completed INTEGER DEFAULT 0);
+    CREATE TABLE security (id INTEGER PRIMARY KEY, password_hash TEXT);
+'''
+
+LEGACY_ROWS = [
+    ("2024-01-05 10:00", INCOME, 1000.0, "حقوق", "حقوق"),
+    ("2024-01-06 11:30", EXPENSE, 0.1, "نان", "غذا"),
+    ("2024-02-10", EXPENSE, 1250.555, "کفش", "خرید"),
+    ("bad date", EXPENSE, 20.0, "بدون تاریخ", "غذا"),
+    ("2024-02-11 08:00", EXPENSE, "abc", "مبلغ خراب", "غذا"),
+    ("2024-02-12 08:00", EXPENSE, 5.0, "حذف‌شده", "غذا"),
+]
+
+
+@pytest.fixture
+def legacy_path(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany("INSERT INTO transactions (date, type, amount, description, category) VALUES (?, ?, ?, ?, ?)",
+                     LEGACY_ROWS)
+    # id آخرین تراکنش حذف‌شده نباید دوباره استفاده شود
+    conn.execute("DELETE FROM transactions WHERE id = 6")
+    conn.execute("INSERT INTO goals (target_amount, current_amount, description, created_date) "
+                 "VALUES (5000, 123, 'پس‌انداز', '2024-01-01')")
+    conn.execute("INSERT INTO reminders (description, date) VALUES ('قبض', '2024-03-01')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def schema_objects(ledger):
+    ledger.cursor.execute("SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name")
+    return ledger.cursor.fetchall()
+
+
+def test_legacy_database_reaches_latest_version(legacy_path):
+    with Ledger(legacy_path) as ledger:
+        assert ledger.cursor.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+        
+        rows = ledger.cursor.execute("SELECT id, amount_minor, date_epoch FROM transactions ORDER BY id").fetchall()
+        assert [row[0] for row in rows] == [1, 2, 3, 4, 5]
+        assert [row[1] for row in rows] == [100000, 10, 125056, 2000, 0]
+        assert rows[3][2] is None
+        assert ledger.cursor.execute("SELECT id, amount FROM invalid_legacy_amounts").fetchall() == [(5, "abc")]
+        
+        assert ledger.add_transaction(EXPENSE, 1, "تازه", "غذا", date="2024-03-01 09:00") == 7
+        assert ledger.check_totals_consistency() == []
+        assert ledger.check_rollups_consistency() == []
+
+
+def test_legacy_goals_and_reminders_are_converted(legacy_path):
+    with Ledger(legacy_path) as ledger:
+        goal_id, target, current, description, currency, trans_type, category, start_date, deadline = ledger.goals()[0]
+        assert (trans_type, category, start_date, deadline) == (INCOME, None, "2024-01-01", None)
+        # پیشرفت از تراکنش‌ها محاسبه می‌شود نه از current_amount قدیمی
+        assert current == 1000
+        
+        due_epoch = ledger.cursor.execute("SELECT due_epoch FROM reminders").fetchone()[0]
+        assert due_epoch == ledger.cursor.execute("SELECT CAST(strftime('%s', '2024-03-01') AS INTEGER)").fetchone()[0]
+
+
+def test_migrated_schema_matches_new_database(legacy_path, tmp_path):
+    with Ledger(legacy_path) as migrated, Ledger(str(tmp_path / "new.db")) as fresh:
+        assert schema_objects(migrated) == schema_objects(fresh)
+        assert fresh.cursor.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+
+
+def test_reopening_does_not_change_data(legacy_path):
+    with Ledger(legacy_path) as ledger:
+        before = ledger.cursor.execute("SELECT * FROM transactions ORDER BY id").fetchall()
+        objects = schema_objects(ledger)
+        version = ledger.result_version()
+    with Ledger(legacy_path) as ledger:
+        assert ledger.cursor.execute("SELECT * FROM transactions ORDER BY id").fetchall() == before
+        assert schema_objects(ledger) == objects
+        assert ledger.result_version() == version
@@ -0,0 +1,71 @@
+"""صفحه‌بندی کلیدی جدول تراکنش‌ها (fetch_transactions_page)"""
+import pytest
+
+from conftest import INCOME, EXPENSE
+
+
+@pytest.fixture
+def paged_ledger(ledger):
+    # چند ردیف با تاریخ تکراری تا ترتیب id در مرز صفحه‌ها هم بررسی شود
+    for index in range(23):
+        trans_type = INCOME if index % 3 == 0 else EXPENSE
+        ledger.add_transaction(trans_type, 10 + index, f"t{index}", "غذا", date=f"2024-01-{index // 2 + 1:02d} 10:00")
+    # تاریخ نامعتبر: date_epoch برابر NULL است
+    for index in range(4):
+        ledger.add_transaction(EXPENSE, 5, f"bad{index}", "غذا", date=f"bad date {index}")
+    return ledger
+
+
+def expected_order(ledger, trans_type=None):
+    """ترتیب مرجع: از جدید به قدیم و ردیف‌های بدون تاریخ در انتها"""
+    query = "SELECT id, date_epoch FROM transactions_named"
+    params = []
+    if trans_type is not None:
+        query += " WHERE type = ?"
+        params.append(trans_type)
+    rows = ledger.cursor.execute(query, params).fetchall()
+    dated = sorted((row for row in rows if row[1] is not None), key=lambda row: (row[1], row[0]), reverse=True)
+    undated = sorted((row for row in rows if row[1] is None), key=lambda row: row[0], reverse=True)
+    return [row[0] for row in dated + undated]
+
+
+def walk_forward(ledger, limit, **filters):
+    ids, key = [], None
+    while True:
+        rows = ledger.fetch_transactions_page(limit, after_key=key, **filters)
+        assert len(rows) <= limit
+        if not rows:
+            return ids
+        ids += [row[0] for row in rows]
+        key = (rows[-1][1], rows[-1][0])
+
+
+@pytest.mark.parametrize("limit", [1, 4, 5, 9, 26, 27, 28, 100])
+def test_forward_pages_cover_every_row_once(paged_ledger, limit):
+    assert walk_forward(paged_ledger, limit) == expected_order(paged_ledger)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7, 27])
+def test_backward_pages_return_to_first_row(paged_ledger, limit):
+    order = expected_order(paged_ledger)
+    last = paged_ledger.cursor.execute("SELECT date_epoch, id FROM transactions WHERE id = ?", (order[-1],)).fetchone()
+    ids, key = [order[-1]], tuple(last)
+    while True:
+        rows = paged_ledger.fetch_transactions_page(limit, before_key=key)
+        if not rows:
+            break
+        # خروجی صفحه جدیدتر هم از جدید به قدیم است
+        ids = [row[0] for row in rows] + ids
+        key = (rows[0][1], rows[0][0])
+    assert ids == order
+
+
+def test_filtered_pages_include_undated_rows(paged_ledger):
+    assert walk_forward(paged_ledger, 4, trans_type=EXPENSE) == expected_order(paged_ledger, EXPENSE)
+    assert walk_forward(paged_ledger, 4, trans_type=INCOME) == expected_order(paged_ledger, INCOME)
+
+
+def test_page_after_last_row_is_empty(paged_ledger):
+    rows = paged_ledger.fetch_transactions_page(27)
+    assert len(rows) == 27
+    assert paged_ledger.fetch_transactions_page(27, after_key=(rows[-1][1], rows[-1][0])) == []
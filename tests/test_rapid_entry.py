@@ -0,0 +1,75 @@
+"""صف ورود سریع: queue_transaction و نوشتن گروهی با flush_transactions"""
+import sqlite3
+
+import pytest
+
+from conftest import INCOME, EXPENSE
+from ledger import Ledger
+
+
+def stored_count(ledger):
+    return ledger.cursor.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+
+def test_queued_rows_are_validated_but_not_written(ledger):
+    with pytest.raises(ValueError):
+        ledger.queue_transaction(EXPENSE, 0, "صفر", "غذا")
+    ledger.queue_transaction(EXPENSE, "12.50", "نان", "غذا", date="2024-03-01 08:00")
+    
+    assert len(ledger.pending_transactions) == 1
+    assert stored_count(ledger) == 0
+    assert ledger.totals().get(EXPENSE, 0) == 0
+
+
+def test_flush_writes_queue_in_one_transaction(ledger):
+    ledger.add_goal(10000, "پس‌انداز", start_date="2024-03-01")
+    for day in range(1, 21):
+        trans_type = INCOME if day % 5 == 0 else EXPENSE
+        ledger.queue_transaction(trans_type, 100 + day, f"t{day}", "غذا", date=f"2024-03-{day:02d} 08:00")
+        
+    statements = []
+    ledger.conn.set_trace_callback(statements.append)
+    written = ledger.flush_transactions()
+    ledger.conn.set_trace_callback(None)
+    
+    keywords = [statement.split()[0].upper() for statement in statements]
+    assert keywords.count("BEGIN") == 1
+    assert keywords.count("COMMIT") == 1
+    # همه درج‌ها بین همان BEGIN و COMMIT هستند
+    inserts = [index for index, keyword in enumerate(keywords) if keyword == "INSERT"]
+    assert keywords.index("BEGIN") < inserts[0] and inserts[-1] < keywords.index("COMMIT")
+    
+    assert [trans_id for trans_id, row in written] == list(range(1, 21))
+    assert ledger.pending_transactions == []
+    assert stored_count(ledger) == 20
+    assert ledger.totals()[INCOME] == 105 + 110 + 115 + 120
+    # پیشرفت هدف از همان تراکنش‌های نوشته‌شده محاسبه می‌شود
+    assert ledger.goals()[0][2] == 450
+    assert ledger.check_totals_consistency() == []
+
+
+def test_failed_flush_keeps_queue(ledger):
+    ledger.queue_transaction(EXPENSE, 10, "سالم", "غذا", date="2024-03-01 08:00")
+    ledger.queue_transaction(EXPENSE, 20, "خراب", "غذا", date="2024-03-02 08:00")
+    ledger.cursor.execute('''
+        CREATE TEMP TRIGGER reject_insert BEFORE INSERT ON transactions WHEN NEW.description = 'خراب'
+        BEGIN SELECT RAISE(ABORT, 'rejected'); END
+    ''')
+    
+    with pytest.raises(sqlite3.DatabaseError):
+        ledger.flush_transactions()
+    # هیچ ردیفی نیمه‌کاره نوشته نشده و صف برای تلاش دوباره مانده است
+    assert stored_count(ledger) == 0
+    assert len(ledger.pending_transactions) == 2
+    
+    ledger.cursor.execute("DROP TRIGGER reject_insert")
+    assert len(ledger.flush_transactions()) == 2
+    assert stored_count(ledger) == 2
+
+
+def test_close_flushes_queue(tmp_path):
+    path = str(tmp_path / "finance.db")
+    with Ledger(path) as ledger:
+        ledger.queue_transaction(EXPENSE, 10, "پیش از خروج", "غذا", date="2024-03-01 08:00")
+    with Ledger(path) as ledger:
+        assert stored_count(ledger) == 1
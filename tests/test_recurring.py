@@ -0,0 +1,52 @@
+"""ثبت نوبت‌های برنامه‌های تکرار (post_recurring) و جلوگیری از ثبت دوباره"""
+import sqlite3
+
+import pytest
+
+from conftest import INCOME, EXPENSE
+
+
+def posted_dates(ledger, schedule_id):
+    ledger.cursor.execute("SELECT date FROM transactions WHERE schedule_id = ? ORDER BY date_epoch", (schedule_id,))
+    return [row[0][:10] for row in ledger.cursor.fetchall()]
+
+
+def test_monthly_catch_up_keeps_day_of_month(ledger):
+    schedule_id = ledger.add_schedule(INCOME, 1000, 'monthly', "2024-01-31", "حقوق", "حقوق")
+    assert ledger.post_recurring(today="2024-04-30") == 4
+    # در ماه‌های کوتاه‌تر آخرین روز ماه و بعد دوباره روز ۳۱
+    assert posted_dates(ledger, schedule_id) == ["2024-01-31", "2024-02-29", "2024-03-31", "2024-04-30"]
+    assert ledger.schedules()[0][-1] == "2024-05-31"
+    assert ledger.check_totals_consistency() == []
+    assert ledger.check_rollups_consistency() == []
+
+
+def test_posting_again_is_idempotent(ledger):
+    schedule_id = ledger.add_schedule(EXPENSE, 50, 'weekly', "2024-03-01", "اجاره", "اجاره")
+    assert ledger.post_recurring(today="2024-03-29") == 5
+    assert ledger.post_recurring(today="2024-03-29") == 0
+    
+    # اجرای هم‌زمان یا قطع‌شده: next_date جلو نرفته ولی نوبت‌ها ثبت شده‌اند
+    ledger.cursor.execute("UPDATE recurring_schedules SET next_date = start_date WHERE id = ?", (schedule_id,))
+    ledger.conn.commit()
+    assert ledger.post_recurring(today="2024-03-29") == 0
+    assert len(posted_dates(ledger, schedule_id)) == 5
+
+
+def test_unique_schedule_date_guard(ledger):
+    schedule_id = ledger.add_schedule(EXPENSE, 10, 'daily', "2024-03-01")
+    ledger.post_recurring(today="2024-03-01")
+    with pytest.raises(sqlite3.IntegrityError):
+        ledger.cursor.execute('''
+            INSERT INTO transactions (date, type_id, amount_minor, category_id, schedule_id)
+            SELECT date, type_id, amount_minor, category_id, schedule_id FROM transactions WHERE schedule_id = ?
+        ''', (schedule_id,))
+    ledger.conn.rollback()
+
+
+def test_schedule_with_end_date_is_deactivated(ledger):
+    schedule_id = ledger.add_schedule(EXPENSE, 10, 'daily', "2024-03-01", end_date="2024-03-03", interval=1)
+    assert ledger.post_recurring(today="2024-03-10") == 3
+    assert posted_dates(ledger, schedule_id) == ["2024-03-01", "2024-03-02", "2024-03-03"]
+    assert ledger.schedules() == []
+    assert ledger.post_recurring(today="2024-03-20") == 0
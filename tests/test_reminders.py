@@ -0,0 +1,50 @@
+"""صف سررسید یادآوری‌ها (ReminderQueue)، تعویق و انجام‌شدن"""
+from datetime import datetime
+
+from ledger import ReminderQueue, wall_clock_epoch
+
+
+def day_epoch(date):
+    return wall_clock_epoch(datetime.strptime(date, "%Y-%m-%d"))
+
+
+def test_pop_due_returns_overdue_in_order(ledger):
+    march_3 = ledger.add_reminder("سوم", "2024-03-03")
+    march_1 = ledger.add_reminder("اول", "2024-03-01")
+    ledger.add_reminder("دهم", "2024-03-10")
+    queue = ReminderQueue(ledger)
+    
+    due = queue.pop_due(now=day_epoch("2024-03-05"))
+    assert [row[1] for row in due] == [march_1, march_3]
+    assert queue.next_due() == day_epoch("2024-03-10")
+    assert queue.pop_due(now=day_epoch("2024-03-05")) == []
+
+
+def test_queue_refills_windows_in_due_order(ledger, monkeypatch):
+    monkeypatch.setattr(ReminderQueue, 'WINDOW_SIZE', 3)
+    ids = [ledger.add_reminder(f"r{day}", f"2024-04-{day:02d}") for day in (9, 2, 7, 2, 5, 1, 8, 3, 6, 4)]
+    expected = sorted(zip((day_epoch(ledger.cursor.execute("SELECT date FROM reminders WHERE id = ?", (reminder_id,))
+                                     .fetchone()[0]) for reminder_id in ids), ids))
+    
+    queue = ReminderQueue(ledger)
+    due = queue.pop_due(now=day_epoch("2024-05-01"))
+    assert [(row[0], row[1]) for row in due] == expected
+    assert queue.next_due() is None
+
+
+def test_snooze_and_complete(ledger):
+    first = ledger.add_reminder("قبض", "2024-03-01")
+    second = ledger.add_reminder("اجاره", "2024-03-01")
+    until = day_epoch("2024-03-01") + 3600
+    ledger.snooze_reminders([first], until)
+    ledger.complete_reminders([second])
+    
+    queue = ReminderQueue(ledger)
+    assert queue.pop_due(now=until - 1) == []
+    assert [row[1] for row in queue.pop_due(now=until)] == [first]
+    assert ledger.pending_reminder_ids([first, second], now=until) == {first}
+    
+    ledger.complete_reminders([first])
+    queue.reload()
+    assert queue.next_due() is None
+    assert ledger.pending_reminder_ids([first, second], now=until) == set()
@@ -0,0 +1,90 @@
+"""کش نتایج (ResultCache): جایگزینی LRU، نامعتبر شدن با تغییر داده‌ها و ماندگاری در فایل"""
+import json
+
+from conftest import INCOME, EXPENSE
+from ledger import ResultCache
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.store(('a',), (1,), 'A')
+    cache.store(('b',), (1,), 'B')
+    assert cache.lookup(('a',), (1,)) == (True, 'A')
+    cache.store(('c',), (1,), 'C')
+    
+    assert cache.lookup(('b',), (1,)) == (False, None)
+    assert cache.lookup(('a',), (1,)) == (True, 'A')
+    assert cache.lookup(('c',), (1,)) == (True, 'C')
+    assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
+
+
+def test_stale_version_is_dropped():
+    cache = ResultCache()
+    cache.store(('report',), (1,), 'old')
+    assert cache.lookup(('report',), (2,)) == (False, None)
+    assert cache.lookup(('report',), (1,)) == (False, None)
+
+
+def test_result_version_changes_with_every_write(ledger, tmp_path):
+    first = ledger.add_transaction(INCOME, 100, "حقوق", "حقوق", date="2024-03-01 10:00")
+    ledger.add_transaction(EXPENSE, 20, "غذا", "غذا", date="2024-03-02 10:00")
+    versions = [ledger.result_version()]
+    assert ledger.result_version() == versions[-1]
+    
+    ledger.add_transaction(EXPENSE, 5, "نان", "غذا", date="2024-03-03 10:00")
+    versions.append(ledger.result_version())
+    
+    ledger.cursor.execute("UPDATE transactions SET amount_minor = 9000, amount_base_minor = 9000 WHERE id = ?",
+                          (first,))
+    ledger.conn.commit()
+    versions.append(ledger.result_version())
+    
+    ledger.delete_transactions([first])
+    versions.append(ledger.result_version())
+    
+    rates_file = tmp_path / "rates.csv"
+    rates_file.write_text("date,currency,rate\n2024-03-01,USD,50000\n", encoding='utf-8')
+    ledger.load_exchange_rates(str(rates_file))
+    versions.append(ledger.result_version())
+    
+    assert len(set(versions)) == len(versions)
+
+
+def test_restore_changes_lineage(ledger, tmp_path):
+    ledger.add_transaction(INCOME, 100, "حقوق", "حقوق", date="2024-03-01 10:00")
+    backup_path = str(tmp_path / "backup.db")
+    ledger.backup(backup_path)
+    before = ledger.result_version()
+    
+    ledger.restore(backup_path)
+    after = ledger.result_version()
+    assert after[0] != before[0]
+    assert after[1:] == before[1:]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    filename = str(tmp_path / "finance.db.results.json")
+    cache = ResultCache(max_entries=3)
+    for index in range(4):
+        cache.store(('report', index), ('lineage', index), [["غذا", index * 1.5]])
+    cache.lookup(('report', 1), ('lineage', 1))
+    cache.save(filename)
+    
+    loaded = ResultCache(max_entries=3)
+    assert loaded.load(filename) == 3
+    assert list(loaded.entries) == [('report', 2), ('report', 3), ('report', 1)]
+    assert loaded.lookup(('report', 3), ('lineage', 3)) == (True, [["غذا", 4.5]])
+    assert loaded.lookup(('report', 0), ('lineage', 0)) == (False, None)
+
+
+def test_load_ignores_missing_or_malformed_files(tmp_path):
+    filename = tmp_path / "finance.db.results.json"
+    cache = ResultCache()
+    assert cache.load(str(filename)) == 0
+    
+    for content in ('not json', '{"a": 1}', '[1, 2]', '[[["k"], 5, null]]', '[[{"k": 1}, [1], null]]',
+                    json.dumps([[["k"], [1], "ok"], ["bad"]])):
+        filename.write_text(content, encoding='utf-8')
+        cache.store(('stale',), (0,), 'x')
+        assert cache.load(str(filename)) == 0
+        assert len(cache.entries) == 0
@@ -0,0 +1,94 @@
+"""سازگاری جمع‌های تجمعی (ledger_totals) و جدول‌های خلاصه با تراکنش‌ها پس از هر نوع تغییر"""
+from collections import defaultdict
+
+import pytest
+
+from conftest import INCOME, EXPENSE
+from ledger import date_columns
+
+
+@pytest.fixture
+def filled_ledger(ledger):
+    for index in range(40):
+        trans_type = INCOME if index % 4 == 0 else EXPENSE
+        category = ("غذا", "خرید", "حقوق")[index % 3]
+        ledger.add_transaction(trans_type, f"{index * 12.5 + 0.1:.2f}", f"t{index}", category,
+                               date=f"2024-{index % 5 + 1:02d}-{index % 27 + 1:02d} 09:30")
+    ledger.add_transaction(EXPENSE, 7, "بدون تاریخ", "غذا", date="not a date")
+    return ledger
+
+
+def assert_consistent(ledger):
+    assert ledger.check_totals_consistency() == []
+    assert ledger.check_rollups_consistency() == []
+    
+    ledger.cursor.execute("SELECT type, SUM(amount_base_minor) FROM transactions_named GROUP BY type")
+    expected = {name: total / 100 for name, total in ledger.cursor.fetchall()}
+    totals = {name: total for name, total in ledger.totals().items() if total}
+    assert totals == pytest.approx(expected)
+    
+    ledger.cursor.execute('''
+        SELECT type, category, SUM(amount_base_minor), COUNT(*) FROM transactions_named
+        WHERE year = 2024 AND month = 3 AND date_epoch IS NOT NULL GROUP BY type, category
+    ''')
+    expected_groups = {(row[0], row[1]): (row[2] / 100, row[3]) for row in ledger.cursor.fetchall()}
+    groups = {(row[0], row[1]): (row[2], row[3]) for row in ledger.report_groups(2024, 3)}
+    assert groups == expected_groups
+
+
+def test_inserts_keep_summaries_consistent(filled_ledger):
+    assert_consistent(filled_ledger)
+    
+    filled_ledger.add_transactions([{'date': f"2024-03-0{day} 12:00", 'type': INCOME, 'amount': 100 + day,
+                                     'description': "batch", 'category': "حقوق"} for day in range(1, 8)])
+    for day in range(1, 4):
+        filled_ledger.queue_transaction(EXPENSE, 3, "rapid", "غذا", date=f"2024-03-1{day} 08:00")
+    filled_ledger.flush_transactions()
+    assert_consistent(filled_ledger)
+
+
+def test_updates_keep_summaries_consistent(filled_ledger):
+    cursor = filled_ledger.cursor
+    category_id = cursor.execute("SELECT id FROM categories WHERE name = 'خرید'").fetchone()[0]
+    income_id = cursor.execute("SELECT id FROM transaction_types WHERE name = ?", (INCOME,)).fetchone()[0]
+    
+    # تغییر مبلغ، دسته، نوع و تاریخ (ماه و روز هفته) با SQL مستقیم؛ تریگرها باید خلاصه‌ها را جابه‌جا کنند
+    cursor.execute("UPDATE transactions SET amount_minor = amount_minor * 3, amount_base_minor = amount_base_minor * 3 "
+                   "WHERE id % 5 = 0")
+    cursor.execute("UPDATE transactions SET category_id = ? WHERE id % 7 = 0", (category_id,))
+    cursor.execute("UPDATE transactions SET type_id = ? WHERE id % 6 = 0", (income_id,))
+    epoch, year, month = date_columns("2024-03-20 18:00")
+    cursor.execute("UPDATE transactions SET date = '2024-03-20 18:00', date_epoch = ?, year = ?, month = ? "
+                   "WHERE id % 4 = 1", (epoch, year, month))
+    filled_ledger.conn.commit()
+    assert_consistent(filled_ledger)
+
+
+def test_deletes_keep_summaries_consistent(filled_ledger):
+    ids = [row[0] for row in filled_ledger.cursor.execute("SELECT id FROM transactions WHERE id % 3 = 0")]
+    filled_ledger.delete_transactions(ids)
+    assert_consistent(filled_ledger)
+    
+    filled_ledger.clear()
+    assert_consistent(filled_ledger)
+    assert filled_ledger.cursor.execute("SELECT COUNT(*) FROM rollup_monthly").fetchone()[0] == 0
+
+
+def test_weekday_rollup_matches_transactions(filled_ledger):
+    expense = defaultdict(float)
+    for epoch, amount in filled_ledger.cursor.execute(
+            "SELECT date_epoch, amount_base_minor FROM transactions_named WHERE type = ? AND date_epoch IS NOT NULL",
+            (EXPENSE,)):
+        # ۱ ژانویه ۱۹۷۰ پنج‌شنبه بود (۰=دوشنبه)
+        expense[(epoch // 86400 + 3) % 7] += amount / 100
+    assert filled_ledger.rollups().weekday_totals(EXPENSE) == pytest.approx([expense[day] for day in range(7)])
+
+
+def test_rollups_view_is_cached_until_data_changes(filled_ledger):
+    rollups = filled_ledger.rollups()
+    assert filled_ledger.rollups() is rollups
+    assert len(rollups) == 40
+    
+    filled_ledger.add_transaction(EXPENSE, 50, "جدید", "غذا", date="2024-03-03 10:00")
+    assert filled_ledger.rollups() is not rollups
+    assert len(filled_ledger.rollups()) == 41
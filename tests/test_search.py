@@ -0,0 +1,89 @@
+"""جستجوی متنی تراکنش‌ها با ایندکس FTS5 (fetch_transactions_page(search=...))"""
+import pytest
+
+from conftest import INCOME, EXPENSE
+
+ROWS = [
+    (INCOME, "حقوق ماهانه", "حقوق"),
+    (EXPENSE, "خرید نان و پنیر", "غذا"),
+    (EXPENSE, "نان بربری", "غذا"),
+    (EXPENSE, "كيك تولد", "غذا"),  # ی و ک عربی
+    (EXPENSE, "کرایه تاکسی", "حمل‌ونقل"),
+    (EXPENSE, "کتاب‌های درسی", "آموزش"),
+    (EXPENSE, "اجاره خانه", "اجاره"),
+]
+
+
+@pytest.fixture
+def searchable_ledger(ledger):
+    for day, (trans_type, description, category) in enumerate(ROWS, 1):
+        ledger.add_transaction(trans_type, 1000 * day, description, category, date=f"2024-05-{day:02d} 09:00")
+    return ledger
+
+
+def search(ledger, text, limit=50, **filters):
+    return [row[5] for row in ledger.fetch_transactions_page(limit, search=text, **filters)]
+
+
+def test_index_is_available(searchable_ledger):
+    assert searchable_ledger.search_indexed
+
+
+def test_prefix_search(searchable_ledger):
+    # از جدید به قدیم، مثل بقیه صفحه‌ها
+    assert search(searchable_ledger, "نا") == ["نان بربری", "خرید نان و پنیر"]
+    assert search(searchable_ledger, "پنی") == ["خرید نان و پنیر"]
+    # تک‌حرف فقط به صورت کلمه کامل جستجو می‌شود
+    assert search(searchable_ledger, "ن") == []
+
+
+def test_selective_search_matches_every_word(searchable_ledger):
+    assert search(searchable_ledger, "نان خرید") == ["خرید نان و پنیر"]
+    assert search(searchable_ledger, "نان تاکسی") == []
+    # دسته هم جستجو می‌شود
+    assert search(searchable_ledger, "آموزش") == ["کتاب‌های درسی"]
+
+
+def test_persian_letter_variants_and_zwnj(searchable_ledger):
+    assert search(searchable_ledger, "کیک") == ["كيك تولد"]
+    assert search(searchable_ledger, "كرايه") == ["کرایه تاکسی"]
+    # نیم‌فاصله مثل فاصله است
+    assert search(searchable_ledger, "های درس") == ["کتاب‌های درسی"]
+
+
+def test_search_combines_with_filters_and_paging(searchable_ledger):
+    assert search(searchable_ledger, "حقوق", trans_type=EXPENSE) == []
+    assert search(searchable_ledger, "غذا", category="غذا") == ["كيك تولد", "نان بربری", "خرید نان و پنیر"]
+    
+    first = searchable_ledger.fetch_transactions_page(2, search="غذا")
+    rest = searchable_ledger.fetch_transactions_page(2, after_key=(first[-1][1], first[-1][0]), search="غذا")
+    assert [row[5] for row in first + rest] == ["كيك تولد", "نان بربری", "خرید نان و پنیر"]
+
+
+def test_fts_operators_in_input_are_inert(searchable_ledger):
+    assert search(searchable_ledger, 'نان OR "اجاره"') == []
+    assert search(searchable_ledger, "* - ( ) :") == search(searchable_ledger, "")
+
+
+def test_index_follows_updates_and_deletes(searchable_ledger):
+    ledger = searchable_ledger
+    ledger.cursor.execute("UPDATE transactions SET description = ? WHERE description = ?",
+                          ("سوپرمارکت", "خرید نان و پنیر"))
+    ledger.conn.commit()
+    assert search(ledger, "نان") == ["نان بربری"]
+    assert search(ledger, "سوپر") == ["سوپرمارکت"]
+    
+    trans_id = ledger.fetch_transactions_page(1, search="بربری")[0][0]
+    ledger.delete_transactions([trans_id])
+    assert search(ledger, "نان") == []
+    
+    ledger.rebuild_search_index()
+    assert search(ledger, "سوپر") == ["سوپرمارکت"]
+    assert search(ledger, "بربری") == []
+
+
+@pytest.mark.parametrize("text", ["نان", "نان خرید", "غذا", "آموزش"])
+def test_like_fallback_matches_index(searchable_ledger, text):
+    indexed = search(searchable_ledger, text)
+    searchable_ledger.search_indexed = False
+    assert search(searchable_ledger, text) == indexed